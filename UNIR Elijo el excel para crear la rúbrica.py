@@ -1,8 +1,9 @@
 
+import argparse
 import json
 import os
-import pandas as pd
-from AppKit import NSOpenPanel, NSApplication
+
+from unir_tfm.inputs import pick_file, resolve_file
 
 # Este fichero toma la rúbrica que proporcionar UNIR. Para simplificar he reducido el rango de exploración a aquellas celdas que contienen la información de la rúbrica. He eliinado las que contienen el nombre del alumno y la fecha.
 # También he eliminado todas aquellas que realizan los cálculos de la nota final.
@@ -15,19 +16,13 @@ from AppKit import NSOpenPanel, NSApplication
 # d) Un programa que lee el acta y rellena la rúbrica. Creando un archivo en formato JSON.
 
 def open_file_dialog():
-    # Incializar la aplicación y el panel de diálogo
-    app = NSApplication.sharedApplication()
-    panel = NSOpenPanel.openPanel()
-    panel.setCanChooseDirectories_(False)
-    panel.setCanChooseFiles_(True)
-    panel.setAllowsMultipleSelection_(False)
-    panel.setAllowedFileTypes_(["xlsx"])
-    panel.setMessage_("Seleccionar")
-    if panel.runModal() == 1:
-        return panel.URL().path()
-    return None
+    # Diálogo nativo de macOS (opcional: desde la línea de órdenes se pasa la ruta del Excel)
+    paths = pick_file("Seleccionar", ["xlsx"])
+    return paths[0] if paths else None
 
 def excel_to_json_with_merged_cells(excel_file, output_file, sheet_name):
+    import pandas as pd
+
     debug_output = []
 
     try:
@@ -124,21 +119,21 @@ def excel_to_json_with_merged_cells(excel_file, output_file, sheet_name):
         print(f"Salida de depuración guardada en {debug_file}")
 
 if __name__ == "__main__":
-    # Ruta codificada al archivo de Excel para desarrollo y pruebas. Versión de inicio, el fichero está 'hard-coded'.
-    # excel_file = "/Users/JJVR/Library/CloudStorage/OneDrive-KALEIDAGEOGRAFIAS&MERCADOSSL/UNIR/Tribunales/TFM 2024/Tribunal octubre/Día 8/Rubrica_UNIR_TFM_MAVDM.xlsx"
-    
-    # Abrir el diálogo de selección de archivo
-    excel_file=open_file_dialog()
+    parser = argparse.ArgumentParser(description="Convierte la rúbrica Excel de UNIR a JSON")
+    parser.add_argument("excel", nargs="?", help="Rúbrica .xlsx (si se omite, se abre el diálogo de selección)")
+    parser.add_argument("--sheet", default="Nombre_Alumno (1)", help="Hoja de trabajo con la rúbrica")
+    parser.add_argument("--output", help="JSON de salida (por defecto, <excel>_rubric.json)")
+    args = parser.parse_args()
+
+    # Ruta del Excel: argumento de la línea de órdenes o, si no se indica, diálogo de selección
+    excel_file = resolve_file(args.excel, "Seleccionar", ["xlsx"])
     
     if not excel_file:
         print("No se seleccionó ningún archivo.")
         exit()  # Salir del script si no se seleccionó ningún archivo
-    else:
-        # Especificar el nombre de la hoja de trabajo
-        sheet_name = "Nombre_Alumno (1)"
 
     # Nombre del archivo JSON de salida
-    output_file = os.path.splitext(excel_file)[0] + "_rubric.json"
+    output_file = args.output or os.path.splitext(excel_file)[0] + "_rubric.json"
 
     # Convertir el rango especificado a JSON
-    excel_to_json_with_merged_cells(excel_file, output_file, sheet_name)
+    excel_to_json_with_merged_cells(excel_file, output_file, args.sheet)
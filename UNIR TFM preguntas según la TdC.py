@@ -1,65 +1,33 @@
+import argparse
 import os
+import sys
 from pathlib import Path
-import anthropic
-import PyPDF2
-from typing import Dict, List
+from typing import Dict, List, Optional
 from datetime import datetime
-from Foundation import NSURL
-from AppKit import (
-    NSOpenPanel,
-    NSApplication,
-    NSModalResponseOK
-)
+
+from unir_tfm.inputs import pick_file, resolve_files
+from unir_tfm.pdf_extract import extract_text
+from unir_tfm.llm import default_llm
+from unir_tfm.sections import read_outline, segment_text, spread_sections
+
+# Approximate tokens of document text sent to the model
+QUESTION_TOKEN_BUDGET = 3000
 
 class MacOSPDFPicker:
     @staticmethod
     def pick_pdf_file() -> str:
-        NSApplication.sharedApplication()
-        
-        panel = NSOpenPanel.alloc().init()
-        panel.setTitle_("Select Student PDF")
-        panel.setMessage_("Choose a PDF file to generate questions")
-        panel.setPrompt_("Choose")
-        panel.setAllowedFileTypes_(["pdf"])
-        panel.setAllowsMultipleSelection_(False)
-        panel.setCanChooseFiles_(True)
-        panel.setCanChooseDirectories_(False)
-        
-        if panel.runModal() == NSModalResponseOK:
-            selected_url = panel.URLs()[0]
-            return selected_url.path()
-        
-        return None
+        # Optional macOS front end; from the command line the PDFs are given as arguments
+        paths = pick_file("Select Student PDF", ["pdf"])
+        return paths[0] if paths else None
 
 class PDFQuestionGenerator:
     def __init__(self):
         api_key = os.getenv('MI_CLAVE_API_ANTROPIC')
         if not api_key:
             raise ValueError("Anthropic API key not found in environment variables")
-        self.client = anthropic.Anthropic(api_key=api_key)
+        # Shared long-lived client (connection pool, response cache and rate limits, see unir_tfm.llm)
+        self.client = default_llm("anthropic").client
     
-    def _process_toc(self, outline, level=0) -> List[Dict]:
-        """
-        Recursively process PDF outline/bookmarks into structured TOC
-        """
-        toc = []
-        if not outline:
-            return toc
-            
-        for item in outline:
-            if isinstance(item, list):
-                # Recursive call for nested items
-                toc.extend(self._process_toc(item, level + 1))
-            else:
-                # Process individual item
-                if hasattr(item, '/Title'):
-                    toc.append({
-                        'title': item['/Title'],
-                        'level': level,
-                        'page': item.get('/Page', '').strip()
-                    })
-        return toc
-
     def _format_toc(self, toc: List[Dict]) -> str:
         """
         Format TOC into readable string for prompt
@@ -71,24 +39,16 @@ class PDFQuestionGenerator:
         return "\n".join(formatted)
 
     def extract_toc(self, pdf_path: str) -> List[Dict]:
-        """Extract table of contents from PDF"""
+        """Extract table of contents (outline titles, levels and pages) from PDF"""
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                outline = pdf_reader.outline
-                return self._process_toc(outline)
+            return read_outline(pdf_path)
         except Exception as e:
             print(f"Warning: Could not extract TOC: {str(e)}")
             return []
 
     def extract_text_from_pdf(self, pdf_path: str) -> str:
         try:
-            text = ""
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text()
-            return text
+            return extract_text(pdf_path)
         except Exception as e:
             raise Exception(f"Error extracting text from PDF: {str(e)}")
 
@@ -117,8 +77,8 @@ class PDFQuestionGenerator:
         2. [Question]
         (continue for each section)
 
-        Use this document content:
-        {pdf_text[:4000]}
+        Use this document content (an excerpt of every section):
+        {spread_sections(segment_text(pdf_text, toc), QUESTION_TOKEN_BUDGET)}
         """
         
         try:
@@ -168,8 +128,8 @@ class PDFQuestionGenerator:
         9. [Extensions question]
         10. [Applications question]
 
-        Document content:
-        {pdf_text[:4000]}
+        Document content (an excerpt of every section):
+        {spread_sections(segment_text(pdf_text), QUESTION_TOKEN_BUDGET)}
         """
         
         try:
@@ -233,22 +193,33 @@ def save_questions(pdf_path: str) -> Path:
     except Exception as e:
         raise Exception(f"Error saving questions: {str(e)}")
 
-def main():
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Generate defence questions for TFM PDFs")
+    parser.add_argument("pdfs", nargs="*",
+                        help="PDF files, globs, directories or @manifest files (a dialog opens if omitted)")
+    parser.add_argument("--no-open", dest="open_result", action="store_false",
+                        help="Do not open the generated Markdown (macOS)")
+    args = parser.parse_args(argv)
+
     try:
         print("Starting PDF Question Generator...")
-        pdf_picker = MacOSPDFPicker()
-        pdf_path = pdf_picker.pick_pdf_file()
+        pdf_paths = resolve_files(args.pdfs, "Select Student PDF", ["pdf"])
         
-        if not pdf_path:
+        if not pdf_paths:
             print("No PDF file selected.")
             return
         
-        print(f"Selected PDF: {pdf_path}")
-        result_path = save_questions(pdf_path)
-        
-        if result_path:
+        for pdf_path in pdf_paths:
+            print(f"Selected PDF: {pdf_path}")
+            try:
+                result_path = save_questions(pdf_path)
+            except Exception as e:
+                print(f"Error: {str(e)}")
+                continue
+            
             print(f"Questions generated and saved to: {result_path}")
-            os.system(f"open '{result_path}'")
+            if args.open_result and len(pdf_paths) == 1 and sys.platform == "darwin":
+                os.system(f"open '{result_path}'")
             
     except Exception as e:
         print(f"Error: {str(e)}")
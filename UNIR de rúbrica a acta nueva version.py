@@ -1,24 +1,15 @@
-from Foundation import NSURL
-from Quartz import PDFDocument, PDFAnnotation
-from AppKit import NSOpenPanel
+import argparse
 
-def select_pdf_file():
+from unir_tfm.inputs import resolve_file
+
+def select_pdf_file(path=None):
     """
-    Open a native macOS file picker dialog to select a PDF file.
+    Resolve the PDF form: the given path, or a native macOS file picker dialog.
     
     Returns:
         str: Path to selected PDF file, or None if cancelled
     """
-    panel = NSOpenPanel.alloc().init()
-    panel.setTitle_("Choose a PDF Form")
-    panel.setAllowedFileTypes_(["pdf"])
-    panel.setCanChooseDirectories_(False)
-    panel.setCanChooseFiles_(True)
-    panel.setAllowsMultipleSelection_(False)
-    
-    if panel.runModal() == 1:  # NSModalResponseOK
-        return panel.URLs()[0].path()
-    return None
+    return resolve_file(path, "Choose a PDF Form", ["pdf"])
 
 def get_form_fields(pdf_path):
     """
@@ -30,6 +21,9 @@ def get_form_fields(pdf_path):
     Returns:
         dict: Dictionary containing lists of different types of form fields
     """
+    from Foundation import NSURL
+    from Quartz import PDFAnnotation, PDFDocument
+
     # Create URL from path
     url = NSURL.fileURLWithPath_(pdf_path)
     
@@ -90,8 +84,12 @@ def print_fields(fields):
     for field in fields['other_fields']:
         print(f"- {field}")
 
-def main():
-    pdf_path = select_pdf_file()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List the form fields of an acta PDF")
+    parser.add_argument("pdf", nargs="?", help="PDF form (a dialog opens if omitted)")
+    args = parser.parse_args(argv)
+
+    pdf_path = select_pdf_file(args.pdf)
     if pdf_path:
         try:
             fields = get_form_fields(pdf_path)
@@ -1,29 +1,23 @@
-from Foundation import NSURL
-from Quartz import PDFDocument, PDFAnnotation
-from AppKit import NSOpenPanel
-import openpyxl
+import argparse
 
-def select_file(title, file_types):
+from unir_tfm.inputs import resolve_file
+
+# The macOS bridges (Foundation, Quartz) and openpyxl are imported by the
+# functions that use them; file dialogs come from unir_tfm.inputs
+
+def select_file(title, file_types, path=None):
     """
-    Open a native macOS file picker dialog.
+    Resolve an input file: the given path, or a native macOS file picker dialog.
     
     Args:
         title (str): Window title
         file_types (list): List of allowed file extensions
+        path (str, optional): Path given on the command line
         
     Returns:
         str: Path to selected file, or None if cancelled
     """
-    panel = NSOpenPanel.alloc().init()
-    panel.setTitle_(title)
-    panel.setAllowedFileTypes_(file_types)
-    panel.setCanChooseDirectories_(False)
-    panel.setCanChooseFiles_(True)
-    panel.setAllowsMultipleSelection_(False)
-    
-    if panel.runModal() == 1:  # NSModalResponseOK
-        return panel.URLs()[0].path()
-    return None
+    return resolve_file(path, title, file_types)
 
 def read_excel_cells(excel_path):
     """
@@ -35,6 +29,8 @@ def read_excel_cells(excel_path):
     Returns:
         dict: Dictionary with cell values
     """
+    import openpyxl
+
     workbook = openpyxl.load_workbook(excel_path, data_only=True)
     sheet = workbook.active
     
@@ -56,6 +52,9 @@ def fill_pdf_form(pdf_path, values):
         pdf_path (str): Path to PDF file
         values (dict): Dictionary of field names and values
     """
+    from Foundation import NSURL
+    from Quartz import PDFAnnotation, PDFDocument
+
     # Create URL from path
     url = NSURL.fileURLWithPath_(pdf_path)
     
@@ -83,17 +82,24 @@ def fill_pdf_form(pdf_path, values):
     pdf_document.writeToFile_(save_path)
     return save_path
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fill the acta PDF form with the marks of the rubric Excel file")
+    parser.add_argument("excel", nargs="?", help="Rubric Excel file (a dialog opens if omitted)")
+    parser.add_argument("pdf", nargs="?", help="Acta PDF form (a dialog opens if omitted)")
+    args = parser.parse_args(argv)
+
     # Select Excel file
-    print("Please select the Excel file...")
-    excel_path = select_file("Choose Excel File", ["xlsx", "xls"])
+    if not args.excel:
+        print("Please select the Excel file...")
+    excel_path = select_file("Choose Excel File", ["xlsx", "xls"], args.excel)
     if not excel_path:
         print("No Excel file selected.")
         return
 
     # Select PDF file
-    print("Please select the PDF form...")
-    pdf_path = select_file("Choose PDF Form", ["pdf"])
+    if not args.pdf:
+        print("Please select the PDF form...")
+    pdf_path = select_file("Choose PDF Form", ["pdf"], args.pdf)
     if not pdf_path:
         print("No PDF file selected.")
         return
@@ -1,35 +1,20 @@
+import argparse
 import json
 import os
-from AppKit import NSApplication, NSOpenPanel
-import PyPDF2
-import openai
-
-# Function to open file dialog for choosing files
-def open_file_dialog(file_types):
-    app = NSApplication.sharedApplication()
-    #app.setActivationPolicy_(2)  # NSApplicationActivationPolicyRegular
-    #app.activateIgnoringOtherApps_(True) # Bring app to front
-    
-    panel = NSOpenPanel.openPanel()
-    panel.setCanChooseDirectories_(False)
-    panel.setCanChooseFiles_(True)
-    panel.setAllowsMultipleSelection_(False)
-    panel.setAllowedFileTypes_(file_types)
-    panel.setMessage_("Please select a file")
-    app.activateIgnoringOtherApps_(True)
-    if panel.runModal() == 1:
-        return panel.URL().path()
-    return None
+
+from unir_tfm.inputs import resolve_file
+from unir_tfm.pdf_extract import extract_text
+from unir_tfm.prompt_cache import openai_cached_messages, prompt_cache_key
+from unir_tfm.llm import default_llm
+
+# Function to resolve an input file: the command line path, or a native macOS dialog
+def open_file_dialog(file_types, path=None):
+    return resolve_file(path, "Please select a file", file_types)
 
 # Function to extract text from PDF
 def extract_text_from_pdf(pdf_file):
     try:
-        with open(pdf_file, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text()
-            return text
+        return extract_text(pdf_file)
     except Exception as e:
         print(f"Error extracting text from PDF: {e}")
         return None
@@ -37,11 +22,22 @@ def extract_text_from_pdf(pdf_file):
 # Function to evaluate the thesis based on the rubric
 def evaluate_thesis_with_rubric(thesis_text, rubric):
     # Ensure OpenAI API Key is set
-    openai.api_key = os.getenv("MI_CLAVE_API_OPENAI")
-    if not openai.api_key:
+    api_key = os.getenv("MI_CLAVE_API_OPENAI")
+    if not api_key:
         print("OpenAI API key not found. Set it in your environment variables.")
         return None
 
+    # Shared long-lived client (connection pool, response cache and rate limits, see unir_tfm.llm)
+    client = default_llm("openai").client
+
+    # The thesis is a stable shared prefix (cached by the provider across
+    # subcategories); only the subcategory request at the end changes
+    instructions = (
+        "You are an academic evaluator skilled in assessing theses. "
+        "You will grade the thesis text below one rubric subcategory at a time."
+    )
+    shared_context = f"Thesis Text:\n{thesis_text}"
+
     results = {}
     try:
         for category, items in rubric.items():
@@ -49,29 +45,26 @@ def evaluate_thesis_with_rubric(thesis_text, rubric):
             for item in items:
                 subcategory = item["subcategoría"]
                 criteria = item["criterios"]
-                prompt = f"""
-                You are a thesis grader. Evaluate the following thesis text according to the rubric:
+                question = f"""
                 Subcategory: {subcategory}
-                Criteria: {json.dumps(criteria, indent=2)}
-                Thesis Text: {thesis_text}
+                Criteria: {json.dumps(criteria, indent=2, ensure_ascii=False)}
                 Provide a grade and brief feedback for this subcategory.
                 """
-                response = openai.ChatCompletion.create(
-                    model="gpt-4",  # Use "gpt-3.5-turbo" if needed
-                    messages=[
-                        {"role": "system", "content": "You are an academic evaluator skilled in assessing theses."},
-                        {"role": "user", "content": prompt},
-                    ],
+                response = client.chat.completions.create(
+                    model="gpt-4o",  # automatic prompt caching needs gpt-4o or newer
+                    messages=openai_cached_messages(instructions, shared_context, question),
                     max_tokens=300,
                     temperature=0.7,
+                    prompt_cache_key=prompt_cache_key(thesis_text),
                 )
 
                 results[category].append({
                     "subcategory": subcategory,
-                    "grade_and_feedback": response['choices'][0]['message']['content'].strip()
+                    "grade_and_feedback": response.choices[0].message.content.strip()
                 })
 
-                return results
+        print(f"Token usage: {client.usage.summary()}")
+        return results
 
     except Exception as e:
         print(f"Error evaluating thesis: {e}")
@@ -79,9 +72,15 @@ def evaluate_thesis_with_rubric(thesis_text, rubric):
 
 # Main program
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grade a thesis PDF against a JSON rubric with OpenAI")
+    parser.add_argument("rubric", nargs="?", help="Rubric JSON file (a dialog opens if omitted)")
+    parser.add_argument("thesis", nargs="?", help="Thesis PDF (a dialog opens if omitted)")
+    args = parser.parse_args()
+
     # Step 1: Choose JSON rubric file
-    print("Select the JSON rubric file.")
-    rubric_file = open_file_dialog(["json"])
+    if not args.rubric:
+        print("Select the JSON rubric file.")
+    rubric_file = open_file_dialog(["json"], args.rubric)
     if not rubric_file:
         print("No rubric file selected.")
         exit()
@@ -95,8 +94,9 @@ if __name__ == "__main__":
         exit()
 
     # Step 2: Choose PDF thesis file
-    print("Select the thesis PDF file.")
-    pdf_file = open_file_dialog(["pdf"])
+    if not args.thesis:
+        print("Select the thesis PDF file.")
+    pdf_file = open_file_dialog(["pdf"], args.thesis)
     if not pdf_file:
         print("No thesis file selected.")
         exit()
@@ -1,39 +1,107 @@
 # Standard library imports
+import argparse
+import csv
+import json
+import os
+import re
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple, Union
 from os import environ  # Only for environment variable access
 
-# Third-party imports
-import anthropic
-import json
-import PyPDF2
-import pandas as pd
-import matplotlib.pyplot as plt
-
-# macOS specific imports
-from Foundation import NSURL
-from AppKit import (
-    NSOpenPanel,
-    NSSavePanel,
-    NSDocumentDirectory,
-    NSUserDomainMask,
-    NSFileHandlingPanelOKButton
-)
+from unir_tfm.charts import boxplot_job, default_renderer, distribution_job, radar_job
+from unir_tfm.extraction_cache import cache_root, file_digest
+from unir_tfm.inputs import expand_inputs, resolve_directory, resolve_file
+from unir_tfm.journal import EvaluationJournal
+from unir_tfm import sections as sections_module
+from unir_tfm.pdf_extract import EXTRACTOR_VERSION, best_engine, stream_pages
+from unir_tfm.pipeline import Pipeline, Stage
+from unir_tfm.llm import LLMClient
+from unir_tfm.scheduler import RequestScheduler, configure_scheduler
+from unir_tfm.sections import DEFAULT_TOKEN_BUDGET, read_outline, segment_pages, segment_text, select_sections
+from unir_tfm.structured_output import request_structured, rubric_json_schema, validate_rubric_answer
+
+# Heavy imports are deferred to the code that needs them so --help and the
+# light paths start fast: anthropic in unir_tfm.llm (only without an injected
+# client, on the first API call), pandas through unir_tfm.cohort (only with history or batch charts)
+# and the macOS bridges (NSOpenPanel, ...) in unir_tfm.inputs, only when a
+# file is not given on the command line, so grading runs headless anywhere
+if TYPE_CHECKING:
+    from unir_tfm.cohort import CohortAnalytics
+
+TFM_EXTENSIONS = ('.pdf', '.docx')
+
+# subcategory: one free-text call per subcategory plus one analysis call per category
+# category: one JSON call per category (scores, justifications and analysis)
+# rubric: a single JSON call for the whole rubric
+EVALUATION_MODES = ('subcategory', 'category', 'rubric')
+
+MODEL = "claude-3-opus-20240229"
+# Longest reply MODEL can produce
+MAX_OUTPUT_TOKENS = 4096
+
+# Markdown re-rendered in the run's checkpoint directory after every journaled step
+PARTIAL_REPORT_NAME = "informe_parcial.md"
+
+
+def _answer_tokens(group: List[Tuple[str, float, List[Dict]]]) -> int:
+    """Estimated length of the JSON answer for (category name, weight, rubric entries) tuples"""
+    return 400 * sum(len(criterios) for _, _, criterios in group) + 500 * len(group)
+
 
 class UNIRDocumentGrader:
-    def __init__(self, api_key: str, historical_data_path: Optional[str] = None):
+    def __init__(self, api_key: str, historical_data_path: Optional[str] = None,
+                 max_workers: int = 4, client: Optional[object] = None, cache_responses: bool = True,
+                 section_budget: int = DEFAULT_TOKEN_BUDGET, evaluation_mode: str = 'subcategory',
+                 checkpoint_dir: Optional[str] = None, resume: bool = True, stream_output: bool = False,
+                 charts: bool = True, scheduler: Optional[RequestScheduler] = None):
         """
         Initialize the UNIR TFM grader with enhanced analytics capabilities
         
         Args:
             api_key (str): The Anthropic API key for authentication
             historical_data_path (str, optional): Path to historical evaluations JSON file
+            max_workers (int): Maximum number of concurrent API calls (1 = sequential)
+            client (object, optional): Pre-built client exposing messages.create
+                (e.g. unir_tfm.stub_client.StubAnthropicClient for offline runs)
+            cache_responses (bool): Serve repeated prompts from the persistent response cache
+            section_budget (int): Approximate tokens of thesis text sent per subcategory
+            evaluation_mode (str): One of EVALUATION_MODES; 'category' and 'rubric' score
+                several subcategories per call with a validated JSON answer
+            checkpoint_dir (str, optional): Directory of the stage checkpoints, step journals
+                and live partial reports (defaults to <cache_root>/checkpoints)
+            resume (bool): Reuse the checkpoints and journals of earlier runs of the same
+                thesis and rubric; False recomputes every stage
+            stream_output (bool): Print the final feedback (and, when max_workers is 1,
+                every evaluation) to stdout as it is generated
+            charts (bool): Render the comparative charts (in a worker process, see unir_tfm.charts)
+            scheduler (RequestScheduler, optional): Rate limits, retries and budget of the API
+                calls (defaults to the process-wide Anthropic scheduler, see unir_tfm.scheduler)
         """
-        if not api_key:
+        if client is None and not api_key:
             raise ValueError("API key cannot be empty")
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if evaluation_mode not in EVALUATION_MODES:
+            raise ValueError(f"evaluation_mode must be one of {EVALUATION_MODES}")
             
-        self.client = anthropic.Anthropic(api_key=api_key)
+        # One long-lived client: every call of the run reuses its connection pool
+        self.llm = LLMClient("anthropic", api_key=api_key, client=client, scheduler=scheduler,
+                             cache_responses=cache_responses)
+        self.scheduler = self.llm.scheduler
+        self.client = self.llm.client
+        self.max_workers = max_workers
+        self.section_budget = section_budget
+        self.evaluation_mode = evaluation_mode
+        self.checkpoint_dir = Path(checkpoint_dir) if checkpoint_dir else cache_root() / "checkpoints"
+        self.resume = resume
+        self.stream_output = stream_output
+        self.charts = charts
+        self._history_cohort = None
         self.historical_data = self.load_historical_data(historical_data_path) if historical_data_path else None
 
     
@@ -42,6 +110,10 @@ class UNIRDocumentGrader:
         """
         Grade the solution based on the rubric and return results.
         
+        The work runs as a DAG of checkpointed stages (see build_pipeline);
+        a re-run of the same thesis and rubric only recomputes the stages
+        whose code, settings or inputs changed.
+        
         Args:
             prompt (Optional[str]): Custom prompt for evaluation
             rubric_path (str): Path to the rubric JSON file
@@ -50,17 +122,75 @@ class UNIRDocumentGrader:
         Returns:
             Dict: Grading results
         """
-        # 1. Load and process the PDF content
+        pipeline = self.build_pipeline(rubric_path, solution_path)
+        run_key = f"{file_digest(solution_path)[:16]}-{file_digest(rubric_path)[:16]}"
+        print(f"Informe parcial en curso: {pipeline.run_dir(run_key) / PARTIAL_REPORT_NAME}")
+
+        def report_stage(name: str, reused: bool):
+            if reused:
+                print(f"Etapa '{name}': reutilizada desde el punto de control")
+
+        outputs = pipeline.run(run_key, reuse=self.resume, on_stage=report_stage)
+
+        # The run is complete: drop the step journals and the partial report (checkpoints stay)
+        pipeline.discard_journals(run_key)
+        (pipeline.run_dir(run_key) / PARTIAL_REPORT_NAME).unlink(missing_ok=True)
+
+        return {**outputs["aggregate"], "retroalimentacion": outputs["feedback"]["texto"]}
+
+    def build_pipeline(self, rubric_path: str, solution_path: str) -> Pipeline:
+        """
+        Grading stages: extract -> rubric -> score -> aggregate -> feedback
+        
+        The category analyses belong to the score stage: each one starts as
+        soon as the subcategories of its category are scored.
+        
+        Args:
+            rubric_path (str): Path to the rubric JSON file
+            solution_path (str): Path to the solution PDF/DOCX file
+            
+        Returns:
+            Pipeline: Pipeline checkpointed under self.checkpoint_dir
+        """
+        model_params = {"model": MODEL, "mode": self.evaluation_mode}
+        scoring_code = (
+            (self._evaluate_subcategory, self._parse_score) if self.evaluation_mode == 'subcategory'
+            else (self._evaluate_group, rubric_json_schema, validate_rubric_answer)
+        ) + (self._analyze_category, sections_module)
+        if Path(solution_path).suffix.lower() == '.docx':
+            extract_params = {"engine": "python-docx"}
+        else:
+            extract_params = {"engine": best_engine(), "extractor_version": EXTRACTOR_VERSION}
+        return Pipeline([
+            # The whole sections module is hashed: segmentation and section selection define both stages
+            Stage("extract", partial(self._stage_extract, solution_path), params=extract_params, code=(sections_module,)),
+            Stage("rubric", partial(self._stage_rubric, rubric_path)),
+            Stage("score", self._stage_score, deps=("extract", "rubric"),
+                  params={**model_params, "section_budget": self.section_budget}, code=scoring_code),
+            Stage("aggregate", self._stage_aggregate, deps=("rubric", "score")),
+            Stage("feedback", self._stage_feedback, deps=("aggregate",), params=model_params)
+        ], self.checkpoint_dir)
+
+    def _stage_extract(self, solution_path: str, inputs: Dict, journal: EvaluationJournal) -> List[Dict]:
+        """Load the PDF (or DOCX) content and split it into sections"""
         try:
-            with open(solution_path, 'rb') as pdf_file:
-                pdf_reader = PyPDF2.PdfReader(pdf_file)
-                content = ""
-                for page in pdf_reader.pages:
-                    content += page.extract_text()
+            if Path(solution_path).suffix.lower() == '.docx':
+                import docx
+                content = "\n".join(para.text for para in docx.Document(solution_path).paragraphs)
+                return segment_text(content)
+
+            try:
+                outline = read_outline(solution_path)
+            except Exception as e:
+                print(f"Warning: Could not read PDF outline: {str(e)}")
+                outline = []
+            # Pages are segmented as they are read; no page list or layout is kept around
+            return segment_pages(stream_pages(solution_path), outline)
         except Exception as e:
-            raise Exception(f"Error processing PDF: {str(e)}")
+            raise Exception(f"Error processing document: {str(e)}")
 
-        # 2. Load the rubric
+    def _stage_rubric(self, rubric_path: str, inputs: Dict, journal: EvaluationJournal) -> List[Tuple[str, float, List[Dict]]]:
+        """Load the rubric as (category name, weight, subcategories) in rubric order"""
         try:
             with open(rubric_path, 'r', encoding='utf-8') as f:
                 try:
@@ -76,117 +206,349 @@ class UNIRDocumentGrader:
         except Exception as e:
             raise Exception(f"Error loading rubric: {str(e)}")
 
-        # 3. Initialize results structure
+        categories = []
+        for categoria, criterios in rubric.items():
+            category_name = categoria.split(" (")[0]
+            weight = float(categoria.split("(")[1].replace("%)", "")) / 100
+            categories.append((category_name, weight, criterios))
+        return categories
+
+    def _stage_score(self, inputs: Dict, journal: EvaluationJournal) -> Dict[str, Dict]:
+        """
+        Score the rubric (per subcategory or grouped in JSON calls, see EVALUATION_MODES).
+        
+        Returns:
+            Dict[str, Dict]: Category name -> {'subcategorias': {name: score}, 'analisis': text, ...};
+                the JSON modes also return 'justificaciones'
+        """
+        # Checkpointed sections come back as plain dicts; select_sections needs Counters
+        sections = [{**section, "terms": Counter(section["terms"])} for section in inputs["extract"]]
+        categories = inputs["rubric"]
+
+        if self.evaluation_mode == 'subcategory':
+            return self._score_per_subcategory(categories, sections, journal)
+        return self._evaluate_structured(categories, sections, journal)
+
+    def _stage_aggregate(self, inputs: Dict, journal: EvaluationJournal) -> Dict:
+        """Weighted final score and per-category results in rubric order"""
         results = {
             "puntuacion_total": 0,
             "categorias": {},
             "retroalimentacion": ""
         }
 
-        # 4. Evaluate each category using Anthropic API
         total_score = 0
-        total_weight = 0
+        for category_name, weight, criterios in inputs["rubric"]:
+            evaluated = inputs["score"][category_name]
+            category_scores = self._ordered_scores(evaluated["subcategorias"], criterios)
+            category_score = sum(category_scores.values()) / len(category_scores)
+            total_score += category_score * weight
 
-        for categoria, criterios in rubric.items():
-            category_name = categoria.split(" (")[0]
-            weight = float(categoria.split("(")[1].replace("%)", "")) / 100
-            total_weight += weight
-            
-            category_results = {
-                "analisis": "",
-                "subcategorias": {}
+            results["categorias"][category_name] = {
+                **evaluated,
+                "subcategorias": category_scores
             }
 
-            for subcategoria in criterios:
-                # Prepare the evaluation prompt for Claude
-                evaluation_prompt = f"""
-                Evalúa el siguiente trabajo académico para la subcategoría '{subcategoria['subcategoría']}' 
-                según estos criterios:
-
-                Suspenso (0-4): {subcategoria['criterios']['Suspenso (0-4)']}
-                Aprobado (5-6): {subcategoria['criterios']['Aprobado (5-6)']}
-                Notable (7-8): {subcategoria['criterios']['Notable (7-8)']}
-                Sobresaliente (9-10): {subcategoria['criterios']['Sobresaliente (9-10)']}
-
-                Contenido a evaluar:
-                {content[:4000]}  # Limiting content length for API
-
-                Por favor, proporciona:
-                1. Una puntuación numérica (0-10)
-                2. Una justificación detallada
-                3. Recomendaciones específicas de mejora
-                """
-
-                # Get evaluation from Claude
-                response = self.client.messages.create(
-                    model="claude-3-opus-20240229",
-                    max_tokens=1000,
-                    temperature=0.3,
-                    messages=[
-                        {"role": "user", "content": evaluation_prompt}
-                    ]
-                )
-
-                # Process Claude's response
-                evaluation = response.content[0].text
-                
-                # Extract score using simple heuristic (first number found)
-                import re
-                score_match = re.search(r'\b([0-9]|10)(\.[0-9])?\b', evaluation)
-                score = float(score_match.group()) if score_match else 5.0
-
-                # Store subcategory results
-                category_results["subcategorias"][subcategoria['subcategoría']] = score
-
-            # Calculate category average
-            category_score = sum(category_results["subcategorias"].values()) / len(category_results["subcategorias"])
-            total_score += category_score * weight
-
-            # Generate category analysis
-            category_analysis_prompt = f"""
-            Basándote en las siguientes puntuaciones de subcategorías para {category_name}:
-            {category_results['subcategorias']}
-            
-            Proporciona un análisis general de 2-3 párrafos sobre el desempeño en esta categoría,
-            destacando fortalezas y áreas de mejora.
-            """
-
-            analysis_response = self.client.messages.create(
-                model="claude-3-opus-20240229",
-                max_tokens=500,
-                temperature=0.3,
-                messages=[
-                    {"role": "user", "content": category_analysis_prompt}
-                ]
-            )
-
-            category_results["analisis"] = analysis_response.content[0].text
-            results["categorias"][category_name] = category_results
-
-        # Calculate final score
         results["puntuacion_total"] = round(total_score, 2)
+        return results
 
-        # Generate overall feedback
+    def _stage_feedback(self, inputs: Dict, journal: EvaluationJournal) -> Dict[str, str]:
+        """Generate overall feedback"""
         feedback_prompt = f"""
-        Basándote en la evaluación completa con puntuación final de {results['puntuacion_total']}/10,
+        Basándote en la evaluación completa con puntuación final de {inputs['aggregate']['puntuacion_total']}/10,
         proporciona una retroalimentación general constructiva que:
         1. Resuma las principales fortalezas
         2. Identifique las áreas críticas de mejora
         3. Proporcione recomendaciones específicas y accionables
         """
 
-        feedback_response = self.client.messages.create(
-            model="claude-3-opus-20240229",
-            max_tokens=800,
+        feedback_request = {
+            "model": MODEL,
+            "max_tokens": 800,
+            "temperature": 0.3,
+            "messages": [
+                {"role": "user", "content": feedback_prompt}
+            ]
+        }
+        return self._journaled(
+            journal, "retroalimentacion", "general",
+            lambda: {"texto": self._complete(feedback_request, echo=True)}
+        )
+
+    def _journaled(self, journal: EvaluationJournal, kind: str, key: str, compute: Callable[[], Dict]) -> Dict:
+        """Return the journaled result of a step, computing and appending it if missing"""
+        data = journal.get(kind, key)
+        if data is None:
+            data = compute()
+            journal.append(kind, key, data)
+            self._write_partial_report(journal.path.parent)
+        return data
+
+    def _write_partial_report(self, run_dir: Path):
+        """Re-render the Markdown of the steps journaled so far in a run (atomic replace)"""
+        lines = ["# Evaluación en curso", ""]
+        journal_paths = sorted(run_dir.glob("*.jsonl"), key=lambda path: path.stat().st_mtime_ns)
+        for kind, key, data in (item for path in journal_paths for item in EvaluationJournal(path).items()):
+            if kind == "subcategoria":
+                lines.append(f"- **{key}**: {data['puntuacion']}/10")
+            elif kind == "analisis":
+                lines.extend(["", f"## Análisis: {key}", data["texto"], ""])
+            elif kind == "grupo":
+                for category_name, evaluated in data.items():
+                    lines.extend(["", f"## {category_name}", evaluated["analisis"], ""])
+                    lines.extend(f"- **{name}**: {score}/10" for name, score in evaluated["subcategorias"].items())
+            elif kind == "retroalimentacion":
+                lines.extend(["", "## Observaciones Finales", data["texto"]])
+
+        fd, tmp_path = tempfile.mkstemp(dir=run_dir, suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, run_dir / PARTIAL_REPORT_NAME)
+
+    def _complete(self, request: Dict, echo: bool = False) -> str:
+        """
+        Run one messages call and return its text.
+        
+        With echo (and stream_output enabled) the reply is streamed to
+        stdout as it is generated.
+        """
+        if echo and self.stream_output and hasattr(self.client.messages, "stream"):
+            with self.client.messages.stream(**request) as stream:
+                for text in stream.text_stream:
+                    print(text, end="", flush=True)
+                print()
+                return stream.get_final_message().content[0].text
+
+        return self.client.messages.create(**request).content[0].text
+
+    def _score_per_subcategory(self, categories: List[Tuple[str, float, List[Dict]]],
+                               sections: List[Dict], journal: EvaluationJournal) -> Dict[str, Dict]:
+        """
+        Evaluate every subcategory concurrently, and analyse each category as
+        soon as its own subcategories are scored (on the same pool, so the
+        analysis of one category overlaps the scoring of the others). Steps
+        already in the journal are reused and every new one is appended to it.
+        
+        Returns:
+            Dict[str, Dict]: Category name -> {'subcategorias': {name: score}, 'analisis': text}
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {}
+            pending = {}
+            for category_name, _, criterios in categories:
+                pending[category_name] = len(criterios)
+                for subcategoria in criterios:
+                    key = f"{category_name}/{subcategoria['subcategoría']}"
+                    compute = partial(self._evaluate_subcategory, subcategoria, sections)
+                    future = executor.submit(self._journaled, journal, "subcategoria", key, compute)
+                    futures[future] = (category_name, subcategoria['subcategoría'])
+
+            criterios_by_category = {category_name: criterios for category_name, _, criterios in categories}
+            scores = {category_name: {"subcategorias": {}} for category_name, _, _ in categories}
+            analyses = {}
+            for future in as_completed(futures):
+                category_name, subcategory_name = futures[future]
+                scores[category_name]["subcategorias"][subcategory_name] = future.result()["puntuacion"]
+                pending[category_name] -= 1
+                if not pending[category_name]:
+                    ordered = self._ordered_scores(scores[category_name]["subcategorias"],
+                                                   criterios_by_category[category_name])
+                    compute = partial(self._analyze_category, category_name, ordered)
+                    analyses[category_name] = executor.submit(
+                        self._journaled, journal, "analisis", category_name,
+                        lambda compute=compute: {"texto": compute()}
+                    )
+
+            for category_name, future in analyses.items():
+                scores[category_name]["analisis"] = future.result()["texto"]
+            return scores
+
+    def _evaluate_structured(self, categories: List[Tuple[str, float, List[Dict]]],
+                             sections: List[Dict], journal: EvaluationJournal) -> Dict[str, Dict]:
+        """
+        Score the rubric with JSON calls: one per category ('category' mode,
+        run concurrently) or one for the whole rubric ('rubric' mode). A rubric
+        whose answer would not fit in MAX_OUTPUT_TOKENS is scored per category.
+        
+        Returns:
+            Dict[str, Dict]: Category name -> {'analisis', 'subcategorias', 'justificaciones'}
+        """
+        groups = [[category] for category in categories] if self.evaluation_mode == 'category' else [categories]
+        if len(groups) == 1 and len(categories) > 1 and _answer_tokens(categories) > MAX_OUTPUT_TOKENS:
+            print(f"La rúbrica completa no cabe en una respuesta ({_answer_tokens(categories)} tokens estimados > "
+                  f"{MAX_OUTPUT_TOKENS}): se evalúa por categorías")
+            groups = [[category] for category in categories]
+
+        evaluations = {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(groups))) as executor:
+            futures = [
+                executor.submit(self._journaled, journal, "grupo", "+".join(name for name, _, _ in group),
+                                partial(self._evaluate_group, group, sections))
+                for group in groups
+            ]
+            for future in futures:
+                evaluations.update(future.result())
+        return evaluations
+
+    def _evaluate_group(self, group: List[Tuple[str, float, List[Dict]]], sections: List[Dict]) -> Dict[str, Dict]:
+        """
+        Score all subcategories of one or more categories in a single call.
+        
+        The answer must follow rubric_json_schema; invalid replies are sent
+        back with the validation errors and retried (see request_structured).
+        
+        Args:
+            group (List[Tuple[str, float, List[Dict]]]): (category name, weight, rubric entries)
+            sections (List[Dict]): TFM sections from unir_tfm.sections
+            
+        Returns:
+            Dict[str, Dict]: Validated evaluation per category
+        """
+        names = [(category_name, [sub['subcategoría'] for sub in criterios]) for category_name, _, criterios in group]
+        subcategorias = [sub for _, _, criterios in group for sub in criterios]
+
+        # The excerpt grows with the number of subcategories scored in the call
+        query = " ".join(
+            f"{sub['subcategoría']} " + " ".join(str(text) for text in sub['criterios'].values())
+            for sub in subcategorias
+        )
+        excerpt = select_sections(sections, query, self.section_budget * len(subcategorias))
+
+        rubric_lines = []
+        for category_name, _, criterios in group:
+            rubric_lines.append(f"Categoría '{category_name}':")
+            for sub in criterios:
+                rubric_lines.append(f"- Subcategoría '{sub['subcategoría']}':")
+                rubric_lines.extend(f"    {level}: {text}" for level, text in sub['criterios'].items())
+        rubric_text = "\n".join(rubric_lines)
+        schema = json.dumps(rubric_json_schema(names), ensure_ascii=False, indent=2)
+
+        evaluation_prompt = f"""Evalúa el siguiente trabajo académico según esta rúbrica:
+
+{rubric_text}
+
+Contenido a evaluar (secciones relevantes del trabajo):
+{excerpt}
+
+Para cada subcategoría asigna una puntuación numérica (0-10) acorde a los niveles de la rúbrica,
+con una justificación breve y recomendaciones específicas de mejora. Para cada categoría
+redacta además un análisis general de 1-2 párrafos con sus fortalezas y áreas de mejora.
+
+Responde únicamente con un objeto JSON que cumpla este esquema, usando exactamente
+los nombres de categorías y subcategorías indicados:
+<esquema>
+{schema}
+</esquema>"""
+
+        return request_structured(
+            self.client,
+            {
+                "model": MODEL,
+                "max_tokens": min(MAX_OUTPUT_TOKENS, _answer_tokens(group)),
+                "temperature": 0.3,
+                "messages": [{"role": "user", "content": evaluation_prompt}]
+            },
+            lambda data: validate_rubric_answer(data, names)
+        )
+
+    def _evaluate_subcategory(self, subcategoria: Dict, sections: List[Dict]) -> Dict:
+        """
+        Score a single rubric subcategory with one API call.
+        
+        Args:
+            subcategoria (Dict): Rubric entry with 'subcategoría' and 'criterios'
+            sections (List[Dict]): TFM sections from unir_tfm.sections
+            
+        Returns:
+            Dict: 'puntuacion' (numeric score) and 'evaluacion' (full reply text)
+        """
+        # Send only the sections relevant to this subcategory, within the token budget
+        criteria_text = " ".join(str(text) for text in subcategoria['criterios'].values())
+        excerpt = select_sections(sections, f"{subcategoria['subcategoría']} {criteria_text}", self.section_budget)
+
+        # Prepare the evaluation prompt for Claude
+        evaluation_prompt = f"""
+        Evalúa el siguiente trabajo académico para la subcategoría '{subcategoria['subcategoría']}' 
+        según estos criterios:
+
+        Suspenso (0-4): {subcategoria['criterios']['Suspenso (0-4)']}
+        Aprobado (5-6): {subcategoria['criterios']['Aprobado (5-6)']}
+        Notable (7-8): {subcategoria['criterios']['Notable (7-8)']}
+        Sobresaliente (9-10): {subcategoria['criterios']['Sobresaliente (9-10)']}
+
+        Contenido a evaluar (secciones relevantes del trabajo):
+        {excerpt}
+
+        Por favor, proporciona:
+        1. Una puntuación numérica (0-10)
+        2. Una justificación detallada
+        3. Recomendaciones específicas de mejora
+        """
+
+        # Get evaluation from Claude (streamed to stdout only when calls run one at a time)
+        evaluation = self._complete({
+            "model": MODEL,
+            "max_tokens": 1000,
+            "temperature": 0.3,
+            "messages": [
+                {"role": "user", "content": evaluation_prompt}
+            ]
+        }, echo=self.max_workers == 1)
+
+        return {
+            "puntuacion": self._parse_score(evaluation, subcategoria['subcategoría']),
+            "evaluacion": evaluation
+        }
+
+    @staticmethod
+    def _parse_score(evaluation: str, subcategory_name: str = "") -> float:
+        """
+        Extract the 0-10 score from a free-text evaluation.
+        
+        Labelled scores ("Puntuación: 8", "8/10") win over bare numbers;
+        list markers such as "1." and ranges such as "(0-10)" are skipped.
+        """
+        score = r'(10(?:[.,]0)?|[0-9](?:[.,][0-9])?)'
+        for pattern in (rf'puntuaci[oó]n[^0-9\n]{{0,40}}{score}(?![0-9-])', rf'(?<![0-9.,-]){score}\s*/\s*10\b'):
+            match = re.search(pattern, evaluation, re.IGNORECASE)
+            if match:
+                return float(match.group(1).replace(',', '.'))
+
+        for match in re.finditer(rf'(?<![0-9.,-]){score}(?![0-9-])', evaluation):
+            line_start = evaluation.rfind('\n', 0, match.start()) + 1
+            is_list_marker = (not evaluation[line_start:match.start()].strip()
+                              and evaluation[match.end():match.end() + 1] in ('.', ')'))
+            if not is_list_marker:
+                return float(match.group(1).replace(',', '.'))
+
+        print(f"Warning: No score found for '{subcategory_name}', using 5.0")
+        return 5.0
+
+    def _analyze_category(self, category_name: str, subcategory_scores: Dict[str, float]) -> str:
+        """Generate the narrative analysis of a category from its subcategory scores"""
+        category_analysis_prompt = f"""
+        Basándote en las siguientes puntuaciones de subcategorías para {category_name}:
+        {subcategory_scores}
+        
+        Proporciona un análisis general de 2-3 párrafos sobre el desempeño en esta categoría,
+        destacando fortalezas y áreas de mejora.
+        """
+
+        analysis_response = self.client.messages.create(
+            model=MODEL,
+            max_tokens=500,
             temperature=0.3,
             messages=[
-                {"role": "user", "content": feedback_prompt}
+                {"role": "user", "content": category_analysis_prompt}
             ]
         )
 
-        results["retroalimentacion"] = feedback_response.content[0].text
+        return analysis_response.content[0].text
 
-        return results
+    @staticmethod
+    def _ordered_scores(scores: Dict[str, float], criterios: List[Dict]) -> Dict[str, float]:
+        """Return subcategory scores in the order they appear in the rubric"""
+        return {sub['subcategoría']: scores[sub['subcategoría']] for sub in criterios}
         
     def load_historical_data(self, file_path: str) -> List[Dict]:
         """Load historical evaluation data for comparative analysis"""
@@ -200,118 +562,94 @@ class UNIRDocumentGrader:
             return []
 
     def perform_trend_analysis(self, current_results: Dict) -> Dict:
-        """Analyze trends and patterns in evaluations over time"""
+        """Analyze trends and patterns in evaluations over time (see unir_tfm.cohort)"""
         if not self.historical_data:
             return {}
-            
-        all_evaluations = self.historical_data + [current_results]
-        df = pd.DataFrame([
-            {
-                'fecha': eval.get('fecha', 'Unknown'),
-                'puntuacion_total': eval['puntuacion_total'],
-                **{f"{cat}_{subcat}": score 
-                   for cat, data in eval['categorias'].items()
-                   for subcat, score in data['subcategorias'].items()}
-            }
-            for eval in all_evaluations
-        ])
+
+        from unir_tfm.cohort import CohortAnalytics
+        cohort = CohortAnalytics.from_evaluations(self.historical_data + [current_results])
+        return cohort.position(current_results)
+
+    def history_cohort(self) -> Optional["CohortAnalytics"]:
+        """Historical evaluations as a cohort frame (built once per grader)"""
+        if not self.historical_data:
+            return None
+        if self._history_cohort is None:
+            from unir_tfm.cohort import CohortAnalytics
+            self._history_cohort = CohortAnalytics.from_evaluations(self.historical_data)
+        return self._history_cohort
+
+    def chart_jobs(self, results: Dict, output_dir: str, student: Optional[str] = None) -> List[Dict]:
+        """
+        Describe the comparative charts of one evaluation (rendered later, see unir_tfm.charts)
         
-        analysis = {
-            'tendencias': {
-                'promedio_historico': df['puntuacion_total'].mean(),
-                'desviacion_estandar': df['puntuacion_total'].std(),
-                'percentil': (df['puntuacion_total'] <= current_results['puntuacion_total']).mean() * 100
-            },
-            'comparativa_categorias': {}
+        Args:
+            results (Dict): Grading results
+            output_dir (str): Directory that receives the 'visualizaciones' folder
+            student (str, optional): Suffix of the file names (batch runs)
+            
+        Returns:
+            List[Dict]: Radar of the category averages, plus the score distribution and
+                subcategory boxplots against the history when there is one
+        """
+        vis_dir = Path(output_dir) / 'visualizaciones'
+        suffix = f"_{student}" if student else ""
+        cohort = self.history_cohort()
+
+        averages = {
+            categoria: sum(datos['subcategorias'].values()) / len(datos['subcategorias'])
+            for categoria, datos in results['categorias'].items() if datos['subcategorias']
         }
-        
-        for categoria in current_results['categorias'].keys():
-            cat_cols = [col for col in df.columns if col.startswith(f"{categoria}_")]
-            analysis['comparativa_categorias'][categoria] = {
-                'promedio_historico': df[cat_cols].mean().mean(),
-                'posicion_relativa': 'Por encima del promedio' if df[cat_cols].mean().mean() < current_results['categorias'][categoria]['subcategorias']['puntuacion_total'] else 'Por debajo del promedio'
+        reference = None
+        if cohort is not None:
+            means = cohort.distributions()["media"]
+            reference = {categoria: float(means[categoria]) for categoria in averages if categoria in means}
+        # No radar without category averages (every category failed, or an empty rubric)
+        jobs = [radar_job(vis_dir / f"radar_categorias{suffix}.png", averages, reference)] if averages else []
+
+        if cohort is not None:
+            from unir_tfm.cohort import SEPARATOR
+            jobs.append(distribution_job(
+                vis_dir / f"distribucion_calificaciones{suffix}.png",
+                cohort.frame["total"].tolist(), [results['puntuacion_total']]
+            ))
+            current = {
+                f"{categoria}{SEPARATOR}{sub}": score
+                for categoria, datos in results['categorias'].items() for sub, score in datos['subcategorias'].items()
             }
-            
-        return analysis
+            series = {name: cohort.frame[name].dropna().tolist() for name in current if name in cohort.frame}
+            if series:
+                jobs.append(boxplot_job(vis_dir / f"subcategorias{suffix}.png", series, current))
+        return jobs
 
     def generate_comparative_visuals(self, results: Dict, output_dir: str):
-        """Generate visual comparisons with historical data"""
-        if not self.historical_data:
-            return
-            
-        vis_dir = Path(output_dir) / 'visualizaciones'
-        vis_dir.mkdir(exist_ok=True)
-        
-        plt.figure(figsize=(10, 6))
-        historical_scores = [eval['puntuacion_total'] for eval in self.historical_data]
-        plt.hist(historical_scores, bins=10, alpha=0.5, label='Histórico')
-        plt.axvline(results['puntuacion_total'], color='r', linestyle='dashed', label='Evaluación actual')
-        plt.title('Distribución de Calificaciones TFM')
-        plt.xlabel('Puntuación')
-        plt.ylabel('Frecuencia')
-        plt.legend()
-        plt.savefig(vis_dir / 'distribucion_calificaciones.png')
-        plt.close()
-
-    def select_files(self) -> Tuple[str, str, str]:
+        """Generate visual comparisons with historical data (rendered in a worker process)"""
+        default_renderer().render(self.chart_jobs(results, output_dir))
+
+    def select_files(self, solution_path: Optional[str] = None, rubric_path: Optional[str] = None,
+                     output_dir: Optional[str] = None) -> Tuple[str, str, str]:
         """
-        Opens native macOS file dialogs to select the PDF exercise and rubric JSON files.
+        Resolve the thesis, rubric JSON and output directory (see unir_tfm.inputs).
+        
+        Whatever is not given on the command line is chosen in a native macOS
+        dialog when available, or asked for in the terminal otherwise.
         
         Returns:
-            Tuple[str, str, str]: Paths to the selected PDF file, JSON file, and output directory
+            Tuple[str, str, str]: Paths to the thesis (PDF/DOCX), rubric JSON file and output directory
         """
-        def create_file_dialog(title: str, file_types: List[str]) -> NSOpenPanel:
-            panel = NSOpenPanel.alloc().init()
-            panel.setTitle_(title)
-            panel.setCanChooseFiles_(True)
-            panel.setCanChooseDirectories_(False)
-            panel.setAllowsMultipleSelection_(False)
-            panel.setAllowedFileTypes_(file_types)
-            return panel
-
-        # Select PDF file
-        pdf_panel = create_file_dialog("Select Student's PDF Exercise", ["pdf"])
-        pdf_result = pdf_panel.runModal()
-        
-        if pdf_result != NSFileHandlingPanelOKButton:
-            raise ValueError("No PDF file selected")
-        
-        pdf_path = pdf_panel.URLs()[0].path()
+        solution_path = resolve_file(solution_path, "Select Student's TFM (PDF/DOCX)", TFM_EXTENSIONS)
+        if not solution_path:
+            raise ValueError("No thesis file selected")
 
-        # Select JSON rubric file
-        json_panel = create_file_dialog("Select Rubric JSON File", ["json"])
-        json_result = json_panel.runModal()
-        
-        if json_result != NSFileHandlingPanelOKButton:
+        rubric_path = resolve_file(rubric_path, "Select Rubric JSON File", [".json"])
+        if not rubric_path:
             raise ValueError("No JSON file selected")
-        
-        json_path = json_panel.URLs()[0].path()
-
-        # Select output directory
-        dir_panel = NSOpenPanel.alloc().init()
-        dir_panel.setTitle_("Select Output Directory")
-        dir_panel.setCanChooseFiles_(False)
-        dir_panel.setCanChooseDirectories_(True)
-        dir_panel.setAllowsMultipleSelection_(False)
-        
-        if dir_panel.runModal() != NSFileHandlingPanelOKButton:
-            raise ValueError("No output directory selected")
-        
-        output_dir = dir_panel.URLs()[0].path()
 
-        # Verify files exist and are readable
-        pdf_path_obj = Path(pdf_path)
-        json_path_obj = Path(json_path)
-        output_dir_obj = Path(output_dir)
-
-        if not pdf_path_obj.is_file():
-            raise FileNotFoundError(f"PDF file not found: {pdf_path}")
-        if not json_path_obj.is_file():
-            raise FileNotFoundError(f"JSON file not found: {json_path}")
-        if not output_dir_obj.is_dir():
-            raise NotADirectoryError(f"Output directory not found: {output_dir}")
+        output_dir = resolve_directory(output_dir, "Select Output Directory", create=True)
+        if not output_dir:
+            raise ValueError("No output directory selected")
 
-        return pdf_path, json_path, output_dir
+        return solution_path, rubric_path, output_dir
     
     def generate_markdown_report(self, results: Dict) -> str:
         """
@@ -429,13 +767,18 @@ class UNIRDocumentGrader:
 
         return "\n".join(md_content)
 
-    def save_results(self, results: Dict, output_dir: str) -> Tuple[Path, Path]:
+    def save_results(self, results: Dict, output_dir: str, student: Optional[str] = None,
+                     charts: Optional[bool] = None) -> Tuple[Path, Path]:
         """
         Save grading results in both JSON and Markdown formats
         
         Args:
             results (Dict): Grading results to save
             output_dir (str): Directory path for output files
+            student (str, optional): Student identifier added to the file names
+                (keeps batch outputs written in the same second apart)
+            charts (bool, optional): Render the charts now (defaults to self.charts; batch
+                runs pass False and render every chart at the end in one pass)
             
         Returns:
             Tuple[Path, Path]: Paths to the saved JSON and Markdown files
@@ -443,7 +786,7 @@ class UNIRDocumentGrader:
         try:
             output_path = Path(output_dir)
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            base_filename = f"evaluacion_tfm_{timestamp}"
+            base_filename = f"evaluacion_tfm_{student}_{timestamp}" if student else f"evaluacion_tfm_{timestamp}"
             
             # Save JSON results
             json_path = output_path / f"{base_filename}.json"
@@ -456,10 +799,8 @@ class UNIRDocumentGrader:
             with markdown_path.open('w', encoding='utf-8') as f:
                 f.write(markdown_content)
 
-            # Create visualizations if historical data exists
-            if self.historical_data:
-                vis_dir = output_path / 'visualizaciones'
-                vis_dir.mkdir(exist_ok=True)
+            # Create visualizations
+            if self.charts if charts is None else charts:
                 self.generate_comparative_visuals(results, str(output_path))
 
             return json_path, markdown_path
@@ -468,19 +809,182 @@ class UNIRDocumentGrader:
             raise Exception(f"Error saving results: {str(e)}")
 
 
+def grade_batch(grader: UNIRDocumentGrader, inputs: Union[str, List[str]], rubric_path: str,
+                output_dir: str, workers: int = 2) -> Path:
+    """
+    Grade a set of TFMs (PDF/DOCX) with the same rubric.
+    
+    Theses are graded on a bounded worker pool; a failure in one thesis is
+    reported and recorded in the summary instead of aborting the run.
+    
+    Args:
+        grader (UNIRDocumentGrader): Configured grader (its max_workers applies per thesis)
+        inputs (str | List[str]): Submissions: files, globs, directories or '@manifest'
+            files (see unir_tfm.inputs.expand_inputs)
+        rubric_path (str): Path to the rubric JSON file
+        output_dir (str): Directory for per-student reports and the summary CSV
+        workers (int): Number of theses graded at the same time
+        
+    Returns:
+        Path: Path to the consolidated summary CSV
+    """
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    specs = [inputs] if isinstance(inputs, str) else list(inputs)
+    submissions = [Path(path) for path in expand_inputs(specs, TFM_EXTENSIONS)]
+    if not submissions:
+        raise FileNotFoundError(f"No PDF/DOCX files found in {' '.join(specs)}")
+
+    # Theses gathered from several folders may share a file name
+    stem_counts = Counter(path.stem for path in submissions)
+    students = {
+        path: path.stem if stem_counts[path.stem] == 1 else f"{path.parent.name}_{path.stem}"
+        for path in submissions
+    }
+    graded = {}
+
+    def grade_one(path: Path) -> Dict:
+        results = grader.grade_solution(None, rubric_path, str(path))
+        # Charts are rendered for the whole batch at the end
+        json_path, markdown_path = grader.save_results(results, str(output_path), student=students[path], charts=False)
+        graded[path] = results
+        return {
+            "alumno": students[path],
+            "archivo": path.name,
+            "estado": "ok",
+            "puntuacion_total": results["puntuacion_total"],
+            **{
+                categoria: round(sum(datos["subcategorias"].values()) / len(datos["subcategorias"]), 2)
+                for categoria, datos in results["categorias"].items()
+            },
+            "json": str(json_path),
+            "markdown": str(markdown_path),
+            "error": ""
+        }
+
+    print(f"Evaluando {len(submissions)} TFM con {workers} procesos en paralelo...")
+    rows = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(grade_one, path): path for path in submissions}
+        for done, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                rows[path] = future.result()
+                print(f"[{done}/{len(submissions)}] ✅ {path.name}: {rows[path]['puntuacion_total']}/10")
+            except Exception as e:
+                rows[path] = {"alumno": students[path], "archivo": path.name, "estado": "error", "error": str(e)}
+                print(f"[{done}/{len(submissions)}] ❌ {path.name}: {e}")
+
+    # Consolidated summary, one row per submission in input order
+    ordered_rows = [rows[path] for path in submissions]
+    fieldnames = ["alumno", "archivo", "estado", "puntuacion_total"]
+    for row in ordered_rows:
+        fieldnames.extend(key for key in row if key not in fieldnames and key not in ("json", "markdown", "error"))
+    fieldnames.extend(["json", "markdown", "error"])
+
+    summary_path = output_path / f"resumen_tribunal_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    with summary_path.open('w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(ordered_rows)
+
+    if grader.charts and graded:
+        batch_results = [graded[path] for path in submissions if path in graded]
+        jobs = [job for path in submissions if path in graded
+                for job in grader.chart_jobs(graded[path], str(output_path), student=students[path])]
+        jobs.extend(batch_chart_jobs(batch_results, output_path / 'visualizaciones', grader.history_cohort()))
+        print(f"Generando {len(jobs)} gráficos...")
+        default_renderer().render(jobs)
+
+    failed = sum(1 for row in ordered_rows if row["estado"] != "ok")
+    print(f"Resumen guardado en {summary_path} ({len(ordered_rows) - failed} correctos, {failed} con errores)")
+    return summary_path
+
+
+def batch_chart_jobs(batch_results: List[Dict], vis_dir: Path,
+                     history: Optional["CohortAnalytics"] = None) -> List[Dict]:
+    """Charts of a whole batch: score distribution (against the history) and subcategory boxplots"""
+    from unir_tfm.cohort import CohortAnalytics
+
+    cohort = CohortAnalytics.from_evaluations(batch_results)
+    historical = history.frame["total"].tolist() if history is not None else []
+    return [
+        distribution_job(vis_dir / "distribucion_lote.png", historical, cohort.frame["total"].tolist(),
+                         title='Distribución de Calificaciones del lote'),
+        boxplot_job(vis_dir / "subcategorias_lote.png",
+                    {name: cohort.frame[name].dropna().tolist() for name in cohort.subcategories},
+                    title='Puntuaciones del lote por subcategoría')
+    ]
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="UNIR TFM grader")
+    parser.add_argument("thesis", nargs="?", help="Thesis to grade (PDF/DOCX); chosen in a dialog or asked if omitted")
+    parser.add_argument("--batch", nargs="+", metavar="INPUT",
+                        help="Grade every PDF/DOCX given as files, globs, directories or @manifest files")
+    parser.add_argument("--rubric", metavar="JSON", help="Rubric JSON file (required with --batch)")
+    parser.add_argument("--output", metavar="DIR",
+                        help="Output directory (defaults to the batch directory when --batch is a single directory)")
+    parser.add_argument("--workers", type=int, default=2, help="Theses graded at the same time")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent API calls per thesis")
+    parser.add_argument("--no-charts", dest="charts", action="store_false", help="Skip the comparative charts")
+    parser.add_argument("--stream", action="store_true", help="Print the feedback as it is generated")
+    parser.add_argument("--restart", action="store_true", help="Ignore checkpoints and journals of earlier runs")
+    parser.add_argument("--mode", choices=EVALUATION_MODES, default="subcategory",
+                        help="subcategory: one call per subcategory; category/rubric: one JSON call per category/rubric")
+    limits = parser.add_argument_group("API limits (default to the UNIR_TFM_* environment variables)")
+    limits.add_argument("--rpm", type=float, help="Requests per minute allowed by the account")
+    limits.add_argument("--tpm", type=float, help="Input + output tokens per minute allowed by the account")
+    limits.add_argument("--max-in-flight", type=int, help="API calls in flight across all theses")
+    limits.add_argument("--budget-tokens", type=int, help="Stop the run before it spends more tokens than this")
+    limits.add_argument("--budget-usd", type=float, help="Stop the run once it has spent this many dollars")
+    args = parser.parse_args(argv)
+    if args.batch and not args.rubric:
+        parser.error("--rubric is required with --batch")
+    if args.batch and args.thesis:
+        parser.error("give either a thesis or --batch, not both")
+    if args.batch and not args.output:
+        if len(args.batch) != 1 or not Path(args.batch[0]).is_dir():
+            parser.error("--output is required unless --batch is a single directory")
+        args.output = args.batch[0]
+    return args
+
+
 def main():
+    args = parse_args()
+
     # Get API key from environment variable
     api_key = environ.get("MI_CLAVE_API_ANTROPIC")
     
     if not api_key:
         raise ValueError("Anthropic API key not found in environment variables")
+
+    # One scheduler for every thesis of the run, so --workers x --concurrency stays within the limits
+    scheduler = configure_scheduler("anthropic", requests_per_minute=args.rpm, tokens_per_minute=args.tpm,
+                                    max_in_flight=args.max_in_flight, budget_tokens=args.budget_tokens,
+                                    budget_usd=args.budget_usd)
     
+    # Headless batch mode over a whole tribunal folder
+    if args.batch:
+        # Streams of theses graded in parallel would interleave on stdout
+        grader = UNIRDocumentGrader(api_key, max_workers=args.concurrency, evaluation_mode=args.mode,
+                                    resume=not args.restart, stream_output=args.stream and args.workers == 1,
+                                    charts=args.charts)
+        grade_batch(grader, args.batch, args.rubric, args.output, workers=args.workers)
+        print(f"Caché de respuestas: {grader.client.cache.stats()}")
+        print(f"Llamadas a la API: {scheduler.stats()}")
+        return
+
     try:
         # Initialize grader
-        grader = UNIRDocumentGrader(api_key)
+        grader = UNIRDocumentGrader(api_key, max_workers=args.concurrency, evaluation_mode=args.mode,
+                                    resume=not args.restart, stream_output=args.stream, charts=args.charts)
         
-        # Let user select files and output directory using native macOS dialogs
-        solution_path, rubric_path, output_dir = grader.select_files()
+        # Files not given on the command line are chosen in macOS dialogs (or asked for)
+        # (a thesis given on the command line writes next to itself unless --output is set)
+        output_dir = args.output or (str(Path(args.thesis).parent) if args.thesis else None)
+        solution_path, rubric_path, output_dir = grader.select_files(args.thesis, args.rubric, output_dir)
         
         # Grade solution
         results = grader.grade_solution(None, rubric_path, solution_path)
@@ -492,7 +996,9 @@ def main():
             Resultados guardados en:
             - JSON: {json_path}
             - Markdown: {markdown_path}
-            - Visualizaciones: {Path(output_dir) / 'visualizaciones'}""")
+            - Visualizaciones: {Path(output_dir) / 'visualizaciones'}
+            Caché de respuestas: {grader.client.cache.stats()}
+            Llamadas a la API: {scheduler.stats()}""")
         
     except Exception as e:
         print(f"Error durante el proceso de evaluación: {str(e)}")
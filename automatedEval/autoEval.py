@@ -1,36 +1,52 @@
+import argparse
 import os
+import sys
+from pathlib import Path
 import pandas as pd
-import openai
-import pdfplumber
 import docx
-import Cocoa
-import logging
 from dotenv import load_dotenv
 
+# Paquete compartido unir_tfm (en la raíz del repositorio)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from unir_tfm.inputs import resolve_file
+from unir_tfm.pdf_extract import extract_pages
+from unir_tfm.prompt_cache import UsageTracker, openai_cached_messages, prompt_cache_key
+from unir_tfm.llm import LLMClient
+from unir_tfm.response_cache import default_response_cache
+from unir_tfm.sections import segment_text, select_sections
+
+# Contexto enviado por criterio:
+# "completo": todo el TFM como prefijo común (el proveedor lo cachea y se reutiliza en cada criterio)
+# "secciones": solo las secciones relevantes para cada criterio (menos tokens, sin prefijo común)
+MODO_CONTEXTO = "completo"
+
+# Tokens aproximados del TFM que se envían por criterio en modo "secciones"
+PRESUPUESTO_TOKENS = 6000
+
+# Procesos para leer los PDF por tramos de páginas (0 = uno por núcleo, 1 = en este proceso)
+PROCESOS_LECTURA = 0
+
+# Uso de tokens de la ejecución (incluye los tokens servidos desde la caché del proveedor)
+USO_TOKENS = UsageTracker()
+
 # ------------------------------
 # CONFIGURACIÓN DE OPENAI
 # ------------------------------
 
 load_dotenv()
 api_key = os.getenv("MI_CLAVE_API_OPENAI")
-openai.api_key = api_key
+
+# Un único cliente para toda la ejecución: los criterios reutilizan sus conexiones HTTP
+# (con caché de respuestas y límites por minuto, reintentos y presupuesto comunes: UNIR_TFM_RPM, UNIR_TFM_TPM...)
+LLM = LLMClient("openai", api_key=api_key, usage=USO_TOKENS)
 
 # ------------------------------
-# SELECCIÓN NATIVA DE ARCHIVO
+# SELECCIÓN DE ARCHIVO (LÍNEA DE ÓRDENES O DIÁLOGO NATIVO)
 # ------------------------------
 
-def seleccionar_archivo(allowed_types, titulo="Selecciona un archivo"):
-    panel = Cocoa.NSOpenPanel.openPanel()
-    
-    panel.setCanChooseFiles_(True)
-    panel.setCanChooseDirectories_(False)
-    panel.setAllowsMultipleSelection_(False)
-    panel.setAllowedFileTypes_(allowed_types)
-    panel.setTitle_(titulo)
-
-    if panel.runModal() == Cocoa.NSModalResponseOK:
-        return panel.URLs()[0].path()
-    return None
+def seleccionar_archivo(allowed_types, titulo="Selecciona un archivo", ruta=None):
+    # Ruta de la línea de órdenes o, si no se indica, diálogo de macOS (o pregunta en el terminal)
+    return resolve_file(ruta, titulo, allowed_types)
 
 # ------------------------------
 # CARGA DE RÚBRICA
@@ -65,58 +81,67 @@ def cargar_rubrica(path):
 
 def leer_tfm(path):
     ext = os.path.splitext(path)[-1].lower()
-    texto = ""
+    partes = []
     
     if ext == ".pdf":
         print("📥 Leyendo PDF...")
 
-        logging.getLogger("pdfminer").setLevel(logging.ERROR)
-
-        with pdfplumber.open(path) as pdf:
-            for page_num, page in enumerate(pdf.pages):
-                page_text = page.extract_text()
-                if page_text:
-                    texto += f"\n--- Página {page_num + 1} ---\n"
-                    texto += page_text + "\n"
+        # Tramos de páginas repartidos entre procesos (uno por núcleo), reensamblados en orden
+        for page in extract_pages(path, workers=PROCESOS_LECTURA):
+            if page["text"]:
+                partes.append(f"\n--- Página {page['page']} ---\n{page['text']}\n")
 
     elif ext == ".docx":
         print("📥 Leyendo DOCX...")
         doc = docx.Document(path)
         for para in doc.paragraphs:
-            texto += para.text + "\n"
+            partes.append(para.text + "\n")
 
     else:
         raise ValueError("Formato no soportado (solo PDF o DOCX).")
     
-    return texto
+    return "".join(partes)
 
 # ------------------------------
 # EVALUACIÓN CON OPENAI
 # ------------------------------
 
-def evaluar_criterio(criterio, descripcion_tfm):
-    prompt = f"""Eres un evaluador académico experto siguiendo los criterios de UNIR. Evalúa el siguiente trabajo según el criterio:
-
-Criterio:
-{criterio}
-
-Trabajo del TFM:
-{descripcion_tfm}
+INSTRUCCIONES = """Eres un evaluador académico experto siguiendo los criterios de UNIR. Evalúa el trabajo de TFM que aparece a continuación según el criterio que se te indique.
 
 Responde estrictamente con Nivel 1, Nivel 2, Nivel 3 o Nivel 4 seguido de una justificación crítica y detallada.
 
 Ejemplo:
-Nivel 3: La respuesta presenta adecuación parcial...
-"""
-client=openai.OpenAI()
-    response = client.chat.completions.create(
+Nivel 3: La respuesta presenta adecuación parcial..."""
+
+def evaluar_criterio(criterio, descripcion_tfm):
+    # El TFM va primero (prefijo estable que el proveedor cachea entre criterios) y el criterio al final
+    response = LLM.client.chat.completions.create(
         model="gpt-4o",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0
+        messages=openai_cached_messages(
+            INSTRUCCIONES,
+            f"Trabajo del TFM:\n{descripcion_tfm}",
+            f"Criterio:\n{criterio}"
+        ),
+        temperature=0,
+        prompt_cache_key=prompt_cache_key(descripcion_tfm)
     )
     
     return response.choices[0].message.content
 
+def evaluar_tfm(criterios, texto_tfm):
+    # Un criterio tras otro; en modo "secciones" cada uno recibe solo las secciones relacionadas
+    secciones_tfm = segment_text(texto_tfm) if MODO_CONTEXTO == "secciones" else None
+    resultados = []
+    for criterio in criterios:
+        print(f"\n🧠 Evaluando criterio: {criterio}")
+        if MODO_CONTEXTO == "secciones":
+            contexto = select_sections(secciones_tfm, str(criterio), PRESUPUESTO_TOKENS)
+        else:
+            contexto = texto_tfm
+        resultado = evaluar_criterio(criterio, contexto)
+        resultados.append({"criterio": criterio, "evaluacion": resultado})
+    return resultados
+
 # ------------------------------
 # GENERAR INFORME MARKDOWN
 # ------------------------------
@@ -133,43 +158,53 @@ def generar_markdown(resultados, nombre_archivo):
 # FLUJO PRINCIPAL
 # ------------------------------
 
-# Seleccionar rúbrica
-archivo_rubrica = seleccionar_archivo(["xlsx", "xls", "csv"], "Selecciona la rúbrica")
-if not archivo_rubrica:
-    print("❗ No se seleccionó la rúbrica.")
-    exit()
-
-rubrica = cargar_rubrica(archivo_rubrica)
-
-# Seleccionar TFM
-archivo_tfm = seleccionar_archivo(["pdf", "docx"], "Selecciona el TFM (PDF o DOCX)")
-if not archivo_tfm:
-    print("❗ No se seleccionó el TFM.")
-    exit()
-
-texto_tfm = leer_tfm(archivo_tfm)
-
-# Evaluar
-resultados = []
-for criterio in rubrica.iloc[:, 0]:
-    print(f"\n🧠 Evaluando criterio: {criterio}")
-    resultado = evaluar_criterio(criterio, texto_tfm)
-    resultados.append({"criterio": criterio, "evaluacion": resultado})
-
-# Guardar CSV
-df_resultados = pd.DataFrame(resultados)
-df_resultados.to_csv("evaluacion_tfm_resultado.csv", index=False)
-print("\n✅ Resultados guardados en CSV: evaluacion_tfm_resultado.csv")
-
-# Guardar Markdown
-generar_markdown(resultados, "evaluacion_tfm_informe.md")
-print("✅ Informe Markdown guardado: evaluacion_tfm_informe.md")
-# Guardar JSON
-df_resultados.to_json("evaluacion_tfm_resultado.json", orient="records", lines=True)
-print("✅ Resultados guardados en JSON: evaluacion_tfm_resultado.json")
-# Guardar TXT
-with open("evaluacion_tfm_resultado.txt", "w", encoding="utf-8") as f:
-    for res in resultados:
-        f.write(f"Criterio: {res['criterio']}\n")
-        f.write(f"Evaluación: {res['evaluacion']}\n\n")
-print("✅ Resultados guardados en TXT: evaluacion_tfm_resultado.txt")
\ No newline at end of file
+def main():
+    parser = argparse.ArgumentParser(description="Evalúa un TFM con los criterios de una rúbrica")
+    parser.add_argument("rubrica", nargs="?", help="Rúbrica XLSX/XLS/CSV (si se omite, se abre el diálogo de selección)")
+    parser.add_argument("tfm", nargs="?", help="TFM en PDF o DOCX (si se omite, se abre el diálogo de selección)")
+    args = parser.parse_args()
+
+    # Seleccionar rúbrica
+    archivo_rubrica = seleccionar_archivo(["xlsx", "xls", "csv"], "Selecciona la rúbrica", args.rubrica)
+    if not archivo_rubrica:
+        print("❗ No se seleccionó la rúbrica.")
+        return
+
+    rubrica = cargar_rubrica(archivo_rubrica)
+
+    # Seleccionar TFM
+    archivo_tfm = seleccionar_archivo(["pdf", "docx"], "Selecciona el TFM (PDF o DOCX)", args.tfm)
+    if not archivo_tfm:
+        print("❗ No se seleccionó el TFM.")
+        return
+
+    texto_tfm = leer_tfm(archivo_tfm)
+
+    # Evaluar
+    resultados = evaluar_tfm(rubrica.iloc[:, 0], texto_tfm)
+
+    # Guardar CSV
+    df_resultados = pd.DataFrame(resultados)
+    df_resultados.to_csv("evaluacion_tfm_resultado.csv", index=False)
+    print("\n✅ Resultados guardados en CSV: evaluacion_tfm_resultado.csv")
+
+    # Guardar Markdown
+    generar_markdown(resultados, "evaluacion_tfm_informe.md")
+    print("✅ Informe Markdown guardado: evaluacion_tfm_informe.md")
+    # Guardar JSON
+    df_resultados.to_json("evaluacion_tfm_resultado.json", orient="records", lines=True)
+    print("✅ Resultados guardados en JSON: evaluacion_tfm_resultado.json")
+    # Guardar TXT
+    with open("evaluacion_tfm_resultado.txt", "w", encoding="utf-8") as f:
+        for res in resultados:
+            f.write(f"Criterio: {res['criterio']}\n")
+            f.write(f"Evaluación: {res['evaluacion']}\n\n")
+    print("✅ Resultados guardados en TXT: evaluacion_tfm_resultado.txt")
+    print(f"📦 Caché de respuestas: {default_response_cache().stats()}")
+    print(f"📦 Tokens (caché del proveedor incluida): {USO_TOKENS.summary()}")
+    print(f"📦 Llamadas a la API: {LLM.scheduler.stats()}")
+
+
+# Guardado: los procesos de lectura reimportan este módulo al arrancar (spawn en macOS)
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,35 @@
-import subprocess
+import argparse
+import sys
+from pathlib import Path
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import traceback
 
+# Paquete compartido unir_tfm (en la raíz del repositorio)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from unir_tfm.buffered_log import PLAIN_FORMAT, get_file_logger
+from unir_tfm.inputs import InputError, resolve_file
+
 RUTA_LOG = "traza_ejecucion.txt"
 
 def trazar(mensaje):
-    """Escribe un mensaje en el archivo de traza."""
-    with open(RUTA_LOG, "a", encoding="utf-8") as f:
-        f.write(mensaje + "\n")
+    """Escribe un mensaje en el archivo de traza (escritura en bloque, en segundo plano)."""
+    get_file_logger(RUTA_LOG, fmt=PLAIN_FORMAT).info(mensaje)
     print("📝", mensaje)
 
-def seleccionar_pdf():
-    """Selecciona un archivo PDF usando AppleScript (solo en macOS)."""
-    trazar("Paso 1: Ejecutando AppleScript para seleccionar PDF")
-    script = '''
-    set theFile to choose file with prompt "Selecciona el archivo PDF" of type {"com.adobe.pdf"}
-    POSIX path of theFile
-    '''
-    result = subprocess.run(["osascript", "-e", script], capture_output=True, text=True)
-    if result.returncode != 0 or not result.stdout.strip():
-        trazar("❌ Error o cancelación en AppleScript.")
+def seleccionar_pdf(pdf_path=None):
+    """PDF indicado en la línea de órdenes; si no, panel de macOS o pregunta en la terminal."""
+    trazar("Paso 1: Seleccionando PDF")
+    try:
+        pdf_path = resolve_file(pdf_path, "Selecciona el archivo PDF", ["pdf"])
+    except InputError as e:
+        trazar(f"❌ {e}")
+        return None
+    if not pdf_path:
+        trazar("❌ Selección cancelada.")
         return None
-    pdf_path = result.stdout.strip()
     trazar(f"✅ Archivo seleccionado: {pdf_path}")
     return pdf_path
 
@@ -56,12 +61,16 @@ def cargar_pdf_en_formulario(driver, pdf_path):
         driver.quit()
         trazar("🚪 Navegador cerrado.")
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sube un TFM en PDF al formulario de rúbricas de UNIR")
+    parser.add_argument("pdf", nargs="?", help="Archivo PDF (si se omite, se abre un diálogo o se pregunta)")
+    args = parser.parse_args(argv)
+
     with open(RUTA_LOG, "w", encoding="utf-8") as f:
         f.write("🧪 TRAZA DE EJECUCIÓN\n\n")
 
     trazar("🔁 Iniciando script")
-    pdf_path = seleccionar_pdf()
+    pdf_path = seleccionar_pdf(args.pdf)
     if not pdf_path:
         trazar("⚠️ Proceso cancelado por el usuario.")
         return
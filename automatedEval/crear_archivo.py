@@ -1,34 +1,38 @@
+import argparse
 import os
+import sys
 import shutil
 import traceback
 import time
+from pathlib import Path
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
-from AppKit import NSOpenPanel
+
+# Paquete compartido unir_tfm (en la raíz del repositorio)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from unir_tfm.buffered_log import PLAIN_FORMAT, get_file_logger
+from unir_tfm.inputs import InputError, resolve_file
 
 RUTA_LOG = os.path.expanduser("~/Desktop/traza_nativa.txt")
 
 def trazar(mensaje):
-    with open(RUTA_LOG, "a", encoding="utf-8") as f:
-        f.write(mensaje + "\n")
+    get_file_logger(RUTA_LOG, fmt=PLAIN_FORMAT).info(mensaje)
     print("📝", mensaje)
 
-def seleccionar_pdf():
-    panel = NSOpenPanel.openPanel()
-    panel.setTitle_("Selecciona un archivo PDF")
-    panel.setAllowedFileTypes_(["pdf"])
-    panel.setCanChooseDirectories_(False)
-    panel.setAllowsMultipleSelection_(False)
-
-    if panel.runModal() == 1:
-        ruta = panel.URLs()[0].path()
+def seleccionar_pdf(ruta=None):
+    """PDF indicado en la línea de órdenes; si no, panel de macOS o pregunta en la terminal."""
+    try:
+        ruta = resolve_file(ruta, "Selecciona un archivo PDF", ["pdf"])
+    except InputError as e:
+        trazar(f"❌ {e}")
+        return None
+    if ruta:
         trazar(f"✅ PDF seleccionado: {ruta}")
-        return ruta
     else:
         trazar("❌ No se seleccionó archivo.")
-        return None
+    return ruta
 
 def preparar_archivo(pdf_path):
     nombre = os.path.basename(pdf_path)
@@ -113,12 +117,16 @@ def cargar_pdf_en_formulario(driver, pdf_path, valores):
             trazar("⚠️ No se pudo guardar la captura del error.")
         trazar("⚠️ Safari NO se cerró para inspección manual.")
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sube un TFM en PDF al formulario de rúbricas de UNIR")
+    parser.add_argument("pdf", nargs="?", help="Archivo PDF (si se omite, se abre un diálogo o se pregunta)")
+    args = parser.parse_args(argv)
+
     with open(RUTA_LOG, "w", encoding="utf-8") as f:
         f.write("🧪 INICIO DE TRAZA\n\n")
 
     trazar("🔁 Iniciando script")
-    ruta_original = seleccionar_pdf()
+    ruta_original = seleccionar_pdf(args.pdf)
     if not ruta_original:
         trazar("🚫 Proceso cancelado.")
         return
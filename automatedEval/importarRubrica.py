@@ -1,22 +1,20 @@
+import argparse
 import os
+import sys
+from pathlib import Path
 import pandas as pd
-import Cocoa
+
+# Paquete compartido unir_tfm (en la raíz del repositorio)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from unir_tfm.inputs import resolve_file
 
 # ------------------------------
-# SELECCIÓN NATIVA DE ARCHIVO (RÚBRICA)
+# SELECCIÓN DE ARCHIVO (RÚBRICA)
 # ------------------------------
 
-def seleccionar_archivo_rubrica():
-    panel = Cocoa.NSOpenPanel.openPanel()
-    
-    panel.setCanChooseFiles_(True)
-    panel.setCanChooseDirectories_(False)
-    panel.setAllowsMultipleSelection_(False)
-    panel.setAllowedFileTypes_(["xlsx", "xls", "csv"])
-
-    if panel.runModal() == Cocoa.NSModalResponseOK:
-        return panel.URLs()[0].path()
-    return None
+def seleccionar_archivo_rubrica(ruta=None):
+    # Ruta de la línea de órdenes o, si no se indica, diálogo de macOS (o pregunta en el terminal)
+    return resolve_file(ruta, "Selecciona la rúbrica", ["xlsx", "xls", "csv"])
 
 # ------------------------------
 # CARGA DE RÚBRICA
@@ -45,7 +43,11 @@ def cargar_rubrica(path):
 # FLUJO PRINCIPAL
 # ------------------------------
 
-archivo_rubrica = seleccionar_archivo_rubrica()
+parser = argparse.ArgumentParser(description="Carga y muestra una rúbrica XLSX/XLS/CSV")
+parser.add_argument("rubrica", nargs="?", help="Rúbrica (si se omite, se abre el diálogo de selección)")
+args = parser.parse_args()
+
+archivo_rubrica = seleccionar_archivo_rubrica(args.rubrica)
 
 if archivo_rubrica:
     print(f"\n📂 Archivo seleccionado: {archivo_rubrica}")
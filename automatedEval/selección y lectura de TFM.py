@@ -1,24 +1,24 @@
+import argparse
 import os
-import pdfplumber
+import sys
+from pathlib import Path
 import docx
-import Cocoa
-import logging
+
+# Paquete compartido unir_tfm (en la raíz del repositorio)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from unir_tfm.inputs import resolve_file
+from unir_tfm.pdf_extract import extract_pages
+
+# Procesos para leer los PDF por tramos de páginas (0 = uno por núcleo, 1 = en este proceso)
+PROCESOS_LECTURA = 0
 
 # ------------------------------
-# SELECCIÓN NATIVA DE ARCHIVO (TFM)
+# SELECCIÓN DE ARCHIVO (TFM)
 # ------------------------------
 
-def seleccionar_archivo_tfm():
-    panel = Cocoa.NSOpenPanel.openPanel()
-    
-    panel.setCanChooseFiles_(True)
-    panel.setCanChooseDirectories_(False)
-    panel.setAllowsMultipleSelection_(False)
-    panel.setAllowedFileTypes_(["pdf", "docx"])
-
-    if panel.runModal() == Cocoa.NSModalResponseOK:
-        return panel.URLs()[0].path()
-    return None
+def seleccionar_archivo_tfm(ruta=None):
+    # Ruta de la línea de órdenes o, si no se indica, diálogo de macOS (o pregunta en el terminal)
+    return resolve_file(ruta, "Selecciona el TFM (PDF o DOCX)", ["pdf", "docx"])
 
 # ------------------------------
 # LECTURA DEL TFM (PDF / DOCX) - VERSIÓN LIMPIA
@@ -26,46 +26,51 @@ def seleccionar_archivo_tfm():
 
 def leer_tfm(path):
     ext = os.path.splitext(path)[-1].lower()
-    texto = ""
+    partes = []
     
     if ext == ".pdf":
         print("📥 Leyendo PDF...")
 
-        # Silenciar los logs de pdfminer (usado internamente por pdfplumber)
-        logging.getLogger("pdfminer").setLevel(logging.ERROR)
-
-        with pdfplumber.open(path) as pdf:
-            for page_num, page in enumerate(pdf.pages):
-                page_text = page.extract_text()
-                if page_text:
-                    texto += f"\n--- Página {page_num + 1} ---\n"
-                    texto += page_text + "\n"
+        # Tramos de páginas repartidos entre procesos (uno por núcleo), reensamblados en orden
+        for page in extract_pages(path, workers=PROCESOS_LECTURA):
+            if page["text"]:
+                partes.append(f"\n--- Página {page['page']} ---\n{page['text']}\n")
 
     elif ext == ".docx":
         print("📥 Leyendo DOCX...")
         doc = docx.Document(path)
         for para in doc.paragraphs:
-            texto += para.text + "\n"
+            partes.append(para.text + "\n")
 
     else:
         raise ValueError("Formato no soportado (solo PDF o DOCX).")
     
-    return texto
+    return "".join(partes)
 
 # ------------------------------
 # FLUJO PRINCIPAL DE PRUEBA
 # ------------------------------
 
-archivo_tfm = seleccionar_archivo_tfm()
+def main():
+    parser = argparse.ArgumentParser(description="Lee un TFM y muestra el inicio del texto extraído")
+    parser.add_argument("tfm", nargs="?", help="TFM en PDF o DOCX (si se omite, se abre el diálogo de selección)")
+    args = parser.parse_args()
 
-if archivo_tfm:
-    print(f"\n📂 Archivo de TFM seleccionado: {archivo_tfm}")
+    archivo_tfm = seleccionar_archivo_tfm(args.tfm)
 
-    texto_tfm = leer_tfm(archivo_tfm)
+    if archivo_tfm:
+        print(f"\n📂 Archivo de TFM seleccionado: {archivo_tfm}")
 
-    print("\n✅ Contenido del TFM (primeros 1000 caracteres):\n")
-    print(texto_tfm[:1000])
+        texto_tfm = leer_tfm(archivo_tfm)
+
+        print("\n✅ Contenido del TFM (primeros 1000 caracteres):\n")
+        print(texto_tfm[:1000])
     
-    print("\n✅ Lectura completada sin errores visibles.")
-else:
-    print("❗ No se seleccionó ningún archivo de TFM.")
+        print("\n✅ Lectura completada sin errores visibles.")
+    else:
+        print("❗ No se seleccionó ningún archivo de TFM.")
+
+
+# Guardado: los procesos de lectura reimportan este módulo al arrancar (spawn en macOS)
+if __name__ == "__main__":
+    main()
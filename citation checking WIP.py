@@ -1,48 +1,40 @@
 
+import argparse
+import os
 import re
 import json
-import Cocoa
-import datetime
-from Quartz import PDFDocument
-from Foundation import NSURL
-from docx import Documentimport os
-import re
-import json
-import Cocoa
-import datetime
-from Quartz import PDFDocument
-from Foundation import NSURL
-from docx import Document
+import logging
 
+from unir_tfm.buffered_log import get_file_logger
+from unir_tfm.citations import ReferenceIndex
+from unir_tfm.inputs import resolve_file
+from unir_tfm.pdf_extract import stream_pages
 
-def debug_log(message, output_dir="", title="debug_log"):
-    """Appends debug messages to a Markdown log file in the specified directory."""
+
+def debug_log(message, output_dir="", title="debug_log", level=logging.DEBUG):
+    """Queues a debug message for the buffered Markdown log file in the specified directory."""
     if not output_dir:
         output_dir = os.getcwd()  # Default to the current working directory
 
-    debug_file = os.path.join(output_dir, f"{title}.md")
-    try:
-        with open(debug_file, "a") as log_file:
-            timestamp = datetime.datetime.now().isoformat()
-            log_file.write(f"- **[{timestamp}]** {message}\n")
-    except Exception as e:
-        print(f"Failed to write debug log: {e}")
-
-
-def choose_file(file_type):
-    """Use a native macOS file dialog to select a file and return its path and directory."""
-    panel = Cocoa.NSOpenPanel.openPanel()
-    panel.setAllowsMultipleSelection_(False)
-    panel.setCanChooseDirectories_(False)
-
-    if file_type == "thesis":
-        panel.setAllowedFileTypes_(["pdf", "docx"])
-    elif file_type == "references":
-        panel.setAllowedFileTypes_(["json"])
-
-    if panel.runModal() == Cocoa.NSModalResponseOK:
-        file_path = panel.URLs()[0].path()
-        file_dir = os.path.dirname(file_path)
+    logger = get_file_logger(os.path.join(output_dir, f"{title}.md"))
+    if logger.isEnabledFor(level):
+        logger.log(level, message)
+
+
+CHOOSE_TITLES = {"thesis": "Select the thesis (PDF/DOCX)", "references": "Select the references JSON"}
+CHOOSE_EXTENSIONS = {"thesis": ["pdf", "docx"], "references": ["json"]}
+
+
+def choose_file(file_type, path=None):
+    """
+    Resolve the thesis or references file and return its path and directory.
+
+    The file comes from the command line when given, otherwise from a native
+    macOS file dialog (or a terminal prompt where there is none).
+    """
+    file_path = resolve_file(path, CHOOSE_TITLES[file_type], CHOOSE_EXTENSIONS[file_type])
+    if file_path:
+        file_dir = os.path.dirname(os.path.abspath(file_path))
         debug_log(f"Selected {file_type} file: {file_path}", file_dir, "debug_log")
         return file_path, file_dir
     else:
@@ -65,54 +57,80 @@ def extract_text(file_path, source_type):
         raise ValueError("Unsupported file format")
 
 
-def extract_pdf(file_path):
-    """Extract raw text from a PDF."""
-    url = NSURL.fileURLWithPath_(file_path)
-    pdf_doc = PDFDocument.alloc().initWithURL_(url)
-    text = ""
+def iter_text(file_path, source_type):
+    """Yield the raw text of a PDF (page by page) or DOCX (paragraph by paragraph)."""
+    if source_type == "pdf":
+        return iter_pdf_text(file_path)
+    elif source_type == "docx":
+        return iter_docx_text(file_path)
+    else:
+        raise ValueError("Unsupported file format")
+
 
+def iter_pdf_text(file_path):
+    """Yield the text of each PDF page as it is read (pages from the shared extraction cache)."""
     debug_log(f"Starting PDF extraction for file: {file_path}")
 
-    for page_num in range(pdf_doc.pageCount()):
-        page = pdf_doc.pageAtIndex_(page_num)
-        page_text = page.string()
+    length = 0
+    for page in stream_pages(file_path):
+        page_text = page["text"]
         if page_text:
-            debug_log(f"Extracted text from page {page_num + 1}.")
+            debug_log(f"Extracted text from page {page['page']}.")
         else:
-            debug_log(f"No text found on page {page_num + 1}.")
-        text += page_text
+            debug_log(f"No text found on page {page['page']}.")
+        length += len(page_text)
+        yield page_text
 
-    debug_log(f"PDF extraction completed. Total length: {len(text)} characters.")
-    return text
+    debug_log(f"PDF extraction completed. Total length: {length} characters.")
 
 
-def extract_docx(file_path):
-    """Extract raw text from a DOCX file."""
+def extract_pdf(file_path):
+    """Extract raw text from a PDF."""
+    return "".join(iter_pdf_text(file_path))
+
+
+def split_lines(chunks):
+    """Yield the lines of text given in chunks, as "".join(chunks).split("\n") would."""
+    pending = ""
+    for chunk in chunks:
+        *lines, pending = (pending + chunk).split("\n")
+        yield from lines
+    yield pending
+
+
+def iter_docx_text(file_path):
+    """Yield the text of each DOCX paragraph."""
+    from docx import Document
+
     doc = Document(file_path)
-    text = ""
+    length = 0
 
     debug_log(f"Starting DOCX extraction for file: {file_path}")
 
     for i, paragraph in enumerate(doc.paragraphs, start=1):
         if paragraph.text.strip():
             debug_log(f"Extracted text from paragraph {i}.")
-        text += paragraph.text + "\n"
+        length += len(paragraph.text) + 1
+        yield paragraph.text + "\n"
 
-    debug_log(f"DOCX extraction completed. Total length: {len(text)} characters.")
-    return text
+    debug_log(f"DOCX extraction completed. Total length: {length} characters.")
 
 
-def process_extracted_text(raw_text):
-    """Process raw extracted text, stopping at 'Anexo' and skipping 'Índice'."""
-    debug_log("Starting text processing.")
+def extract_docx(file_path):
+    """Extract raw text from a DOCX file."""
+    return "".join(iter_docx_text(file_path))
 
-    if not raw_text.strip():
-        debug_log("Raw text is empty. Processing aborted.")
-        return ""
 
-    lines = raw_text.split("\n")
-    processed_text = []
+def process_lines(lines):
+    """
+    Yield the lines of the thesis body, skipping the 'Índice' line and stopping at 'Anexo'.
+
+    Stopping also stops reading the document, so the annexes are never extracted.
+    """
+    debug_log("Starting text processing.")
+
     found_toc = False
+    count = 0
 
     for line in lines:
         if not found_toc and ("Índice" in line or "CONTENIDO" in line.upper()):
@@ -124,10 +142,19 @@ def process_extracted_text(raw_text):
             debug_log("Detected 'Anexo' section. Stopping processing.")
             break
 
-        processed_text.append(line)
+        count += 1
+        yield line
+
+    debug_log(f"Processed text length: {count} lines.")
+
+
+def process_extracted_text(raw_text):
+    """Process raw extracted text, stopping at 'Anexo' and skipping 'Índice'."""
+    if not raw_text.strip():
+        debug_log("Raw text is empty. Processing aborted.")
+        return ""
 
-    debug_log(f"Processed text length: {len(processed_text)} lines.")
-    return "\n".join(processed_text)
+    return "\n".join(process_lines(raw_text.split("\n")))
 
 
 def load_references(json_path):
@@ -143,7 +170,7 @@ def load_references(json_path):
 
     parsed_references = []
     for ref in references:
-        match = re.search(r"(.*?)\.\s\((\d{4})\)\.\s(.*?)\.", ref["reference"])
+        match = re.search(r"(.*?)\.\s\((\d{4}[a-z]?)\)\.\s(.*?)\.", ref["reference"])
         if match:
             parsed_references.append({
                 "author": match.group(1),
@@ -162,13 +189,17 @@ def load_references(json_path):
 
 def search_citations_in_text(full_text):
     """Locate and log citations in the text, capturing their locations."""
+    return search_citations_in_lines(full_text.split("\n"))  # Split into lines for paragraph-like processing
+
+
+def search_citations_in_lines(lines):
+    """Locate and log citations line by line (location = line number), consuming the lines once."""
     debug_log("Starting citation search in extracted text.")
 
     citations_with_locations = []
-    lines = full_text.split("\n")  # Split into lines for paragraph-like processing
 
     for index, line in enumerate(lines, start=1):
-        matches = re.findall(r"\(([^,]+), (\d{4})(?:, p. \d+)?\)", line)
+        matches = re.findall(r"\(([^,]+), (\d{4}[a-z]?)(?:, p. \d+)?\)", line)
         for match in matches:
             citations_with_locations.append({"citation": match, "location": index})
             debug_log(f"Found citation: {match} at line {index}")
@@ -182,10 +213,10 @@ def generate_report_with_locations(matched, unmatched, references, output_dir, t
     report_name = f"{title}_{report_name}"
     output_path = os.path.join(output_dir, report_name)
 
-    cited_references = {f"{c['citation'][0]}, {c['citation'][1]}" for c in matched}
+    cited_positions = {c["reference_index"] for c in matched if "reference_index" in c}
     uncited_references = [
-        ref for ref in references
-        if f"{ref['author']}, {ref['year']}" not in cited_references
+        ref for position, ref in enumerate(references)
+        if position not in cited_positions
     ]
 
     debug_log(f"Generating Markdown report at: {output_path}", output_dir, title)
@@ -219,9 +250,14 @@ def generate_report_with_locations(matched, unmatched, references, output_dir, t
 
 
 
-def main():
-    thesis_file, thesis_dir = choose_file("thesis")
-    references_file, _ = choose_file("references")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the in-text citations of a thesis against its references")
+    parser.add_argument("thesis", nargs="?", help="Thesis PDF/DOCX (a dialog opens if omitted)")
+    parser.add_argument("references", nargs="?", help="References JSON (a dialog opens if omitted)")
+    args = parser.parse_args(argv)
+
+    thesis_file, thesis_dir = choose_file("thesis", args.thesis)
+    references_file, _ = choose_file("references", args.references)
 
     if not thesis_file or not references_file:
         debug_log("File selection aborted.", thesis_dir or os.getcwd(), "debug_log")
@@ -233,21 +269,23 @@ def main():
     debug_log("Program started.", thesis_dir, thesis_title)
 
     source_type = "pdf" if thesis_file.endswith(".pdf") else "docx"
-    raw_text = extract_text(thesis_file, source_type)
-    debug_log(f"Extracted raw text length: {len(raw_text)} characters.", thesis_dir, thesis_title)
-
-    filtered_text = process_extracted_text(raw_text)
-    debug_log(f"Filtered text length: {len(filtered_text)} characters.", thesis_dir, thesis_title)
-
     references = load_references(references_file)
-    citations_with_locations = search_citations_in_text(filtered_text)
 
-    # Match citations with references
+    # Pages are read, split into lines, filtered and searched one at a time
+    # (the whole thesis text is never built); reading stops at the annexes
+    lines = process_lines(split_lines(iter_text(thesis_file, source_type)))
+    citations_with_locations = search_citations_in_lines(lines)
+    debug_log(f"Searched the thesis body for citations: {len(citations_with_locations)} found.", thesis_dir, thesis_title)
+
+    # Match citations with references (hash lookup by surname/year, fuzzy fallback)
+    reference_index = ReferenceIndex(references)
     matched = []
     unmatched = []
     for citation in citations_with_locations:
         author, year = citation["citation"]
-        if any(ref for ref in references if ref["author"] == author and ref["year"] == year):
+        position = reference_index.match(author, year)
+        if position is not None:
+            citation["reference_index"] = position
             matched.append(citation)
         else:
             unmatched.append(citation)
@@ -256,285 +294,5 @@ def main():
     debug_log("Program completed successfully.", thesis_dir, thesis_title)
 
 
-
 if __name__ == "__main__":
     main()
-
-
-
-
-def debug_log(message):
-    """Appends debug messages to a Markdown log file."""
-    with open("debug_log.md", "a") as log_file:
-        timestamp = datetime.datetime.now().isoformat()
-        log_file.write(f"- **[{timestamp}]** {message}\n")
-
-
-
-def choose_file(file_type):
-    """Use a native macOS file dialog to select a file."""
-    panel = Cocoa.NSOpenPanel.openPanel()
-    panel.setAllowsMultipleSelection_(False)
-    panel.setCanChooseDirectories_(False)
-
-    if file_type == "thesis":
-        panel.setAllowedFileTypes_(["pdf", "docx"])
-    elif file_type == "references":
-        panel.setAllowedFileTypes_(["json"])
-
-    if panel.runModal() == Cocoa.NSModalResponseOK:
-        file_path = panel.URLs()[0].path()
-        debug_log(f"Selected {file_type} file: {file_path}")
-        return file_path
-    else:
-        debug_log(f"No {file_type} file selected.")
-        return None
-
-
-
-def extract_pdf_text(file_path):
-    """Extract text from a PDF while excluding annexes and considering the table of contents."""
-    url = NSURL.fileURLWithPath_(file_path)
-    pdf_doc = PDFDocument.alloc().initWithURL_(url)
-    text = ""
-    is_after_toc = False
-
-    debug_log("Starting PDF text extraction.")
-
-    for page_num in range(pdf_doc.pageCount()):
-        page = pdf_doc.pageAtIndex_(page_num)
-        page_text = page.string()
-
-        if not is_after_toc and "Índice" in page_text:
-            debug_log(f"Table of Contents detected on page {page_num + 1}.")
-            is_after_toc = True
-            continue
-
-        if "Anexo" in page_text:
-            debug_log(f"Anexo section detected on page {page_num + 1}. Stopping extraction.")
-            break
-
-        if is_after_toc:
-            text += page_text
-
-    debug_log("PDF text extraction completed.")
-    return text
-
-
-def extract_docx_text(file_path):
-    """Extract text from a DOCX file while excluding annexes and considering the table of contents."""
-    doc = Document(file_path)
-    text = ""
-    is_after_toc = False
-
-    debug_log("Starting DOCX text extraction.")
-
-    for paragraph in doc.paragraphs:
-        if not is_after_toc and "Índice" in paragraph.text:
-            debug_log("Table of Contents detected.")
-            is_after_toc = True
-            continue
-
-        if "Anexo" in paragraph.text:
-            debug_log("Anexo section detected. Stopping extraction.")
-            break
-
-        if is_after_toc:
-            text += paragraph.text + "\n"
-
-    debug_log("DOCX text extraction completed.")
-    return text
-
-def extract_text_until_anexo(full_text):
-    """
-    Process the extracted text and stop at the first actual occurrence of 'Anexo' 
-    while ignoring mentions in the Table of Contents.
-    """
-    debug_log("Processing text to stop at the first actual 'Anexo' section.")
-
-    # Split the text into lines for processing
-    lines = full_text.split("\n")
-    processed_text = []
-    found_toc = False
-
-    for line in lines:
-        # Detect potential Table of Contents
-        if not found_toc and ("Índice" in line or "CONTENIDO" in line.upper()):
-            debug_log("Detected Table of Contents.")
-            found_toc = True
-            continue
-
-        # Stop processing at the first real "Anexo" section
-        if found_toc and ("Anexo" in line or "ANEXO" in line):
-            debug_log("Detected the start of the 'Anexo' section. Stopping.")
-            break
-
-        processed_text.append(line)
-
-    debug_log("Finished processing text until the 'Anexo' section.")
-    return "\n".join(processed_text)
-
-
-def search_citations_in_text(full_text):
-    """
-    Locate and log citations in the text, capturing their locations.
-    For PDF: Use page numbers.
-    For DOCX: Use paragraph numbers.
-    """
-    debug_log("Starting citation search in extracted text.")
-
-    citations_with_locations = []
-    lines = full_text.split("\n")  # Split into lines for paragraph-like processing
-
-    for index, line in enumerate(lines, start=1):
-        matches = re.findall(r"\(([^,]+), (\d{4})(?:, p. \d+)?\)", line)
-        for match in matches:
-            citations_with_locations.append({"citation": match, "location": index})
-            debug_log(f"Found citation: {match} at line {index}")
-
-    debug_log(f"Total citations found: {len(citations_with_locations)}")
-    return citations_with_locations
-
-
-def load_references(json_path):
-    """Load references from JSON and parse relevant details."""
-    with open(json_path, "r") as file:
-        references = json.load(file)
-
-    debug_log(f"Loaded {len(references)} references.")
-
-    parsed_references = []
-    for ref in references:
-        match = re.search(r"(.*?)\.\s\((\d{4})\)\.\s(.*?)\.", ref["reference"])
-        if match:
-            parsed_references.append({
-                "author": match.group(1),
-                "year": match.group(2),
-                "title": match.group(3),
-                "reference": ref["reference"],
-                "is_compliant": ref["is_compliant"],
-                "url": ref.get("url", False)
-            })
-        else:
-            debug_log(f"Failed to parse reference: {ref['reference']}")
-
-    debug_log(f"Parsed {len(parsed_references)} valid references.")
-    return parsed_references
-
-def validate_citations_with_locations(thesis_text, references, source_type="pdf"):
-    """Validate citations and include their locations in the text."""
-    citations_with_locations = []
-    unmatched_citations = []
-
-    # For PDF: track page numbers; for DOCX: approximate paragraph or block location
-    if source_type == "pdf":
-        pages = thesis_text.split("\f")  # Split text into pages by form-feed character
-        for page_num, page_text in enumerate(pages, start=1):
-            matches = re.findall(r"\(([^,]+), (\d{4})(?:, p. \d+)?\)", page_text)
-            for match in matches:
-                citations_with_locations.append({"citation": match, "page": page_num})
-    elif source_type == "docx":
-        paragraphs = thesis_text.split("\n")  # Split text into paragraphs
-        for paragraph_num, paragraph_text in enumerate(paragraphs, start=1):
-            matches = re.findall(r"\(([^,]+), (\d{4})(?:, p. \d+)?\)", paragraph_text)
-            for match in matches:
-                citations_with_locations.append({"citation": match, "paragraph": paragraph_num})
-
-    # Match citations with references
-    matched_citations = []
-    for item in citations_with_locations:
-        citation = item["citation"]
-        author, year = citation
-        if any(ref for ref in references if ref["author"] == author and ref["year"] == year):
-            matched_citations.append(item)
-        else:
-            unmatched_citations.append(item)
-
-    debug_log(f"Total citations found: {len(citations_with_locations)}")
-    debug_log(f"Matched citations: {len(matched_citations)}")
-    debug_log(f"Unmatched citations: {len(unmatched_citations)}")
-
-    return matched_citations, unmatched_citations
-
-
-def generate_report_with_locations(matched, unmatched, references, file_name="report.md"):
-    """Generate a markdown report with citation locations and detailed compliance information."""
-    cited_references = {f"{c['citation'][0]}, {c['citation'][1]}" for c in matched}
-    uncited_references = [
-        ref for ref in references
-        if f"{ref['author']}, {ref['year']}" not in cited_references
-    ]
-
-    debug_log("Generating Markdown report with citation locations.")
-
-    with open(file_name, "w") as report:
-        report.write("# Citation Analysis Report\n\n")
-        report.write("## Summary\n")
-        report.write(f"- Total Citations: {len(matched) + len(unmatched)}\n")
-        report.write(f"- Properly Cited: {len(matched)}\n")
-        report.write(f"- Improperly Cited: {len(unmatched)}\n")
-        report.write(f"- References Not Cited: {len(uncited_references)}\n\n")
-
-        report.write("## Detailed Citations:\n")
-        if matched:
-            report.write("\n### Properly Cited:\n")
-            for item in matched:
-                location = item.get("page", item.get("paragraph", "Unknown"))
-                report.write(f"- {item['citation'][0]}, {item['citation'][1]} (Location: {location})\n")
-        
-        if unmatched:
-            report.write("\n### Improperly Cited:\n")
-            for item in unmatched:
-                location = item.get("page", item.get("paragraph", "Unknown"))
-                report.write(f"- {item['citation'][0]}, {item['citation'][1]} (Location: {location})\n")
-
-        report.write("\n## References Not Cited:\n")
-        for ref in uncited_references:
-            report.write(f"- {ref['author']} ({ref['year']}). {ref['title']}.\n")
-
-    debug_log("Markdown report with locations generated successfully.")
-
-
-
-def main():
-    debug_log("Program started.")
-    thesis_file = choose_file("thesis")
-    references_file = choose_file("references")
-
-    if not thesis_file or not references_file:
-        debug_log("File selection aborted.")
-        return
-
-    # Extract the full text from the thesis
-    if thesis_file.endswith(".pdf"):
-        full_text = extract_pdf_text(thesis_file)
-        source_type = "pdf"
-    elif thesis_file.endswith(".docx"):
-        full_text = extract_docx_text(thesis_file)
-        source_type = "docx"
-    else:
-        debug_log("Unsupported thesis file format.")
-        return
-
-    # Process the text to stop at the first "Anexo"
-    filtered_text = extract_text_until_anexo(full_text)
-
-    # Load references
-    references = load_references(references_file)
-
-    # Locate citations in the filtered text
-    citations_with_locations = search_citations_in_text(filtered_text)
-
-    # Match citations with references
-    matched = []
-    unmatched = []
-    for citation in citations_with_locations:
-        author, year = citation["citation"]
-        if any(ref for ref in references if ref["author"] == author and ref["year"] == year):
-            matched.append(citation)
-        else:
-            unmatched.append(citation)
-
-    # Generate the report
-    generate_report_with_locations(matched, unmatched, references)
-    debug_log("Program completed successfully.")
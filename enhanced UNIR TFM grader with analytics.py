@@ -1,13 +1,13 @@
 import os
 import json
-import PyPDF2
 from typing import Dict, List, Optional
-import anthropic
 from datetime import datetime
-import pandas as pd
-import matplotlib.pyplot as plt
 from pathlib import Path
 
+from unir_tfm.charts import default_renderer, distribution_job
+from unir_tfm.history import HistoryStore, category_scope, sample_std, welford_update
+from unir_tfm.llm import LLMClient
+
 class UNIRDocumentGrader:
     def __init__(self, api_key: str, historical_data_path: Optional[str] = None):
         """
@@ -15,91 +15,93 @@ class UNIRDocumentGrader:
         
         Args:
             api_key (str): The Anthropic API key for authentication
-            historical_data_path (str, optional): Path to historical evaluations JSON file
+            historical_data_path (str, optional): Path to the historical evaluations store
+                (SQLite; a legacy historical_evaluations.json is imported on first use)
         """
-        self.client = anthropic.Client(api_key)
-        self.historical_data = self.load_historical_data(historical_data_path) if historical_data_path else None
+        self.client = LLMClient("anthropic", api_key=api_key).client
+        self.history = HistoryStore(historical_data_path) if historical_data_path else None
+
+    @property
+    def historical_data(self) -> Optional[List[Dict]]:
+        """Every archived evaluation, read from the store when needed"""
+        return self.history.query() if self.history is not None else None
         
-    def load_historical_data(self, file_path: str) -> List[Dict]:
-        """Load historical evaluation data for comparative analysis"""
+    def load_historical_data(self, file_path: str, **filters) -> List[Dict]:
+        """
+        Load historical evaluation data for comparative analysis
+        
+        Args:
+            file_path (str): History store (or legacy JSON file)
+            **filters: since, until, program, tribunal, limit (see HistoryStore.query)
+        """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return []
+            return HistoryStore(file_path).query(**filters)
         except Exception as e:
             print(f"Warning: Could not load historical data: {e}")
             return []
 
     def perform_trend_analysis(self, current_results: Dict) -> Dict:
-        """Analyze trends and patterns in evaluations over time"""
-        if not self.historical_data:
-            return {}
-            
-        all_evaluations = self.historical_data + [current_results]
-        df = pd.DataFrame([
-            {
-                'fecha': eval.get('fecha', 'Unknown'),
-                'puntuacion_total': eval['puntuacion_total'],
-                **{f"{cat}_{subcat}": score 
-                   for cat, data in eval['categorias'].items()
-                   for subcat, score in data['subcategorias'].items()}
-            }
-            for eval in all_evaluations
-        ])
+        """
+        Analyze trends and patterns in evaluations over time
         
+        Uses the running aggregates of the history store (Welford statistics
+        and the score histogram) merged with the current evaluation, so the
+        cost does not grow with the number of archived evaluations.
+        """
+        if self.history is None or not self.history.count():
+            return {}
+
+        current_total = current_results['puntuacion_total']
+        n, mean, m2 = welford_update(*self.history.running(), current_total)
         analysis = {
             'tendencias': {
-                'promedio_historico': df['puntuacion_total'].mean(),
-                'desviacion_estandar': df['puntuacion_total'].std(),
-                'percentil': (df['puntuacion_total'] <= current_results['puntuacion_total']).mean() * 100
+                'promedio_historico': mean,
+                'desviacion_estandar': sample_std(n, m2),
+                'percentil': (self.history.count_at_most(current_total) + 1) / n * 100
             },
             'comparativa_categorias': {}
         }
         
-        # Generate category comparisons
-        for categoria in current_results['categorias'].keys():
-            cat_cols = [col for col in df.columns if col.startswith(f"{categoria}_")]
+        # Generate category comparisons against the current category average
+        for categoria, datos in current_results['categorias'].items():
+            scores = [score for score in datos['subcategorias'].values() if isinstance(score, (int, float))]
+            if not scores:
+                continue
+            current_average = sum(scores) / len(scores)
+            _, category_mean, _ = welford_update(*self.history.running(category_scope(categoria)), current_average)
             analysis['comparativa_categorias'][categoria] = {
-                'promedio_historico': df[cat_cols].mean().mean(),
-                'posicion_relativa': 'Por encima del promedio' if df[cat_cols].mean().mean() < current_results['categorias'][categoria]['subcategorias']['puntuacion_total'] else 'Por debajo del promedio'
+                'promedio_historico': category_mean,
+                'posicion_relativa': 'Por encima del promedio' if category_mean < current_average else 'Por debajo del promedio'
             }
             
         return analysis
 
     def generate_comparative_visuals(self, results: Dict, output_dir: str):
-        """Generate visual comparisons with historical data"""
-        if not self.historical_data:
+        """Generate visual comparisons with historical data (rendered in a worker process)"""
+        if self.history is None or not self.history.count():
             return
             
-        # Create visualizations directory
         vis_dir = Path(output_dir) / 'visualizaciones'
-        vis_dir.mkdir(exist_ok=True)
-        
-        # Generate score distribution plot
-        plt.figure(figsize=(10, 6))
-        historical_scores = [eval['puntuacion_total'] for eval in self.historical_data]
-        plt.hist(historical_scores, bins=10, alpha=0.5, label='Histórico')
-        plt.axvline(results['puntuacion_total'], color='r', linestyle='dashed', label='Evaluación actual')
-        plt.title('Distribución de Calificaciones TFM')
-        plt.xlabel('Puntuación')
-        plt.ylabel('Frecuencia')
-        plt.legend()
-        plt.savefig(vis_dir / 'distribucion_calificaciones.png')
-        plt.close()
+        default_renderer().render([
+            distribution_job(vis_dir / 'distribucion_calificaciones.png',
+                             self.history.scores(), [results['puntuacion_total']])
+        ])
 
     def generate_questions(self, results: Dict) -> str:
         """Generate follow-up questions based on the evaluation results"""
         # This will be implemented in a separate artifact
         pass
 
-    def save_results(self, results: Dict, output_base_path: str):
+    def save_results(self, results: Dict, output_base_path: str,
+                     programa: Optional[str] = None, tribunal: Optional[str] = None):
         """
         Save enhanced grading results in multiple formats
         
         Args:
             results (Dict): Grading results to save
             output_base_path (str): Base path for output files
+            programa (str, optional): Master's programme, stored with the evaluation in the history
+            tribunal (str, optional): Tribunal identifier, stored with the evaluation in the history
         """
         output_dir = Path(output_base_path).parent
         
@@ -121,10 +123,8 @@ class UNIRDocumentGrader:
         with open(markdown_path, 'w', encoding='utf-8') as f:
             f.write(markdown_content)
 
-        # Update historical data if available
-        if self.historical_data is not None:
-            self.historical_data.append(results)
-            with open(output_dir / 'historical_evaluations.json', 'w', encoding='utf-8') as f:
-                json.dump(self.historical_data, f, indent=4, ensure_ascii=False)
+        # Append to the history store (one atomic insert, nothing is rewritten)
+        if self.history is not None:
+            self.history.append(results, program=programa, tribunal=tribunal)
 
         return json_path, markdown_path
\ No newline at end of file
@@ -1,48 +1,72 @@
+import argparse
 import re
-import pdfplumber
 import json
 import os
-from AppKit import NSApplication, NSApp
-from Cocoa import NSOpenPanel
 from collections import Counter
 
+from unir_tfm.inputs import pick_file, resolve_files
+from unir_tfm.pdf_extract import stream_pages
+
 
 def select_pdf_file():
-    """Open a native macOS file picker to select a PDF file."""
-    panel = NSOpenPanel.openPanel()
-    panel.setAllowedFileTypes_(["pdf"])
-    panel.setCanChooseFiles_(True)
-    panel.setCanChooseDirectories_(False)
-
-    if panel.runModal() == 1:  # 1 means OK button clicked
-        return panel.URLs()[0].path()
-    return None
+    """Open a native macOS file picker to select a PDF file (optional front end)."""
+    paths = pick_file("Select a PDF file", ["pdf"])
+    return paths[0] if paths else None
 
 
-def identify_head_footer_pattern(pdf):
-    """Identify repeated header/footer patterns across pages."""
-    try:
-        line_counter = Counter()
+# Headers and footers are looked for in the first and last lines of each page
+# only, so the line counter stays small however long the thesis is
+HEAD_FOOTER_LINES = 3
 
-        for page_number, page in enumerate(pdf.pages, start=1):
-            page_text = page.extract_text()
-            if page_text:
-                lines = page_text.splitlines()
-                line_counter.update(lines)
 
-        total_pages = len(pdf.pages)
-        head_footer_patterns = {line for line, count in line_counter.items() if count / total_pages > 0.8}
+def page_edge_lines(lines):
+    """First and last HEAD_FOOTER_LINES lines of a page (the whole page if it is shorter)."""
+    if len(lines) <= 2 * HEAD_FOOTER_LINES:
+        return lines
+    return lines[:HEAD_FOOTER_LINES] + lines[-HEAD_FOOTER_LINES:]
 
-        return head_footer_patterns
-    except Exception as e:
-        print(f"Error identifying header/footer patterns: {e}")
-        return set()
+
+def scan_pages(page_lines):
+    """
+    Single pass over the pages (one list of lines per page, consumed once).
+
+    Counts the header/footer candidates and notes every 'REFERENCIAS' line.
+    The lines of the pages from the first 'REFERENCIAS' heading onward are
+    kept, since the reference list can only start there; earlier page text
+    is dropped as soon as it is counted.
+
+    Returns:
+        tuple: (set of head/footer patterns, {page index: stripped 'REFERENCIAS' lines},
+            number of pages, {page index: lines} from the first heading page onward)
+    """
+    line_counter = Counter()
+    headings = {}
+    tail_pages = {}
+    total_pages = 0
+
+    for page_index, lines in enumerate(page_lines):
+        total_pages += 1
+        line_counter.update(page_edge_lines(lines))
+        found = [line.strip() for line in lines if "REFERENCIAS" in line]
+        if found:
+            headings[page_index] = found
+        if headings:
+            tail_pages[page_index] = lines
+
+    if not total_pages:
+        return set(), {}, 0, {}
+    head_footer_patterns = {line for line, count in line_counter.items() if count / total_pages > 0.8}
+    return head_footer_patterns, headings, total_pages, tail_pages
 
 
 def filter_head_footer_patterns(text, patterns):
     """Remove head/footer patterns from the extracted text."""
-    filtered_lines = [line for line in text.splitlines() if line.strip() not in patterns]
-    return "\n".join(filtered_lines)
+    return "\n".join(filter_head_footer_lines(text.splitlines(), patterns))
+
+
+def filter_head_footer_lines(lines, patterns):
+    """Remove head/footer patterns from a list of lines."""
+    return [line for line in lines if line.strip() not in patterns]
 
 
 def is_page_number(line):
@@ -53,44 +77,74 @@ def is_page_number(line):
     return any(re.match(pattern, line) for pattern in patterns)
 
 
-def extract_references_from_pdf(pdf_path):
-    """Extract references and export to JSON."""
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            text = ""
-            extracted_references = []
-
-            head_footer_patterns = identify_head_footer_pattern(pdf)
+def find_references_start(headings, patterns):
+    """
+    Last page with a 'REFERENCIAS' heading that is not a running header/footer.
 
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    filtered_text = filter_head_footer_patterns(page_text, head_footer_patterns)
-                    text += filtered_text + "\n"
+    Args:
+        headings (dict): {page index: stripped 'REFERENCIAS' lines} from scan_pages
+        patterns (set): Head/footer patterns
 
-            ref_positions = [i for i, line in enumerate(text.splitlines()) if "REFERENCIAS" in line]
-
-            if not ref_positions:
-                print("No occurrences of 'REFERENCIAS' found.")
-                return
-
-            start_line = ref_positions[-1]
-            lines = text.splitlines()
+    Returns:
+        int: Page index of the heading, or None if not found
+    """
+    for page_index in sorted(headings, reverse=True):
+        if any(line not in patterns for line in headings[page_index]):
+            return page_index
+    return None
 
-            for line in lines[start_line:]:
-                if is_page_number(line) or "REFERENCIAS" in line:
-                    continue
 
-                if "Anexo" in line:
-                    break
+def iter_lines_from(pages, patterns):
+    """
+    Yield the filtered lines of a sequence of pages (lists of lines), starting
+    at the last 'REFERENCIAS' heading of its first page.
+    """
+    for page_number, lines in enumerate(pages):
+        lines = filter_head_footer_lines(lines, patterns)
+        if page_number == 0:
+            positions = [i for i, line in enumerate(lines) if "REFERENCIAS" in line]
+            lines = lines[positions[-1]:] if positions else lines
+        yield from lines
 
-                if line.strip():  # Add non-empty lines to the references list
-                    extracted_references.append(line.strip())
 
-            if not extracted_references:
-                print("No references found between 'REFERENCIAS' and 'Anexo'.")
-            else:
-                save_json_file(extracted_references, pdf_path)
+def extract_references_from_pdf(pdf_path):
+    """
+    Extract references and export to JSON.
+
+    Each page is read once: the pass that finds the header/footer patterns
+    and the 'REFERENCIAS' headings also keeps the lines from the first
+    heading onward, and the reference list (up to 'Anexo') is parsed from
+    those.
+    """
+    try:
+        head_footer_patterns, headings, total_pages, tail_pages = scan_pages(
+            page["text"].splitlines() for page in stream_pages(pdf_path)
+        )
+        if not total_pages:
+            print("The PDF has no pages.")
+            return
+
+        start = find_references_start(headings, head_footer_patterns)
+        if start is None:
+            print("No occurrences of 'REFERENCIAS' found.")
+            return
+
+        pages = (tail_pages[page_index] for page_index in range(start, total_pages))
+        extracted_references = []
+        for line in iter_lines_from(pages, head_footer_patterns):
+            if is_page_number(line) or "REFERENCIAS" in line:
+                continue
+
+            if "Anexo" in line:
+                break
+
+            if line.strip():  # Add non-empty lines to the references list
+                extracted_references.append(line.strip())
+
+        if not extracted_references:
+            print("No references found between 'REFERENCIAS' and 'Anexo'.")
+        else:
+            save_json_file(extracted_references, pdf_path)
 
     except Exception as e:
         print(f"Error during extraction: {e}")
@@ -111,17 +165,22 @@ def save_json_file(references, input_file_path):
         print(f"Error saving JSON file: {e}")
 
 
-def main():
-    """Main function to select PDF, extract references, and save them as JSON."""
-    NSApp()
-    print("Select a PDF file...")
-    pdf_path = select_pdf_file()
+def main(argv=None):
+    """Main function to select PDFs, extract references, and save them as JSON."""
+    parser = argparse.ArgumentParser(description="Extract the reference list of TFM PDFs to JSON")
+    parser.add_argument("pdfs", nargs="*",
+                        help="PDF files, globs, directories or @manifest files (a dialog opens if omitted)")
+    args = parser.parse_args(argv)
+
+    if not args.pdfs:
+        print("Select a PDF file...")
+    pdf_paths = resolve_files(args.pdfs, "Select a PDF file", ["pdf"])
 
-    if pdf_path:
+    if not pdf_paths:
+        print("File selection cancelled.")
+    for pdf_path in pdf_paths:
         print(f"Extracting references from {pdf_path}...")
         extract_references_from_pdf(pdf_path)
-    else:
-        print("File selection cancelled.")
 
 
 if __name__ == "__main__":
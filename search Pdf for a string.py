@@ -2,12 +2,18 @@
 # PDF Search Tool for macOS
 # This script searches for a specific word in all PDF files within a specified folder and its subfolders.
 # It handles common macOS quirks such as hidden files and directories, and provides a summary of the search results.    
+# Case-insensitive searches go through a persistent inverted index (built in parallel and updated incrementally),
+# which also makes them accent-insensitive and supports multi-word phrases.
 
+import argparse
 import os
 import sys
-import PyPDF2
 from datetime import datetime
 
+from unir_tfm.inputs import resolve_directory
+from unir_tfm.pdf_extract import extract_pages
+from unir_tfm.pdf_index import PDFIndex
+
 def search_pdfs_for_word(root_folder, search_word, case_sensitive=False):
     """
     Search for a word in all PDF files within a folder and its subfolders on macOS.
@@ -42,22 +48,19 @@ def search_pdfs_for_word(root_folder, search_word, case_sensitive=False):
                     continue
                     
                 try:
-                    with open(filepath, 'rb') as pdf_file:
-                        pdf_reader = PyPDF2.PdfReader(pdf_file)
-                        found_in_file = False
+                    found_in_file = False
+                    
+                    for page in extract_pages(filepath):
+                        text = page["text"]
                         
-                        for page_num in range(len(pdf_reader.pages)):
-                            page = pdf_reader.pages[page_num]
-                            text = page.extract_text()
-                            
-                            if text:
-                                content = text if case_sensitive else text.lower()
-                                if search_term in content:
-                                    if not found_in_file:
-                                        print(f"\n📄 Found in: {filepath}")
-                                        found_in_file = True
-                                    print(f"   📑 Page {page_num + 1}")
-                                    total_matches += 1
+                        if text:
+                            content = text if case_sensitive else text.lower()
+                            if search_term in content:
+                                if not found_in_file:
+                                    print(f"\n📄 Found in: {filepath}")
+                                    found_in_file = True
+                                print(f"   📑 Page {page['page']}")
+                                total_matches += 1
                                     
                 except Exception as e:
                     print(f"⚠️ Error processing {filename}: {str(e)}", file=sys.stderr)
@@ -70,6 +73,52 @@ def search_pdfs_for_word(root_folder, search_word, case_sensitive=False):
     print(f"• Total matches found: {total_matches}")
     print(f"• Search duration: {duration.total_seconds():.2f} seconds")
 
+def search_pdfs_with_index(root_folder, search_phrase):
+    """
+    Search for a word or phrase using the persistent inverted index.
+    
+    The index is brought up to date first: only PDFs added or modified since
+    the last run are extracted (in parallel across processes).
+    
+    Args:
+        root_folder (str): Path to the root folder to search
+        search_phrase (str): Word or phrase (accent- and case-insensitive)
+    """
+    print(f"\n🔍 Searching for '{search_phrase}' in PDFs under: {root_folder}")
+    print("ℹ️ Performing accent- and case-insensitive search (indexed)")
+
+    index = PDFIndex()
+    try:
+        start_time = datetime.now()
+
+        def report(path, error):
+            if error:
+                print(f"⚠️ Error processing {os.path.basename(path)}: {error}", file=sys.stderr)
+
+        stats = index.update(root_folder, progress=report)
+        index_time = datetime.now() - start_time
+
+        start_time = datetime.now()
+        matches = index.search(search_phrase, root_folder)
+        query_time = datetime.now() - start_time
+
+        current_file = None
+        pages_seen = set()
+        for match in matches:
+            if match["path"] != current_file:
+                current_file = match["path"]
+                print(f"\n📄 Found in: {current_file}")
+            if (current_file, match["page"]) not in pages_seen:
+                pages_seen.add((current_file, match["page"]))
+                print(f"   📑 Page {match['page']}")
+    finally:
+        index.close()
+
+    print("\n📊 Search Summary:")
+    print(f"• PDF files indexed now / unchanged / removed: {stats['indexed']} / {stats['unchanged']} / {stats['removed']}")
+    print(f"• Pages with matches: {len(pages_seen)} ({len(matches)} occurrences)")
+    print(f"• Index update: {index_time.total_seconds():.2f} seconds, query: {query_time.total_seconds() * 1000:.1f} ms")
+
 def get_folder_path():
     """Helper function to handle folder path input with macOS quirks"""
     while True:
@@ -89,11 +138,23 @@ def get_folder_path():
         print("Error: Folder not found. Please try again.", file=sys.stderr)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search a word or phrase in every PDF of a folder")
+    parser.add_argument("folder", nargs="?", help="Folder to search (asked for if omitted)")
+    parser.add_argument("term", nargs="?", help="Word or phrase to search for (asked for if omitted)")
+    parser.add_argument("--case-sensitive", action="store_true",
+                        help="Exact-case scan instead of the index (asked for if the term is omitted)")
+    args = parser.parse_args()
+
     print("\nPDF Search Tool for macOS")
     print("------------------------")
     
-    folder_path = get_folder_path()
-    search_term = input("Enter the word to search for: ").strip()
-    case_sensitive = input("Case-sensitive search? (y/N): ").strip().lower() == 'y'
+    folder_path = resolve_directory(args.folder, "Folder to search") if args.folder else get_folder_path()
+    search_term = args.term or input("Enter the word to search for: ").strip()
+    # Only asked when the search itself was entered interactively
+    case_sensitive = args.case_sensitive or (
+        not args.term and input("Case-sensitive search? (y/N): ").strip().lower() == 'y')
     
-    search_pdfs_for_word(folder_path, search_term, case_sensitive)
\ No newline at end of file
+    if case_sensitive:
+        search_pdfs_for_word(folder_path, search_term, case_sensitive)
+    else:
+        search_pdfs_with_index(folder_path, search_term)
\ No newline at end of file
@@ -0,0 +1,78 @@
+import json
+import re
+import time
+
+import docx
+import pytest
+
+from unir_tfm.grading_bench import load_script
+from unir_tfm.stub_client import StubAnthropicClient, default_responder
+
+LEVELS = {"Suspenso (0-4)": "a", "Aprobado (5-6)": "b", "Notable (7-8)": "c", "Sobresaliente (9-10)": "d"}
+RUBRIC = {
+    "Estructura (40%)": [{"subcategoría": f"Sub E{i}", "criterios": LEVELS} for i in range(3)],
+    "Contenido (60%)": [{"subcategoría": f"Sub C{i}", "criterios": LEVELS} for i in range(2)],
+}
+SUBCATEGORIES = ["Sub E0", "Sub E1", "Sub E2", "Sub C0", "Sub C1"]
+
+
+def _subcategory(request):
+    match = re.search(r"subcategoría '(Sub [EC]\d)'", request["messages"][0]["content"])
+    return match.group(1) if match else None
+
+
+def _grader(tmp_path, client, max_workers=5):
+    return load_script("grade").UNIRDocumentGrader(
+        None, client=client, max_workers=max_workers, cache_responses=False,
+        checkpoint_dir=str(tmp_path / "checkpoints"), charts=False
+    )
+
+
+@pytest.fixture
+def inputs(tmp_path, monkeypatch):
+    monkeypatch.setenv("UNIR_TFM_CACHE_DIR", str(tmp_path / "cache"))
+    rubric_path = tmp_path / "rubrica.json"
+    rubric_path.write_text(json.dumps(RUBRIC, ensure_ascii=False), encoding="utf-8")
+    document = docx.Document()
+    for paragraph in ("1. Introducción", "Objetivos y estructura del trabajo.", "2. Metodología",
+                      "Método y resultados obtenidos."):
+        document.add_paragraph(paragraph)
+    thesis_path = tmp_path / "tfm.docx"
+    document.save(str(thesis_path))
+    return str(rubric_path), str(thesis_path)
+
+
+def test_results_follow_rubric_order_whatever_the_completion_order(tmp_path, inputs):
+    def responder(request):
+        name = _subcategory(request)
+        if name is None:
+            return default_responder(request)
+        # Later subcategories answer first
+        index = SUBCATEGORIES.index(name)
+        time.sleep(0.02 * (len(SUBCATEGORIES) - index))
+        return f"Puntuación: {index + 5}\nJustificación: ok"
+
+    client = StubAnthropicClient(responder)
+    results = _grader(tmp_path, client).grade_solution(None, *inputs)
+
+    assert client.max_in_flight > 1
+    assert list(results["categorias"]) == ["Estructura", "Contenido"]
+    assert list(results["categorias"]["Estructura"]["subcategorias"].items()) == \
+        [("Sub E0", 5.0), ("Sub E1", 6.0), ("Sub E2", 7.0)]
+    assert list(results["categorias"]["Contenido"]["subcategorias"].items()) == [("Sub C0", 8.0), ("Sub C1", 9.0)]
+
+
+def test_failed_subcategory_is_the_only_one_requested_again(tmp_path, inputs):
+    def failing_responder(request):
+        if _subcategory(request) == "Sub E1":
+            raise RuntimeError("API caída")
+        return default_responder(request)
+
+    with pytest.raises(RuntimeError):
+        _grader(tmp_path, StubAnthropicClient(failing_responder)).grade_solution(None, *inputs)
+
+    client = StubAnthropicClient()
+    results = _grader(tmp_path, client).grade_solution(None, *inputs)
+
+    assert [_subcategory(request) for request in client.calls if _subcategory(request)] == ["Sub E1"]
+    assert list(results["categorias"]["Estructura"]["subcategorias"]) == ["Sub E0", "Sub E1", "Sub E2"]
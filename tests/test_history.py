@@ -0,0 +1,22 @@
+import pytest
+
+from unir_tfm.history import HistoryStore, parse_date
+
+
+def test_parse_date_formats():
+    assert parse_date("2024-05-01T10:11:12.123456") == "2024-05-01"
+    assert parse_date("02/01/2024") == "2024-01-02"
+    with pytest.raises(ValueError):
+        parse_date("2024-13-45")
+
+
+def test_unreadable_record_dates_are_stored_as_null(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    store.append({"fecha": "Unknown", "puntuacion_total": 5})
+    store.append({"fecha": "02/01/2024", "puntuacion_total": 7})
+
+    assert [record["date"] for record in store.records()] == [None, "2024-01-02"]
+    assert store.scores(since="2024-01-01") == [7.0]
+    with pytest.raises(ValueError):
+        store.scores(since="01-2024")
+    store.close()
@@ -0,0 +1,21 @@
+from unir_tfm.journal import EvaluationJournal
+
+
+def test_append_after_truncated_line_keeps_new_record(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = EvaluationJournal(str(path))
+    journal.append("subcategoria", "A", {"puntuacion": 7})
+    journal.append("subcategoria", "B", {"puntuacion": 8})
+
+    # Crash while writing the second record: its newline and closing brace never reach the disk
+    path.write_bytes(path.read_bytes()[:-3])
+
+    resumed = EvaluationJournal(str(path))
+    assert resumed.get("subcategoria", "A") == {"puntuacion": 7}
+    assert resumed.get("subcategoria", "B") is None
+    resumed.append("subcategoria", "C", {"puntuacion": 9})
+
+    reloaded = EvaluationJournal(str(path))
+    assert reloaded.get("subcategoria", "A") == {"puntuacion": 7}
+    assert reloaded.get("subcategoria", "C") == {"puntuacion": 9}
+    assert len(reloaded) == 2
@@ -0,0 +1,63 @@
+import pytest
+
+from unir_tfm.llm import LLMClient, _call_declared
+from unir_tfm.mock_llm import MOCK_API_KEY, MockLLMServer
+from unir_tfm.response_cache import ResponseCache
+from unir_tfm.scheduler import RequestScheduler
+from unir_tfm.stub_client import default_responder
+
+
+@pytest.fixture
+def server():
+    received = []
+
+    def responder(request):
+        received.append(request)
+        return default_responder(request)
+
+    with MockLLMServer(responder=responder) as mock:
+        mock.received = received
+        yield mock
+
+
+def _client(server, tmp_path, provider="anthropic"):
+    base_url = server.url if provider == "anthropic" else f"{server.url}/v1"
+    llm = LLMClient(provider, api_key=MOCK_API_KEY, base_url=base_url, scheduler=RequestScheduler())
+    llm.cache = ResponseCache(str(tmp_path / "responses.sqlite3"), enabled=True)
+    return llm
+
+
+def test_undeclared_kwargs_are_moved_to_extra_body():
+    def create(model, messages, extra_body=None):
+        return {"model": model, "messages": messages, "extra_body": extra_body}
+
+    sent = _call_declared(create, model="m", messages=[], temperature=0.3, extra_body={"top_k": 5})
+    assert sent["extra_body"] == {"top_k": 5, "temperature": 0.3}
+
+
+@pytest.mark.parametrize("provider", ["anthropic", "openai"])
+def test_temperature_reaches_the_wire(server, tmp_path, provider):
+    llm = _client(server, tmp_path, provider)
+    llm.complete("Hola", "mock-model", max_tokens=20, temperature=0.3)
+
+    assert server.received[-1]["temperature"] == 0.3
+
+
+def test_identical_request_is_a_cache_hit_that_skips_the_scheduler(server, tmp_path):
+    llm = _client(server, tmp_path)
+    first = llm.complete("Hola", "mock-model", max_tokens=20, temperature=0.3)
+    second = llm.complete("Hola", "mock-model", max_tokens=20, temperature=0.3)
+
+    assert second == first
+    assert server.stats()["requests"] == 1
+    assert llm.scheduler.stats()["calls"] == 1
+    assert llm.usage.summary()["response_cache_hits"] == 1
+
+
+def test_changed_generation_parameter_misses_the_cache(server, tmp_path):
+    llm = _client(server, tmp_path)
+    llm.complete("Hola", "mock-model", max_tokens=20, temperature=0.3)
+    llm.complete("Hola", "mock-model", max_tokens=20, temperature=0.9)
+
+    assert server.stats()["requests"] == 2
+    assert llm.scheduler.stats()["calls"] == 2
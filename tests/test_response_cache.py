@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+from unir_tfm.response_cache import CachedAnthropicClient, ResponseCache
+from unir_tfm.stub_client import StubAnthropicClient
+
+REQUEST = {"model": "claude-test", "max_tokens": 10, "messages": [{"role": "user", "content": "Hola"}]}
+
+
+class TruncatingClient(StubAnthropicClient):
+    """Stub whose replies all stop at max_tokens"""
+
+    def _handle(self, request):
+        return SimpleNamespace(**{**vars(super()._handle(request)), "stop_reason": "max_tokens"})
+
+
+def test_complete_reply_is_replayed(tmp_path):
+    stub = StubAnthropicClient()
+    client = CachedAnthropicClient(stub, ResponseCache(str(tmp_path / "responses.sqlite3"), enabled=True))
+    first = client.messages.create(**REQUEST)
+    second = client.messages.create(**REQUEST)
+
+    assert len(stub.calls) == 1
+    assert second.from_cache and second.content[0].text == first.content[0].text
+
+
+def test_truncated_reply_is_not_cached(tmp_path):
+    stub = TruncatingClient()
+    client = CachedAnthropicClient(stub, ResponseCache(str(tmp_path / "responses.sqlite3"), enabled=True))
+    client.messages.create(**REQUEST)
+    response = client.messages.create(**REQUEST)
+
+    assert len(stub.calls) == 2
+    assert not getattr(response, "from_cache", False)
@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+
+import pytest
+
+from unir_tfm.scheduler import RequestScheduler, estimate_tokens
+
+REQUEST = {"model": "claude-test", "max_tokens": 1000, "messages": [{"role": "user", "content": "x" * 400}]}
+
+
+def _flaky_send(failures: int):
+    attempts = []
+
+    def send():
+        attempts.append(1)
+        if len(attempts) <= failures:
+            raise TimeoutError("timeout")
+        return SimpleNamespace(usage=SimpleNamespace(input_tokens=100, output_tokens=50))
+
+    return send, attempts
+
+
+def test_failed_attempts_refund_their_token_reservation():
+    scheduler = RequestScheduler(tokens_per_minute=60_000, base_delay=0.001)
+    send, attempts = _flaky_send(failures=2)
+    scheduler.call(send, REQUEST)
+
+    assert len(attempts) == 3
+    # Only the successful attempt is charged, at its real usage
+    assert scheduler.tokens.level == pytest.approx(60_000 - 150, abs=5)
+    assert scheduler.stats()["spent_tokens"] == 150
+
+
+def test_final_failure_refunds_its_token_reservation():
+    scheduler = RequestScheduler(tokens_per_minute=60_000, max_retries=1, base_delay=0.001)
+    send, _ = _flaky_send(failures=5)
+    with pytest.raises(TimeoutError):
+        scheduler.call(send, REQUEST)
+
+    assert estimate_tokens(REQUEST) == 1100
+    assert scheduler.tokens.level == pytest.approx(60_000, abs=5)
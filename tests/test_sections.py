@@ -0,0 +1,27 @@
+from unir_tfm.sections import segment_pages
+
+PAGES = [
+    {"page": 1, "text": "Portada"},
+    {"page": 2, "text": "Texto sobre las metas del trabajo"},
+    {"page": 3, "text": "Texto sobre el método empleado"},
+]
+
+
+def test_outline_entry_before_previous_section_is_skipped():
+    # Titles not on their pages, second entry points back to an earlier page
+    outline = [{"title": "Metodología", "page": 3, "level": 0},
+               {"title": "Objetivos específicos", "page": 2, "level": 0}]
+    sections = segment_pages(PAGES, outline)
+
+    titles = [section["title"] for section in sections]
+    assert titles == ["Preliminares", "Metodología"]
+    assert sections[1]["text"] == "Texto sobre el método empleado"
+
+
+def test_outline_entries_in_page_order_start_at_their_pages():
+    outline = [{"title": "Objetivos específicos", "page": 2, "level": 0},
+               {"title": "Metodología", "page": 3, "level": 0}]
+    sections = segment_pages(PAGES, outline)
+
+    assert [section["title"] for section in sections] == ["Preliminares", "Objetivos específicos", "Metodología"]
+    assert sections[1]["text"] == "Texto sobre las metas del trabajo"
@@ -0,0 +1,7 @@
+"""
+Shared building blocks for the UNIR TFM evaluation scripts.
+
+The scripts at the top level of the repository (graders, question
+generators, citation checker...) import their common infrastructure from
+this package so it only has to be written once.
+"""
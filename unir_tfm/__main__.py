@@ -0,0 +1,5 @@
+import sys
+
+from unir_tfm.cli import main
+
+sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+Buffered, level-filtered file logging for the TFM scripts.
+
+Callers log through a QueueHandler, so writing a message costs a queue
+put; a QueueListener thread formats the records and BufferedFileHandler
+appends them to disk in batches (when the buffer fills, every
+flush_interval seconds, immediately for ERROR and above, and at exit).
+The default format keeps the existing Markdown debug log lines:
+
+    - **[2024-10-08T10:15:00.123456]** message
+
+Set UNIR_TFM_LOG_LEVEL (DEBUG, INFO, WARNING, ERROR or OFF) to filter;
+with OFF the loggers are disabled and no file or thread is created.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional
+
+MARKDOWN_FORMAT = "- **[%(asctime)s]** %(message)s"
+PLAIN_FORMAT = "%(message)s"
+DEFAULT_CAPACITY = 200
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+_lock = threading.Lock()
+_loggers: Dict[str, logging.Logger] = {}
+_listeners: List[QueueListener] = []
+
+
+class IsoFormatter(logging.Formatter):
+    """Formatter whose %(asctime)s is the ISO 8601 timestamp of the record"""
+
+    def formatTime(self, record, datefmt=None):
+        return datetime.fromtimestamp(record.created).isoformat()
+
+
+class BufferedFileHandler(logging.Handler):
+    def __init__(self, path: str, capacity: int = DEFAULT_CAPACITY,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL, flush_level: int = logging.ERROR):
+        """
+        Append formatted records to a file in batches
+
+        Args:
+            path (str): Log file (opened in append mode on each flush)
+            capacity (int): Number of buffered lines that triggers a flush
+            flush_interval (float): Maximum seconds a line waits while records keep arriving
+            flush_level (int): Records at or above this level are flushed immediately
+        """
+        super().__init__()
+        self.path = path
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.flush_level = flush_level
+        self.buffer: List[str] = []
+        self._last_flush = time.monotonic()
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.buffer.append(self.format(record) + "\n")
+        except Exception:
+            self.handleError(record)
+            return
+
+        if (len(self.buffer) >= self.capacity
+                or record.levelno >= self.flush_level
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self.buffer:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as log_file:
+                        log_file.writelines(self.buffer)
+                except OSError as e:
+                    print(f"Failed to write debug log: {e}")
+                self.buffer = []
+            self._last_flush = time.monotonic()
+        finally:
+            self.release()
+
+    def close(self):
+        self.flush()
+        super().close()
+
+
+def _level_from_env() -> Optional[int]:
+    name = os.environ.get("UNIR_TFM_LOG_LEVEL", "DEBUG").upper()
+    if name == "OFF":
+        return None
+    level = logging.getLevelName(name)
+    return level if isinstance(level, int) else logging.DEBUG
+
+
+def get_file_logger(path: str, fmt: str = MARKDOWN_FORMAT, level: Optional[int] = None,
+                    capacity: int = DEFAULT_CAPACITY, flush_interval: float = DEFAULT_FLUSH_INTERVAL) -> logging.Logger:
+    """
+    Return the shared buffered logger writing to a file.
+
+    The first call for a path creates the logger; later calls return it
+    unchanged, so this is cheap enough to call for every message.
+
+    Args:
+        path (str): Log file path
+        fmt (str): Line format (MARKDOWN_FORMAT or PLAIN_FORMAT)
+        level (int, optional): Minimum level (defaults to UNIR_TFM_LOG_LEVEL)
+        capacity (int): Lines buffered before a batched write
+        flush_interval (float): Seconds between batched writes while logging
+
+    Returns:
+        logging.Logger: Logger that never propagates to the root logger
+    """
+    path = os.path.abspath(path)
+    logger = _loggers.get(path)
+    if logger is not None:
+        return logger
+
+    with _lock:
+        if path in _loggers:
+            return _loggers[path]
+
+        # Named by path: a logger is never shared by two files, even across shutdown()
+        logger = logging.getLogger(f"unir_tfm.file:{path}")
+        logger.propagate = False
+        logger.disabled = False
+        level = level if level is not None else _level_from_env()
+
+        if level is None:
+            logger.disabled = True
+        else:
+            logger.setLevel(level)
+            records = queue.SimpleQueue()
+            handler = BufferedFileHandler(path, capacity, flush_interval)
+            handler.setFormatter(IsoFormatter(fmt))
+            listener = QueueListener(records, handler)
+            listener.start()
+            logger.addHandler(QueueHandler(records))
+            _listeners.append(listener)
+
+        _loggers[path] = logger
+        return logger
+
+
+def shutdown():
+    """Drain every queue, flush the buffered lines to disk and detach the handlers from the loggers"""
+    with _lock:
+        while _listeners:
+            listener = _listeners.pop()
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+        for logger in _loggers.values():
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+                handler.close()
+            logger.disabled = False
+        _loggers.clear()
+
+
+atexit.register(shutdown)
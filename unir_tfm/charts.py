@@ -0,0 +1,164 @@
+"""
+Chart rendering off the main process.
+
+Charts are described as plain, picklable job dicts (see the *_job
+builders) and rendered in a worker process with matplotlib's
+object-oriented API on the Agg canvas; pyplot and its global figure
+state are never used. matplotlib is imported only inside the worker, so
+importing this module (or running with charts disabled) costs nothing,
+and a whole batch of charts is rendered in one pass by one warm worker.
+"""
+import atexit
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_SIZE = (10, 6)
+DEFAULT_DPI = 100
+
+
+def distribution_job(path: str, historical: List[float], current: List[float],
+                     title: str = 'Distribución de Calificaciones TFM') -> Dict:
+    """Histogram of historical final scores with the current score(s) on top"""
+    return {"kind": "distribution", "path": str(path), "historical": list(historical),
+            "current": list(current), "title": title}
+
+
+def radar_job(path: str, scores: Dict[str, float], reference: Optional[Dict[str, float]] = None,
+              title: str = 'Puntuación por categoría') -> Dict:
+    """Radar of the category averages of one evaluation, optionally against reference averages"""
+    return {"kind": "radar", "path": str(path), "scores": dict(scores),
+            "reference": dict(reference) if reference else None, "title": title, "size": (7, 7)}
+
+
+def boxplot_job(path: str, series: Dict[str, List[float]], current: Optional[Dict[str, float]] = None,
+                title: str = 'Puntuaciones por subcategoría') -> Dict:
+    """One box per subcategory (e.g. over a cohort), with an optional highlighted evaluation"""
+    return {"kind": "boxplot", "path": str(path), "series": {name: list(values) for name, values in series.items()},
+            "current": dict(current) if current else None, "title": title,
+            "size": (max(8, 0.9 * len(series)), 6)}
+
+
+def _draw_distribution(figure, job: Dict):
+    ax = figure.add_subplot()
+    ax.hist(job["historical"], bins=10, range=(0, 10), alpha=0.5, label='Histórico')
+    if len(job["current"]) == 1:
+        ax.axvline(job["current"][0], color='r', linestyle='dashed', label='Evaluación actual')
+    elif job["current"]:
+        ax.hist(job["current"], bins=10, range=(0, 10), alpha=0.5, color='r', label='Lote actual')
+    ax.set_title(job["title"])
+    ax.set_xlabel('Puntuación')
+    ax.set_ylabel('Frecuencia')
+    ax.legend()
+
+
+def _draw_radar(figure, job: Dict):
+    import numpy as np
+
+    labels = list(job["scores"])
+    angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False).tolist()
+    ax = figure.add_subplot(projection='polar')
+
+    def plot(values, label, color):
+        closed = list(values) + [values[0]]
+        ax.plot(angles + angles[:1], closed, color=color, label=label)
+        ax.fill(angles + angles[:1], closed, color=color, alpha=0.2)
+
+    plot([job["scores"][name] for name in labels], 'Evaluación actual', 'tab:red')
+    if job["reference"]:
+        plot([job["reference"].get(name, 0) for name in labels], 'Media histórica', 'tab:blue')
+    ax.set_xticks(angles)
+    ax.set_xticklabels(labels)
+    ax.set_ylim(0, 10)
+    ax.set_title(job["title"])
+    ax.legend(loc='lower right')
+
+
+def _draw_boxplot(figure, job: Dict):
+    labels = list(job["series"])
+    positions = range(1, len(labels) + 1)
+    ax = figure.add_subplot()
+    ax.boxplot([job["series"][name] for name in labels], positions=list(positions))
+    if job["current"]:
+        ax.scatter(list(positions), [job["current"].get(name) for name in labels],
+                   color='r', zorder=3, label='Evaluación actual')
+        ax.legend()
+    ax.set_xticks(list(positions))
+    ax.set_xticklabels(labels, rotation=45, ha='right')
+    ax.set_ylim(0, 10.5)
+    ax.set_ylabel('Puntuación')
+    ax.set_title(job["title"])
+
+
+_DRAWERS: Dict[str, Callable] = {
+    "distribution": _draw_distribution,
+    "radar": _draw_radar,
+    "boxplot": _draw_boxplot,
+}
+
+
+def render_jobs(jobs: List[Dict]) -> List[str]:
+    """
+    Render chart jobs to PNG files (runs in the worker process)
+
+    Returns:
+        List[str]: Paths of the written images, in job order
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    paths = []
+    for job in jobs:
+        figure = Figure(figsize=job.get("size", DEFAULT_SIZE))
+        FigureCanvasAgg(figure)
+        _DRAWERS[job["kind"]](figure, job)
+        figure.tight_layout()
+        Path(job["path"]).parent.mkdir(parents=True, exist_ok=True)
+        figure.savefig(job["path"], dpi=job.get("dpi", DEFAULT_DPI))
+        paths.append(job["path"])
+    return paths
+
+
+class ChartRenderer:
+    def __init__(self, in_process: bool = False):
+        """
+        Initialize the renderer
+
+        Args:
+            in_process (bool): Render in the calling process (no worker), e.g. where
+                subprocesses are not available
+        """
+        self.in_process = in_process
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def submit(self, jobs: List[Dict]) -> Future:
+        """Queue a batch of jobs on the worker; the future returns the written paths"""
+        if self.in_process:
+            future = Future()
+            future.set_result(render_jobs(jobs))
+            return future
+        if self._executor is None:
+            # One long-lived worker: matplotlib is imported once per process, not per chart
+            self._executor = ProcessPoolExecutor(max_workers=1)
+        return self._executor.submit(render_jobs, jobs)
+
+    def render(self, jobs: List[Dict]) -> List[str]:
+        """Render a batch of jobs and wait for the files"""
+        return self.submit(jobs).result() if jobs else []
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+_default_renderer: Optional[ChartRenderer] = None
+
+
+def default_renderer() -> ChartRenderer:
+    """Process-wide renderer shared by the graders"""
+    global _default_renderer
+    if _default_renderer is None:
+        _default_renderer = ChartRenderer()
+        atexit.register(_default_renderer.close)
+    return _default_renderer
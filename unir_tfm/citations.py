@@ -0,0 +1,137 @@
+"""
+Indexed matching of in-text citations against the reference list.
+
+References are indexed by (normalized first surname, year) so each
+citation is a dictionary lookup. Normalization folds accents and case,
+understands "et al.", several authors joined with "y"/"&"/"and", and
+year suffixes such as "2020a". When the exact key misses, a fuzzy
+comparison runs only over the references of the same year.
+"""
+import difflib
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+FUZZY_THRESHOLD = 0.85
+
+_AUTHOR_SEPARATORS = re.compile(r"\s*(?:,|&|\by\b|\band\b|\be\b)\s*", re.IGNORECASE)
+_ET_AL = re.compile(r"\bet\s+al\.?", re.IGNORECASE)
+_APA_AUTHOR = re.compile(r"([^,&]+?),\s*(?:[A-ZÁÉÍÓÚÑÜ]\.\s*-?\s*)+")
+_YEAR = re.compile(r"^(\d{4})([a-z]?)$")
+
+
+def fold(text: str) -> str:
+    """Lowercase, strip accents and punctuation, and collapse whitespace"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    without_accents = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    cleaned = re.sub(r"[^\w\s-]", " ", without_accents.lower())
+    return re.sub(r"\s+", " ", cleaned).strip()
+
+
+def split_year(year: str) -> Tuple[str, str]:
+    """Split '2020a' into ('2020', 'a')"""
+    match = _YEAR.match(year.strip())
+    return (match.group(1), match.group(2)) if match else (year.strip(), "")
+
+
+def citation_surnames(author_text: str) -> List[str]:
+    """
+    Surnames named in an in-text citation.
+
+    'García et al.' -> ['garcia'], 'Pérez y López' -> ['perez', 'lopez']
+    """
+    text = _ET_AL.sub("", author_text)
+    parts = [fold(part) for part in _AUTHOR_SEPARATORS.split(text)]
+    return [part for part in parts if part]
+
+
+def reference_surnames(author_text: str) -> List[str]:
+    """
+    Surnames of the authors of an APA reference.
+
+    'Pérez, A. y López, B' -> ['perez', 'lopez']; corporate authors are kept whole.
+    """
+    # The reference parser drops the final '.', restore it so the last initial matches
+    text = author_text.strip()
+    if re.search(r"\b[A-ZÁÉÍÓÚÑÜ]$", text):
+        text += "."
+
+    surnames = []
+    for match in _APA_AUTHOR.finditer(text):
+        name = re.sub(r"^\s*(?:y|&|and|e)\s+", "", match.group(1).strip(" ,"), flags=re.IGNORECASE)
+        if fold(name):
+            surnames.append(fold(name))
+    return surnames or [fold(text)]
+
+
+class ReferenceIndex:
+    def __init__(self, references: List[Dict]):
+        """
+        Build the lookup tables for a parsed reference list
+
+        Args:
+            references (List[Dict]): References with at least 'author' and 'year'
+        """
+        self.references = references
+        self._authors: List[List[str]] = []
+        self._exact: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        self._by_base_year: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        self._by_year: Dict[str, List[int]] = defaultdict(list)
+
+        for position, ref in enumerate(references):
+            surnames = [name for name in reference_surnames(ref["author"]) if name]
+            self._authors.append(surnames)
+            # Authors that fold to nothing ('—', '...') cannot be cited by name
+            if not surnames:
+                continue
+            base_year, suffix = split_year(ref["year"])
+            self._exact[(surnames[0], base_year + suffix)].append(position)
+            self._by_base_year[(surnames[0], base_year)].append(position)
+            self._by_year[base_year].append(position)
+
+    def match(self, author: str, year: str) -> Optional[int]:
+        """
+        Find the reference cited as (author, year).
+
+        Args:
+            author (str): Author part of the citation ('García et al.', 'Pérez y López'...)
+            year (str): Year part of the citation, optionally with suffix ('2020a')
+
+        Returns:
+            Optional[int]: Position of the matched reference, or None
+        """
+        cited = citation_surnames(author)
+        if not cited:
+            return None
+        base_year, suffix = split_year(year)
+
+        # 1. Hash lookups: exact year, then any suffix of an unsuffixed year
+        candidates = self._exact.get((cited[0], base_year + suffix), [])
+        if not candidates and not suffix:
+            candidates = self._by_base_year.get((cited[0], base_year), [])
+        if candidates:
+            return self._best(candidates, cited)
+
+        # 2. Fuzzy fallback restricted to the references of that year
+        best_position, best_score = None, FUZZY_THRESHOLD
+        for position in self._by_year.get(base_year, []):
+            if suffix and split_year(self.references[position]["year"])[1] not in ("", suffix):
+                continue
+            score = self._similarity(cited[0], self._authors[position][0])
+            if score >= best_score:
+                best_position, best_score = position, score
+        return best_position
+
+    def _best(self, candidates: List[int], cited: List[str]) -> int:
+        """Prefer the candidate whose co-authors cover the other cited surnames"""
+        if len(candidates) == 1 or len(cited) == 1:
+            return candidates[0]
+        return max(candidates, key=lambda position: sum(name in self._authors[position] for name in cited[1:]))
+
+    @staticmethod
+    def _similarity(cited: str, surname: str) -> float:
+        # 'garcia' cited for 'garcia lopez' (compound surnames) counts as a match
+        if surname.split()[:1] == [cited] or cited.split()[:1] == [surname]:
+            return 1.0
+        return difflib.SequenceMatcher(None, cited, surname).ratio()
@@ -0,0 +1,185 @@
+"""
+Unified command line of the UNIR TFM scripts.
+
+    python -m unir_tfm grade --batch tribunal/ --rubric rubrica.json
+    python -m unir_tfm questions --toc tribunal/*.pdf
+    python -m unir_tfm bench
+
+Each subcommand runs one of the scripts at the top level of the repository
+as if it had been launched directly, with the remaining arguments (input
+files, globs, directories or @manifest files; see unir_tfm.inputs).
+This module only uses the standard library and the scripts load anthropic,
+pandas, matplotlib, PyPDF2 and the PyObjC bridges inside the functions that
+use them, so `--help` and the light paths never pay for those imports.
+`bench` times the startup of the entry point in fresh interpreters.
+"""
+import argparse
+import os
+import runpy
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from unir_tfm.inputs import InputError
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Every script parses its own arguments (inputs, options and --help); a
+# variant flag picks a sibling script instead and is not forwarded
+COMMANDS: Dict[str, Dict] = {
+    "grade": {
+        "script": "UNIR grading final.py",
+        "help": "Grade a thesis or a batch of theses (files, globs, directories, @manifest)"
+    },
+    "questions": {
+        "script": "UNIR TFM preguntas.py",
+        "variants": {"--toc": "UNIR TFM preguntas según la TdC.py"},
+        "help": "Generate defence questions for theses (--toc: by table of contents)"
+    },
+    "citations": {
+        "script": "citation checking WIP.py",
+        "help": "Check the in-text citations of a thesis against its references"
+    },
+    "references": {
+        "script": "references extrated from UNIR TFM.py",
+        "help": "Extract the reference list of theses to JSON"
+    },
+    "search": {
+        "script": "search Pdf for a string.py",
+        "help": "Search a word or phrase in every PDF of a folder"
+    },
+    "rubric": {
+        "script": "UNIR Elijo el excel para crear la rúbrica.py",
+        "help": "Convert the UNIR rubric Excel file to JSON"
+    },
+    "acta": {
+        "script": "UNIR de rúbrica a acta.py",
+        "variants": {"--fields": "UNIR explora estructura PDF acta.py"},
+        "help": "Fill the acta PDF form from the rubric Excel file (--fields: list the form fields)"
+    },
+    "cohort": {
+        "module": "unir_tfm.cohort",
+        "help": "Cohort report over the historical evaluations"
+    },
+    "extract-bench": {
+        "module": "unir_tfm.extract_bench",
+        "help": "Benchmark the PDF text extractors over a corpus and rank them for engine='auto'"
+    },
+    "mock-llm": {
+        "module": "unir_tfm.mock_llm",
+        "help": "Serve a local stand-in of the Anthropic and OpenAI APIs (latency, errors, canned answers)"
+    },
+    "grading-bench": {
+        "module": "unir_tfm.grading_bench",
+        "help": "Time grading, question generation and autoEval end to end against the mock LLM server"
+    },
+}
+
+# Command lines timed by `bench` (arguments after `python -m unir_tfm`)
+BENCH_COMMANDS = [["--help"], *([name, "--help"] for name in COMMANDS)]
+DEFAULT_BENCH_RUNS = 5
+DEFAULT_BENCH_LIMIT = 1.0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m unir_tfm", description="UNIR TFM evaluation tools")
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+    subparsers.required = True
+
+    for name, spec in COMMANDS.items():
+        # --help and every other option belong to the script itself
+        sub = subparsers.add_parser(name, help=spec["help"], add_help=False)
+        sub.add_argument("args", nargs=argparse.REMAINDER)
+
+    bench = subparsers.add_parser("bench", help="Time the startup of the command line",
+                                  description="Time the startup of the command line in fresh interpreters")
+    bench.add_argument("--runs", type=int, default=DEFAULT_BENCH_RUNS, help="Runs per command line (median is reported)")
+    bench.add_argument("--limit", type=float, default=DEFAULT_BENCH_LIMIT,
+                       help="Fail when a median startup exceeds this many seconds")
+    bench.add_argument("--command", dest="extra", action="append", default=[], metavar="ARGS",
+                       help="Extra command line to time, e.g. --command 'cohort historico.sqlite3'")
+    return parser
+
+
+def run_script(script: str, argv: List[str]):
+    """Run a top-level script as __main__ with the given arguments"""
+    path = REPO_ROOT / script
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+    sys.argv = [str(path), *argv]
+    runpy.run_path(str(path), run_name="__main__")
+
+
+def time_command(args: List[str], runs: int = DEFAULT_BENCH_RUNS) -> float:
+    """
+    Median wall time of `python -m unir_tfm <args>` in fresh interpreters
+
+    Returns:
+        float: Seconds from process start to exit
+    """
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(REPO_ROOT), os.environ.get("PYTHONPATH")]))}
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "unir_tfm", *args], env=env, cwd=str(REPO_ROOT),
+                       stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def bench(runs: int = DEFAULT_BENCH_RUNS, limit: float = DEFAULT_BENCH_LIMIT,
+          extra: Optional[List[List[str]]] = None) -> int:
+    """
+    Print the startup time of every subcommand's --help (plus extra command lines)
+
+    Returns:
+        int: Exit status, 1 when a median exceeds the limit
+    """
+    start = time.perf_counter()
+    for _ in range(runs):
+        subprocess.run([sys.executable, "-c", "pass"])
+    baseline = (time.perf_counter() - start) / runs
+
+    print(f"Arranque del intérprete: {baseline:.3f} s")
+    print(f"{'Orden':<40} {'Mediana':>8}")
+    slow = 0
+    for args in [*BENCH_COMMANDS, *(extra or [])]:
+        elapsed = time_command(args, runs)
+        slow += elapsed > limit
+        mark = "  <-- lento" if elapsed > limit else ""
+        print(f"{' '.join(args):<40} {elapsed:>7.3f}s{mark}")
+    return 1 if slow else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args, unknown = parser.parse_known_args(argv)
+    if args.command == "bench":
+        if unknown:
+            parser.error(f"unrecognized arguments: {' '.join(unknown)}")
+        return bench(args.runs, args.limit, [extra.split() for extra in args.extra])
+
+    spec = COMMANDS[args.command]
+    forwarded = [*args.args, *unknown]
+
+    if "module" in spec:
+        # Imported only now: the module may pull in pandas
+        module = __import__(spec["module"], fromlist=["main"])
+        sys.argv = [f"{parser.prog} {args.command}", *forwarded]
+        module.main(forwarded)
+        return 0
+
+    script = spec["script"]
+    for flag, variant in spec.get("variants", {}).items():
+        if flag in forwarded:
+            forwarded.remove(flag)
+            script = variant
+    try:
+        run_script(script, forwarded)
+    except InputError as e:
+        print(f"{parser.prog} {args.command}: error: {e}", file=sys.stderr)
+        return 2
+    return 0
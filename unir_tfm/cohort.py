@@ -0,0 +1,300 @@
+"""
+Cohort analytics over all historical grades.
+
+The history (HistoryStore or a list of results dicts) is loaded once into
+a DataFrame with one row per evaluation and one column per score: the
+final score ('total'), each category average and each subcategory
+('Categoría / Subcategoría'). Every statistic is computed on the whole
+score matrix at once with NumPy/pandas: distributions, z-scores, drift
+of the grades over time and comparisons between tribunals.
+
+Command line report:
+    python -m unir_tfm.cohort historical_evaluations.sqlite3 --output informe_cohorte.md
+"""
+import argparse
+import warnings
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from unir_tfm.history import HistoryStore, parse_date, record_date
+
+SEPARATOR = " / "
+META_COLUMNS = ["date", "program", "tribunal", "student"]
+DAYS_PER_YEAR = 365.25
+
+
+def _score_row(results: Dict) -> Dict[str, float]:
+    row = {"total": float(results["puntuacion_total"])}
+    for category, data in results.get("categorias", {}).items():
+        scores = {
+            name: float(score) for name, score in data.get("subcategorias", {}).items()
+            if isinstance(score, (int, float)) and not isinstance(score, bool)
+        }
+        row.update({f"{category}{SEPARATOR}{name}": score for name, score in scores.items()})
+        if scores:
+            row[category] = sum(scores.values()) / len(scores)
+    return row
+
+
+def _markdown_table(frame: pd.DataFrame, index_name: str = "") -> List[str]:
+    def cell(value):
+        if isinstance(value, (float, np.floating)):
+            return "" if np.isnan(value) else f"{value:.2f}"
+        return str(value)
+
+    lines = [
+        "| " + " | ".join([index_name, *map(str, frame.columns)]) + " |",
+        "|" + "---|" * (len(frame.columns) + 1)
+    ]
+    # itertuples keeps the dtype of each column (counts stay integers)
+    for index, *values in frame.itertuples(name=None):
+        lines.append("| " + " | ".join([cell(index), *(cell(value) for value in values)]) + " |")
+    return lines
+
+
+def _format_date(value) -> str:
+    return "sin fecha" if pd.isna(value) else f"{value:%d/%m/%Y}"
+
+
+class CohortAnalytics:
+    def __init__(self, frame: pd.DataFrame):
+        """
+        Wrap a cohort frame (use from_store / from_evaluations to build one)
+
+        Args:
+            frame (pd.DataFrame): META_COLUMNS plus one float column per score
+        """
+        self.frame = frame.reset_index(drop=True)
+        score_columns = [column for column in self.frame.columns if column not in META_COLUMNS]
+        self.categories = [column for column in score_columns if column != "total" and SEPARATOR not in column]
+        self.subcategories = [column for column in score_columns if SEPARATOR in column]
+        self.score_columns = ["total", *self.categories, *self.subcategories]
+        # Columnar score matrix (evaluations x scores), NaN where a score is missing
+        self.values = self.frame[self.score_columns].to_numpy(dtype=float)
+
+    @classmethod
+    def from_records(cls, records: List[Dict]) -> "CohortAnalytics":
+        """Build from HistoryStore.records() output"""
+        rows = [
+            {**{column: record.get(column) for column in META_COLUMNS}, **_score_row(record["results"])}
+            for record in records
+        ]
+        frame = pd.DataFrame(rows) if rows else pd.DataFrame(columns=[*META_COLUMNS, "total"])
+        frame["date"] = pd.to_datetime(frame["date"])
+        return cls(frame)
+
+    @classmethod
+    def from_store(cls, store: HistoryStore, **filters) -> "CohortAnalytics":
+        """Load the evaluations of a history store (filters as in HistoryStore.query)"""
+        return cls.from_records(store.records(**filters))
+
+    @classmethod
+    def from_evaluations(cls, evaluations: List[Dict]) -> "CohortAnalytics":
+        """Build from a plain list of results dicts (e.g. a legacy historical JSON file)"""
+        return cls.from_records([
+            {
+                "date": record_date(results.get("fecha")),
+                "program": results.get("programa"),
+                "tribunal": results.get("tribunal"),
+                "student": results.get("alumno"),
+                "results": results
+            }
+            for results in evaluations
+        ])
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def _moments(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return np.nanmean(self.values, axis=0), np.nanstd(self.values, axis=0, ddof=1)
+
+    def distributions(self) -> pd.DataFrame:
+        """Count, mean, sample std and quartiles of every score column"""
+        mean, std = self._moments()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            quantiles = np.nanpercentile(self.values, [0, 25, 50, 75, 100], axis=0)
+        return pd.DataFrame({
+            "n": (~np.isnan(self.values)).sum(axis=0),
+            "media": mean,
+            "desv": std,
+            "min": quantiles[0],
+            "p25": quantiles[1],
+            "mediana": quantiles[2],
+            "p75": quantiles[3],
+            "max": quantiles[4]
+        }, index=self.score_columns)
+
+    def z_scores(self) -> pd.DataFrame:
+        """Standardized score of every evaluation in every column (NaN where std is 0)"""
+        mean, std = self._moments()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = (self.values - mean) / np.where(std > 0, std, np.nan)
+        return pd.concat([self.frame[META_COLUMNS], pd.DataFrame(z, columns=self.score_columns)], axis=1)
+
+    def drift(self, freq: str = "M", by: Optional[str] = None) -> pd.DataFrame:
+        """
+        Mean scores per period, to spot grading drift over time
+
+        Args:
+            freq (str): Pandas period alias ('M' months, 'Q' quarters, 'Y' years)
+            by (str, optional): Extra grouping column ('tribunal' or 'program')
+
+        Returns:
+            pd.DataFrame: One row per period (and group) with 'n' and the mean of total and categories
+        """
+        keys = [self.frame["date"].dt.to_period(freq).rename("periodo")]
+        if by:
+            keys.insert(0, self.frame[by])
+        grouped = self.frame.groupby(keys)
+        means = grouped[["total", *self.categories]].mean()
+        means.insert(0, "n", grouped.size())
+        return means
+
+    def drift_slopes(self) -> pd.Series:
+        """Least-squares trend of every score column in points per year (NaN-aware, all columns at once)"""
+        days = (self.frame["date"] - self.frame["date"].min()).dt.days.to_numpy(dtype=float)
+        years = np.broadcast_to((days / DAYS_PER_YEAR)[:, None], self.values.shape)
+        # Undated evaluations (NaT) carry no trend information
+        mask = ~np.isnan(self.values) & ~np.isnan(years)
+        counts = mask.sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            years_mean = np.where(mask, years, 0).sum(axis=0) / counts
+            values_mean = np.where(mask, self.values, 0).sum(axis=0) / counts
+            years_centered = np.where(mask, years - years_mean, 0)
+            values_centered = np.where(mask, self.values - values_mean, 0)
+            slopes = (years_centered * values_centered).sum(axis=0) / (years_centered ** 2).sum(axis=0)
+        return pd.Series(slopes, index=self.score_columns, name="puntos_por_año")
+
+    def tribunal_comparison(self, by: str = "tribunal") -> pd.DataFrame:
+        """
+        Mean of total and category scores per tribunal (or program), with the
+        gap to the cohort mean expressed in cohort standard deviations
+        """
+        columns = ["total", *self.categories]
+        grouped = self.frame.dropna(subset=[by]).groupby(by)
+        means = grouped[columns].mean()
+        mean, std = self._moments()
+        overall = pd.Series(mean[:len(columns)], index=columns)
+        spread = pd.Series(std[:len(columns)], index=columns).replace(0, np.nan)
+
+        comparison = pd.DataFrame({"n": grouped.size()})
+        for column in columns:
+            comparison[column] = means[column]
+            comparison[f"{column} (z)"] = (means[column] - overall[column]) / spread[column]
+        return comparison
+
+    def position(self, results: Dict) -> Dict:
+        """
+        Place one evaluation within the cohort
+
+        Returns:
+            Dict: 'tendencias' (mean, std, percentile and z of the final score) and
+                'comparativa_categorias' (cohort mean, z and relative position per category)
+        """
+        row = _score_row(results)
+        mean, std = self._moments()
+        stats = {column: (mean[i], std[i]) for i, column in enumerate(self.score_columns)}
+
+        def z(column):
+            column_mean, column_std = stats[column]
+            return float((row[column] - column_mean) / column_std) if column_std > 0 else None
+
+        analysis = {
+            'tendencias': {
+                'promedio_historico': float(stats["total"][0]),
+                'desviacion_estandar': float(stats["total"][1]),
+                'percentil': float((self.values[:, 0] <= row["total"]).mean() * 100),
+                'z': z("total")
+            },
+            'comparativa_categorias': {}
+        }
+        for category in results.get("categorias", {}):
+            if category not in row or category not in stats:
+                continue
+            category_mean = float(stats[category][0])
+            analysis['comparativa_categorias'][category] = {
+                'promedio_historico': category_mean,
+                'z': z(category),
+                'posicion_relativa': 'Por encima del promedio' if category_mean < row[category] else 'Por debajo del promedio'
+            }
+        return analysis
+
+    def report_markdown(self, freq: str = "M", outlier_z: float = 2.0) -> str:
+        """Cohort report: distributions, drift, tribunals and atypical evaluations"""
+        if not len(self):
+            return "# Informe de cohorte\n\nNo hay evaluaciones en el histórico."
+
+        first, last = self.frame["date"].min(), self.frame["date"].max()
+        lines = [
+            "# Informe de cohorte",
+            f"Evaluaciones: {len(self)} ({_format_date(first)} - {_format_date(last)})",
+            "\n## Distribución de puntuaciones",
+            *_markdown_table(self.distributions().loc[["total", *self.categories]], "Puntuación"),
+        ]
+        if self.subcategories:
+            lines.extend(["\n### Subcategorías", *_markdown_table(self.distributions().loc[self.subcategories], "Subcategoría")])
+
+        slopes = self.drift_slopes().loc[["total", *self.categories]].to_frame()
+        lines.extend([
+            "\n## Evolución temporal",
+            *_markdown_table(self.drift(freq), "Periodo"),
+            "\nTendencia (puntos por año):",
+            *_markdown_table(slopes, "Puntuación")
+        ])
+
+        if self.frame["tribunal"].notna().any():
+            lines.extend(["\n## Comparativa entre tribunales", *_markdown_table(self.tribunal_comparison(), "Tribunal")])
+
+        z = self.z_scores()
+        outliers = z[z["total"].abs() >= outlier_z]
+        lines.append(f"\n## Evaluaciones atípicas (|z| ≥ {outlier_z:g} en la puntuación final)")
+        if outliers.empty:
+            lines.append("Ninguna.")
+        for index, row in outliers.iterrows():
+            student = row["student"] or f"#{index + 1}"
+            lines.append(f"- {student} ({_format_date(row['date'])}, tribunal {row['tribunal'] or 'N/A'}): "
+                         f"{self.frame.at[index, 'total']:.2f}/10, z = {row['total']:.2f}")
+        return "\n".join(lines) + "\n"
+
+
+def _date_argument(value: str) -> str:
+    try:
+        return parse_date(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Cohort report over the historical TFM evaluations")
+    parser.add_argument("history", help="History store (.sqlite3) or legacy historical_evaluations.json")
+    parser.add_argument("--program", help="Only this programme")
+    parser.add_argument("--tribunal", help="Only this tribunal")
+    parser.add_argument("--since", type=_date_argument, help="First date (YYYY-MM-DD or dd/mm/YYYY)")
+    parser.add_argument("--until", type=_date_argument, help="Last date (YYYY-MM-DD or dd/mm/YYYY)")
+    parser.add_argument("--freq", default="M", help="Period of the drift table: M, Q or Y")
+    parser.add_argument("--output", help="Write the Markdown report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.history)
+    try:
+        cohort = CohortAnalytics.from_store(store, since=args.since, until=args.until,
+                                            program=args.program, tribunal=args.tribunal)
+    finally:
+        store.close()
+
+    report = cohort.report_markdown(freq=args.freq)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report)
+        print(f"Informe de cohorte guardado en {args.output}")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Benchmark of the PDF text extractors over a corpus of theses.
+
+Every installed engine extracts every PDF of the corpus (bypassing the
+extraction cache) in a fresh worker process, which reports the time,
+pages per second and peak resident memory of the run. Text fidelity is
+the token-level F1 against a reference: 'tesis.txt' next to 'tesis.pdf'
+when the corpus provides one, otherwise the consensus of the other
+engines. The resulting ranking (the fastest engine among those within
+FIDELITY_TOLERANCE of the most faithful one first) is saved under
+cache_root() and used by engine='auto' in unir_tfm.pdf_extract.
+
+    python -m unir_tfm.extract_bench corpus/ --workers 4
+"""
+import argparse
+import json
+import multiprocessing
+import re
+import sys
+import time
+import unicodedata
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from unir_tfm.extraction_cache import ExtractionCache, cache_root
+from unir_tfm.inputs import expand_inputs
+from unir_tfm.pdf_extract import RANKING_FILE, available_engines, extract_pages, reset_best_engine
+
+FIDELITY_TOLERANCE = 0.02
+
+
+def _tokens(text: str) -> Counter:
+    text = unicodedata.normalize("NFKC", text).lower()
+    return Counter(re.findall(r"\w+", text))
+
+
+def token_f1(reference: str, candidate: str) -> float:
+    """F1 of the word multisets of two texts (1.0 = same words, order ignored)"""
+    expected, found = _tokens(reference), _tokens(candidate)
+    if not expected and not found:
+        return 1.0
+    common = sum((expected & found).values())
+    if not common:
+        return 0.0
+    precision = common / sum(found.values())
+    recall = common / sum(expected.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def _peak_rss_mb() -> float:
+    import resource
+
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _measure(engine: str, path: str, workers: int) -> Dict:
+    """Worker: extract one PDF without the cache and report time, memory and text"""
+    start = time.perf_counter()
+    pages = extract_pages(path, engine, cache=ExtractionCache(enabled=False), workers=workers)
+    seconds = time.perf_counter() - start
+    return {
+        "pages": len(pages),
+        "seconds": seconds,
+        "peak_mb": _peak_rss_mb(),
+        "text": "\n".join(page["text"] for page in pages)
+    }
+
+
+def measure(engine: str, path: str, workers: int = 1) -> Dict:
+    """Run one measurement in a fresh (spawned) process so memory peaks are not shared"""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(_measure, engine, path, workers).result()
+
+
+def run_benchmark(paths: List[str], engines: Optional[List[str]] = None, workers: int = 1) -> Dict:
+    """
+    Measure every engine on every PDF
+
+    Args:
+        paths (List[str]): PDFs of the corpus
+        engines (List[str], optional): Engines to compare (defaults to every installed one)
+        workers (int): Page-range worker processes per extraction (1 = serial)
+
+    Returns:
+        Dict: 'engines' (per-engine totals and fidelity), 'files' (per-file runs) and 'ranking'
+    """
+    engines = engines or available_engines()
+    runs: Dict[str, Dict[str, Dict]] = {}
+    for path in paths:
+        runs[path] = {}
+        for engine in engines:
+            try:
+                runs[path][engine] = measure(engine, path, workers)
+            except Exception as e:
+                runs[path][engine] = {"error": str(e)}
+            print(f"  {Path(path).name} [{engine}]: " + (
+                f"{runs[path][engine]['seconds']:.2f} s" if "error" not in runs[path][engine]
+                else f"error: {runs[path][engine]['error']}"), file=sys.stderr)
+
+    # Fidelity against the sidecar text, or the consensus of the other engines
+    for path, by_engine in runs.items():
+        sidecar = Path(path).with_suffix(".txt")
+        reference = sidecar.read_text(encoding="utf-8") if sidecar.is_file() else None
+        texts = {engine: run["text"] for engine, run in by_engine.items() if "error" not in run}
+        for engine, text in texts.items():
+            if reference is not None:
+                by_engine[engine]["fidelity"] = token_f1(reference, text)
+            else:
+                others = [token_f1(other_text, text) for other, other_text in texts.items() if other != engine]
+                by_engine[engine]["fidelity"] = sum(others) / len(others) if others else 1.0
+        for run in by_engine.values():
+            run.pop("text", None)
+
+    summary = {}
+    for engine in engines:
+        ok = [by_engine[engine] for by_engine in runs.values() if "error" not in by_engine[engine]]
+        pages = sum(run["pages"] for run in ok)
+        seconds = sum(run["seconds"] for run in ok)
+        summary[engine] = {
+            "files": len(ok),
+            "errors": len(runs) - len(ok),
+            "pages": pages,
+            "seconds": seconds,
+            "pages_per_second": pages / seconds if seconds else 0.0,
+            "peak_mb": max((run["peak_mb"] for run in ok), default=0.0),
+            "fidelity": sum(run["fidelity"] for run in ok) / len(ok) if ok else 0.0
+        }
+    return {"engines": summary, "files": runs, "ranking": rank(summary), "workers": workers}
+
+
+def rank(summary: Dict[str, Dict]) -> List[str]:
+    """
+    Order engines for engine='auto'
+
+    Engines that failed on a file are ranked last. Among the rest, those
+    within FIDELITY_TOLERANCE of the most faithful engine come first,
+    fastest first; the others follow by fidelity.
+    """
+    complete = [engine for engine, stats in summary.items() if not stats["errors"] and stats["files"]]
+    if not complete:
+        return []
+    best = max(summary[engine]["fidelity"] for engine in complete)
+    faithful = [engine for engine in complete if summary[engine]["fidelity"] >= best - FIDELITY_TOLERANCE]
+    rest = [engine for engine in complete if engine not in faithful]
+    return (sorted(faithful, key=lambda engine: -summary[engine]["pages_per_second"])
+            + sorted(rest, key=lambda engine: -summary[engine]["fidelity"]))
+
+
+def save_ranking(results: Dict, path: Optional[str] = None) -> Path:
+    """Store the ranking read by engine='auto' (and the measurements behind it)"""
+    ranking_path = Path(path) if path else cache_root() / RANKING_FILE
+    ranking_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(ranking_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "created": datetime.now().isoformat(),
+            "ranking": results["ranking"],
+            "engines": results["engines"],
+            "workers": results["workers"]
+        }, f, ensure_ascii=False, indent=2)
+    reset_best_engine()
+    return ranking_path
+
+
+def report_markdown(results: Dict) -> str:
+    """Table of the benchmark, in ranking order"""
+    lines = [
+        "# Comparativa de extractores de texto PDF",
+        f"Procesos por extracción: {results['workers']}",
+        "",
+        "| Motor | Ficheros | Errores | Páginas | Segundos | Páginas/s | Memoria máx. (MB) | Fidelidad |",
+        "|---|---|---|---|---|---|---|---|"
+    ]
+    ordered = results["ranking"] + [engine for engine in results["engines"] if engine not in results["ranking"]]
+    for engine in ordered:
+        stats = results["engines"][engine]
+        lines.append(
+            f"| {engine} | {stats['files']} | {stats['errors']} | {stats['pages']} | {stats['seconds']:.2f} | "
+            f"{stats['pages_per_second']:.1f} | {stats['peak_mb']:.0f} | {stats['fidelity']:.3f} |"
+        )
+    if results["ranking"]:
+        lines.append(f"\nMotor elegido para engine='auto': **{results['ranking'][0]}**")
+    return "\n".join(lines) + "\n"
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the PDF text extractors over a corpus of theses")
+    parser.add_argument("corpus", nargs="+", help="PDF files, globs, directories or @manifest files")
+    parser.add_argument("--engines", nargs="+", help="Engines to compare (defaults to every installed one)")
+    parser.add_argument("--workers", type=int, default=1, help="Page-range worker processes per extraction")
+    parser.add_argument("--recursive", action="store_true", help="Also walk the subfolders of directories")
+    parser.add_argument("--no-save", dest="save", action="store_false",
+                        help="Do not store the ranking used by engine='auto'")
+    parser.add_argument("--output", help="Write the Markdown report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    paths = expand_inputs(args.corpus, [".pdf"], recursive=args.recursive)
+    if not paths:
+        parser.error("no PDF files in the corpus")
+    print(f"Midiendo {len(args.engines or available_engines())} motores sobre {len(paths)} PDF...", file=sys.stderr)
+
+    results = run_benchmark(paths, args.engines, args.workers)
+    report = report_markdown(results)
+    if args.save and results["ranking"]:
+        print(f"Clasificación guardada en {save_ranking(results)}", file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report)
+        print(f"Informe guardado en {args.output}")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Content-addressed on-disk cache for extracted TFM text.
+
+Entries are keyed by the SHA-256 of the document bytes plus the extractor
+name and version, so a thesis is parsed once per extractor no matter how
+many scripts read it, and renaming or moving the file keeps its entry.
+Each entry stores the per-page text and layout metadata as gzipped JSON,
+written either at once (put) or page by page while a stream is read
+(put_stream).
+The cache directory is kept under a size limit by evicting the least
+recently used entries (entry mtime is refreshed on every hit).
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_digest_memo: Dict[tuple, str] = {}
+_digest_lock = threading.Lock()
+
+
+def cache_root() -> Path:
+    """Base directory for every unir_tfm cache (override with UNIR_TFM_CACHE_DIR)"""
+    return Path(os.environ.get("UNIR_TFM_CACHE_DIR", Path.home() / ".cache" / "unir_tfm"))
+
+
+def file_digest(path: str) -> str:
+    """
+    Return the SHA-256 hex digest of a file.
+
+    The digest is memoised per (path, mtime, size) so repeated lookups in
+    the same process do not re-read the file.
+    """
+    stat = os.stat(path)
+    key = (os.path.realpath(path), stat.st_mtime_ns, stat.st_size)
+    with _digest_lock:
+        if key in _digest_memo:
+            return _digest_memo[key]
+
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    with _digest_lock:
+        _digest_memo[key] = digest
+    return digest
+
+
+class ExtractionCache:
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 enabled: Optional[bool] = None):
+        """
+        Initialize the extraction cache
+
+        Args:
+            directory (str, optional): Cache directory (defaults to <cache_root>/extraction)
+            max_bytes (int): Size limit of the cache directory before LRU eviction
+            enabled (bool, optional): Force the cache on/off (defaults to UNIR_TFM_CACHE != "off")
+        """
+        self.directory = Path(directory) if directory else cache_root() / "extraction"
+        self.max_bytes = max_bytes
+        self.enabled = enabled if enabled is not None else os.environ.get("UNIR_TFM_CACHE", "on") != "off"
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _entry_path(self, digest: str, engine: str, version: int) -> Path:
+        return self.directory / f"{digest}-{engine}-v{version}.json.gz"
+
+    def get(self, path: str, engine: str, version: int) -> Optional[List[Dict]]:
+        """Return the cached pages for a document, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        entry = self._entry_path(file_digest(path), engine, version)
+        try:
+            with gzip.open(entry, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # Truncated or corrupt entry: drop it and extract again
+            entry.unlink(missing_ok=True)
+            return None
+
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return data["pages"]
+
+    def record(self, hit: bool):
+        """Count a lookup in the hit/miss statistics"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _header(self, path: str, engine: str, version: int) -> Dict:
+        return {
+            "source": os.path.basename(path),
+            "engine": engine,
+            "version": version,
+            "created": datetime.now().isoformat()
+        }
+
+    def put(self, path: str, engine: str, version: int, pages: List[Dict]):
+        """Store the extracted pages of a document and enforce the size limit"""
+        if not self.enabled:
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entry = self._entry_path(file_digest(path), engine, version)
+        data = {**self._header(path, engine, version), "pages": pages}
+
+        # Write to a temporary file first so concurrent readers never see a partial entry
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_name, entry)
+        except Exception:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+        self.evict()
+
+    def put_stream(self, path: str, engine: str, version: int, pages: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Pass pages through while writing them to the cache entry of a document.
+
+        The entry has the same format as the ones written by put. It is
+        committed only when the pages are exhausted. If the consumer stops
+        early or the extractor fails, the partial file is discarded.
+        """
+        if not self.enabled:
+            yield from pages
+            return
+
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            entry = self._entry_path(file_digest(path), engine, version)
+            fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        except OSError as e:
+            print(f"Warning: Could not write extraction cache: {e}")
+            yield from pages
+            return
+
+        raw = os.fdopen(fd, 'wb')
+        f = gzip.open(raw, 'wt', encoding='utf-8')
+        writable = True
+
+        def write(chunk: str):
+            # A full disk must not interrupt the reader: stop caching and keep yielding
+            nonlocal writable
+            if writable:
+                try:
+                    f.write(chunk)
+                except OSError as e:
+                    writable = False
+                    print(f"Warning: Could not write extraction cache: {e}")
+
+        complete = False
+        try:
+            # Same document as put: the header fields, then the pages array item by item
+            write(json.dumps(self._header(path, engine, version), ensure_ascii=False)[:-1] + ', "pages": [')
+            for index, page in enumerate(pages):
+                write((", " if index else "") + json.dumps(page, ensure_ascii=False))
+                yield page
+            write("]}")
+            complete = True
+        finally:
+            # Also reached on GeneratorExit: a partial entry would be served as the whole document
+            try:
+                f.close()
+                raw.close()
+                if complete and writable:
+                    os.replace(tmp_name, entry)
+            except OSError as e:
+                print(f"Warning: Could not write extraction cache: {e}")
+            Path(tmp_name).unlink(missing_ok=True)
+
+        try:
+            self.evict()
+        except OSError as e:
+            print(f"Warning: Could not evict extraction cache entries: {e}")
+
+    def iter_or_extract(self, path: str, engine: str, version: int,
+                        extract: Callable[[], Iterable[Dict]]) -> Iterator[Dict]:
+        """
+        Streaming counterpart of get_or_extract: yield the cached pages, or the
+        extractor's pages while they are written to the cache (see put_stream)
+        """
+        pages = self.get(path, engine, version)
+        self.record(pages is not None)
+        if pages is not None:
+            yield from pages
+        else:
+            yield from self.put_stream(path, engine, version, extract())
+
+    def get_or_extract(self, path: str, engine: str, version: int,
+                       extract: Callable[[], List[Dict]]) -> List[Dict]:
+        """
+        Return the cached pages of a document, running the extractor on a miss.
+
+        Args:
+            path (str): Path to the document
+            engine (str): Name of the extractor (part of the cache key)
+            version (int): Extractor version (bump it to invalidate old entries)
+            extract (Callable): Produces the list of page dicts on a miss
+
+        Returns:
+            List[Dict]: One dict per page with at least 'page' and 'text'
+        """
+        pages = self.get(path, engine, version)
+        self.record(pages is not None)
+        if pages is not None:
+            return pages
+
+        pages = extract()
+        try:
+            self.put(path, engine, version, pages)
+        except OSError as e:
+            print(f"Warning: Could not write extraction cache: {e}")
+        return pages
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for entry in self.directory.glob("*.json.gz"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda item: item[0]):
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        """Remove every cached entry"""
+        for entry in self.directory.glob("*.json.gz"):
+            entry.unlink(missing_ok=True)
+
+
+_default_cache: Optional[ExtractionCache] = None
+
+
+def default_cache() -> ExtractionCache:
+    """Process-wide cache shared by every script"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ExtractionCache()
+    return _default_cache
@@ -0,0 +1,245 @@
+"""
+End-to-end benchmark of the grading pipelines against the mock LLM server.
+
+Every thesis goes through three pipelines:
+- UNIRDocumentGrader.grade_solution ("UNIR grading final.py");
+- PDFQuestionGenerator ("UNIR TFM preguntas.py");
+- autoEval's criterion loop (automatedEval/autoEval.py).
+Each one runs with the real SDK clients pointed at a MockLLMServer
+(unir_tfm.mock_llm) with the chosen latency and error rate. The response
+cache is off, checkpoints are fresh, and the PDF text is extracted (and
+cached) before timing, so only the pipelines and the API layer are
+measured.
+
+For each thesis and pipeline the report gives:
+- wall time;
+- API calls and injected errors;
+- tokens;
+- peak concurrent requests;
+- concurrency utilisation: server busy time / (wall time x calls allowed
+  in flight).
+
+    python -m unir_tfm.grading_bench tribunal/ --rubric rubrica.json --latency 0.5 --error-rate 0.05
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from unir_tfm.inputs import expand_inputs
+from unir_tfm.mock_llm import MockLLMServer
+from unir_tfm.scheduler import DEFAULT_MAX_IN_FLIGHT, RequestScheduler
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+PIPELINES = ('grade', 'questions', 'autoeval')
+SCRIPTS = {
+    "grade": "UNIR grading final.py",
+    "questions": "UNIR TFM preguntas.py",
+    "autoeval": "automatedEval/autoEval.py",
+}
+
+_modules: Dict[str, object] = {}
+
+
+def load_script(pipeline: str):
+    """Import the script of a pipeline as a module (once; after the mock environment is set)"""
+    if pipeline not in _modules:
+        path = REPO_ROOT / SCRIPTS[pipeline]
+        spec = importlib.util.spec_from_file_location(f"_bench_{pipeline}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _modules[pipeline] = module
+    return _modules[pipeline]
+
+
+def rubric_criteria(rubric_path: str) -> List[str]:
+    """autoEval criteria from a grader rubric JSON: one per subcategory, with its level descriptors"""
+    with open(rubric_path, encoding='utf-8') as f:
+        rubric = json.load(f)
+    criteria = []
+    for subcategories in rubric.values():
+        for subcategory in subcategories:
+            levels = "; ".join(f"{level}: {text}" for level, text in subcategory.get("criterios", {}).items())
+            criteria.append(f"{subcategory['subcategoría']} ({levels})" if levels else subcategory['subcategoría'])
+    return criteria
+
+
+def _run_grade(path: str, options: Dict) -> int:
+    module = load_script("grade")
+    grader = module.UNIRDocumentGrader(
+        os.environ["MI_CLAVE_API_ANTROPIC"], max_workers=options["concurrency"], cache_responses=False,
+        evaluation_mode=options["mode"], checkpoint_dir=options["checkpoint_dir"], resume=False, charts=False,
+        scheduler=RequestScheduler(max_in_flight=options["max_in_flight"])
+    )
+    grader.grade_solution(None, options["rubric"], path)
+    return min(options["concurrency"], options["max_in_flight"])
+
+
+def _run_questions(path: str, options: Dict) -> int:
+    generator = load_script("questions").PDFQuestionGenerator()
+    generator.generate_questions(generator.extract_text_from_pdf(path))
+    return 1
+
+
+def _run_autoeval(path: str, options: Dict) -> int:
+    module = load_script("autoeval")
+    module.evaluar_tfm(options["criteria"], module.leer_tfm(path))
+    return 1
+
+
+_RUNNERS = {"grade": _run_grade, "questions": _run_questions, "autoeval": _run_autoeval}
+
+
+def run_benchmark(paths: List[str], rubric: str, pipelines: Optional[List[str]] = None,
+                  latency: float = 0.5, jitter: float = 0.0, error_rate: float = 0.0, retry_after: float = 1.0,
+                  concurrency: int = 4, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT, mode: str = "subcategory",
+                  criteria: Optional[List[str]] = None, seed: Optional[int] = None, verbose: bool = False) -> Dict:
+    """
+    Run every pipeline on every thesis against a fresh mock server
+
+    Args:
+        paths (List[str]): Theses (PDF)
+        rubric (str): Grader rubric JSON (also the source of the autoEval criteria)
+        pipelines (List[str], optional): Subset of PIPELINES (defaults to all)
+        latency (float): Seconds each mock request takes
+        jitter (float): Random +/- seconds added to the latency
+        error_rate (float): Share of requests answered with a 429/529/500
+        retry_after (float): retry-after seconds of the injected 429/529
+        concurrency (int): Grader max_workers (concurrent calls per thesis)
+        max_in_flight (int): Scheduler cap of the grader's calls
+        mode (str): Grader evaluation mode
+        criteria (List[str], optional): autoEval criteria (defaults to rubric_criteria(rubric))
+        seed (int, optional): Seed of the mock server draws
+        verbose (bool): Show the output of the pipelines
+
+    Returns:
+        Dict: 'settings' and 'runs' (one per thesis and pipeline)
+    """
+    pipelines = pipelines or list(PIPELINES)
+    settings = {"latency": latency, "jitter": jitter, "error_rate": error_rate, "concurrency": concurrency,
+                "max_in_flight": max_in_flight, "mode": mode}
+    runs = []
+    with MockLLMServer(latency=latency, jitter=jitter, error_rate=error_rate, retry_after=retry_after,
+                       seed=seed) as server, tempfile.TemporaryDirectory() as checkpoint_dir:
+        # Set before the scripts are imported: autoEval builds its client at import time
+        os.environ.update(server.environ())
+        os.environ["UNIR_TFM_LLM_CACHE"] = "off"
+        options = {"rubric": rubric, "concurrency": concurrency, "max_in_flight": max_in_flight, "mode": mode,
+                   "checkpoint_dir": checkpoint_dir, "criteria": criteria or rubric_criteria(rubric)}
+
+        from unir_tfm.pdf_extract import extract_pages
+        for path in paths:
+            extract_pages(path)
+            for pipeline in pipelines:
+                server.reset()
+                output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+                start = time.perf_counter()
+                error = ""
+                allowed = 1
+                try:
+                    with output:
+                        allowed = _RUNNERS[pipeline](path, options)
+                except Exception as e:
+                    error = str(e)
+                seconds = time.perf_counter() - start
+                stats = server.stats()
+                runs.append({
+                    "thesis": Path(path).name,
+                    "pipeline": pipeline,
+                    "seconds": seconds,
+                    "calls": stats["requests"],
+                    "errors": stats["errors"],
+                    "input_tokens": stats["input_tokens"],
+                    "output_tokens": stats["output_tokens"],
+                    "peak_in_flight": stats["peak_in_flight"],
+                    "allowed_in_flight": allowed,
+                    "utilisation": stats["busy_seconds"] / (seconds * allowed) if seconds else 0.0,
+                    "error": error
+                })
+                print(f"  {Path(path).name} [{pipeline}]: {seconds:.2f} s, {stats['requests']} llamadas"
+                      + (f", error: {error}" if error else ""), file=sys.stderr)
+    return {"settings": settings, "runs": runs}
+
+
+def report_markdown(results: Dict) -> str:
+    """Table of the benchmark, one row per thesis and pipeline plus the totals of each pipeline"""
+    settings = results["settings"]
+    lines = [
+        "# Banco de pruebas de evaluación contra el servidor LLM simulado",
+        f"Latencia: {settings['latency']} s (±{settings['jitter']} s) · Tasa de errores: {settings['error_rate']:.0%} · "
+        f"Concurrencia del evaluador: {settings['concurrency']} (máx. en vuelo {settings['max_in_flight']}, "
+        f"modo {settings['mode']})",
+        "",
+        "| TFM | Proceso | Segundos | Llamadas | Errores inyectados | Tokens entrada | Tokens salida | "
+        "Máx. en vuelo | Utilización | Error |",
+        "|---|---|---|---|---|---|---|---|---|---|"
+    ]
+    for run in results["runs"]:
+        lines.append(
+            f"| {run['thesis']} | {run['pipeline']} | {run['seconds']:.2f} | {run['calls']} | {run['errors']} | "
+            f"{run['input_tokens']} | {run['output_tokens']} | {run['peak_in_flight']}/{run['allowed_in_flight']} | "
+            f"{run['utilisation']:.0%} | {run['error']} |"
+        )
+
+    lines.extend(["", "| Proceso | TFM | Segundos | Segundos por TFM | Llamadas | Tokens |", "|---|---|---|---|---|---|"])
+    for pipeline in dict.fromkeys(run["pipeline"] for run in results["runs"]):
+        runs = [run for run in results["runs"] if run["pipeline"] == pipeline]
+        seconds = sum(run["seconds"] for run in runs)
+        lines.append(
+            f"| {pipeline} | {len(runs)} | {seconds:.2f} | {seconds / len(runs):.2f} | "
+            f"{sum(run['calls'] for run in runs)} | "
+            f"{sum(run['input_tokens'] + run['output_tokens'] for run in runs)} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Time the grading pipelines end to end against a mock LLM server")
+    parser.add_argument("theses", nargs="+", help="PDF files, globs, directories or @manifest files")
+    parser.add_argument("--rubric", required=True, help="Grader rubric JSON (also gives the autoEval criteria)")
+    parser.add_argument("--pipelines", nargs="+", choices=PIPELINES, help="Pipelines to run (defaults to all)")
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds each mock request takes")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- seconds added to the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with an error (0-1)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="retry-after seconds of the injected 429/529")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent API calls per thesis of the grader")
+    parser.add_argument("--max-in-flight", type=int, default=DEFAULT_MAX_IN_FLIGHT,
+                        help="Scheduler cap of the grader's calls")
+    parser.add_argument("--mode", choices=("subcategory", "category", "rubric"), default="subcategory",
+                        help="Grader evaluation mode")
+    parser.add_argument("--seed", type=int, help="Seed of the mock server draws")
+    parser.add_argument("--verbose", action="store_true", help="Show the output of the pipelines")
+    parser.add_argument("--json", help="Also write the measurements as JSON here")
+    parser.add_argument("--output", help="Write the Markdown report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    paths = expand_inputs(args.theses, [".pdf"])
+    if not paths:
+        parser.error("no PDF files given")
+    print(f"Evaluando {len(paths)} TFM contra el servidor simulado...", file=sys.stderr)
+
+    results = run_benchmark(paths, args.rubric, args.pipelines, args.latency, args.jitter, args.error_rate,
+                            args.retry_after, args.concurrency, args.max_in_flight, args.mode,
+                            seed=args.seed, verbose=args.verbose)
+    report = report_markdown(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report)
+        print(f"Informe guardado en {args.output}")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+Append-only store of historical evaluations.
+
+Replaces the historical_evaluations.json file that was read whole at
+startup and rewritten on every save. Each evaluation is one row of a
+SQLite table (WAL mode, one INSERT per save), so appends are atomic,
+cost the same regardless of the archive size and are safe with several
+graders writing at once. Date, program and tribunal are indexed columns
+for filtering; the full results dict is kept as JSON in the payload.
+
+Running aggregates are updated in the same transaction as each insert,
+so trend statistics never rescan the archive: Welford count/mean/M2 for
+the final score and for every category average, and a histogram of the
+final scores (at most 1001 distinct values, since scores are 0-10 with
+two decimals) that answers percentile queries.
+"""
+import math
+import json
+import sqlite3
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+TOTAL_SCOPE = "total"
+
+# date is NULL for evaluations whose 'fecha' is missing or unreadable
+_EVALUATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS evaluations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT,
+        program TEXT,
+        tribunal TEXT,
+        student TEXT,
+        total_score REAL NOT NULL,
+        payload TEXT NOT NULL
+    )
+"""
+
+
+def parse_date(value) -> str:
+    """
+    ISO date (YYYY-MM-DD) from a date, an ISO string (date or timestamp) or the reports' dd/mm/YYYY
+
+    Raises:
+        ValueError: If the value is none of those
+    """
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    text = str(value).strip()
+    try:
+        return datetime.fromisoformat(text).strftime("%Y-%m-%d")
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(text, "%d/%m/%Y").strftime("%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"Unrecognised date {value!r} (expected YYYY-MM-DD or dd/mm/YYYY)") from None
+
+
+def record_date(value) -> Optional[str]:
+    """Date of a stored evaluation: None when it is missing or unreadable (e.g. legacy 'Unknown')"""
+    if value is None:
+        return None
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
+
+
+def welford_update(n: int, mean: float, m2: float, value: float) -> Tuple[int, float, float]:
+    """Add one value to Welford running statistics (count, mean, sum of squared deviations)"""
+    n += 1
+    delta = value - mean
+    mean += delta / n
+    m2 += delta * (value - mean)
+    return n, mean, m2
+
+
+def sample_std(n: int, m2: float) -> Optional[float]:
+    """Sample standard deviation (ddof=1, as pandas) from Welford statistics"""
+    return math.sqrt(m2 / (n - 1)) if n > 1 else None
+
+
+def category_scope(category: str) -> str:
+    return f"categoria:{category}"
+
+
+def _scope_values(results: Dict) -> Dict[str, float]:
+    """Values tracked per evaluation: final score and the average of each category"""
+    values = {TOTAL_SCOPE: float(results["puntuacion_total"])}
+    for category, data in results.get("categorias", {}).items():
+        scores = [score for score in data.get("subcategorias", {}).values()
+                  if isinstance(score, (int, float)) and not isinstance(score, bool)]
+        if scores:
+            values[category_scope(category)] = sum(scores) / len(scores)
+    return values
+
+
+class HistoryStore:
+    def __init__(self, path: str):
+        """
+        Open (and create if needed) the history database
+
+        Args:
+            path (str): SQLite file; a legacy .json list is imported into a
+                .sqlite3 file next to it the first time it is opened
+        """
+        path = Path(path)
+        legacy_json = path if path.suffix.lower() == ".json" else None
+        self.path = path.with_suffix(".sqlite3") if legacy_json else path
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        is_new = not self.path.exists()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_EVALUATIONS_TABLE)
+        if not is_new:
+            self._migrate_dates()
+        for column in ("date", "program", "tribunal"):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS evaluations_{column} ON evaluations ({column})")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS aggregates (
+                scope TEXT PRIMARY KEY,
+                n INTEGER NOT NULL,
+                mean REAL NOT NULL,
+                m2 REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS score_counts (
+                score REAL PRIMARY KEY,
+                count INTEGER NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+        # Databases created before the aggregates existed
+        if not is_new and self.running(TOTAL_SCOPE)[0] == 0:
+            self.rebuild_aggregates()
+
+        if is_new and legacy_json is not None and legacy_json.is_file():
+            self.import_json(legacy_json)
+
+    def _migrate_dates(self):
+        """
+        Databases created when the date column was NOT NULL stored today's
+        date for unreadable 'fecha' values: rebuild the table with a nullable
+        column and re-derive every date from the stored payload
+        """
+        columns = self._conn.execute("PRAGMA table_info(evaluations)").fetchall()
+        if not any(column[1] == "date" and column[3] for column in columns):
+            return
+        with self._conn:
+            self._conn.execute("ALTER TABLE evaluations RENAME TO evaluations_old")
+            self._conn.execute(_EVALUATIONS_TABLE)
+            rows = self._conn.execute(
+                "SELECT id, date, program, tribunal, student, total_score, payload FROM evaluations_old"
+            ).fetchall()
+            self._conn.executemany(
+                "INSERT INTO evaluations VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(row[0], record_date(json.loads(row[6]).get("fecha", row[1])), *row[2:]) for row in rows]
+            )
+            self._conn.execute("DROP TABLE evaluations_old")
+
+    def append(self, results: Dict, program: Optional[str] = None, tribunal: Optional[str] = None,
+               student: Optional[str] = None) -> int:
+        """
+        Add one evaluation (single atomic INSERT)
+
+        Args:
+            results (Dict): Grading results ('fecha', today if absent, and 'puntuacion_total' are indexed)
+            program (str, optional): Master's programme
+            tribunal (str, optional): Tribunal / committee identifier
+            student (str, optional): Student identifier
+
+        Returns:
+            int: Row id of the stored evaluation
+        """
+        row = self._row(results, program, tribunal, student, default_date=parse_date(datetime.now()))
+        with self._lock, self._conn:
+            cursor = self._conn.execute(self._INSERT, row)
+            self._update_aggregates(results)
+        return cursor.lastrowid
+
+    _INSERT = ("INSERT INTO evaluations (date, program, tribunal, student, total_score, payload) "
+               "VALUES (?, ?, ?, ?, ?, ?)")
+
+    @staticmethod
+    def _row(results: Dict, program=None, tribunal=None, student=None, default_date: Optional[str] = None) -> tuple:
+        # Unreadable dates are stored as NULL rather than re-dated: they match no date filter
+        return (
+            record_date(results["fecha"]) if "fecha" in results else default_date,
+            program if program is not None else results.get("programa"),
+            tribunal if tribunal is not None else results.get("tribunal"),
+            student if student is not None else results.get("alumno"),
+            float(results["puntuacion_total"]),
+            json.dumps(results, ensure_ascii=False, default=str)
+        )
+
+    def _update_aggregates(self, results: Dict):
+        """O(number of categories) update, run inside the insert transaction"""
+        for scope, value in _scope_values(results).items():
+            row = self._conn.execute("SELECT n, mean, m2 FROM aggregates WHERE scope = ?", (scope,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO aggregates VALUES (?, ?, ?, ?)",
+                (scope, *welford_update(*(row or (0, 0.0, 0.0)), value))
+            )
+        self._conn.execute(
+            "INSERT INTO score_counts VALUES (?, 1) ON CONFLICT(score) DO UPDATE SET count = count + 1",
+            (round(float(results["puntuacion_total"]), 2),)
+        )
+
+    def rebuild_aggregates(self):
+        """Recompute the running aggregates from the stored evaluations"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM aggregates")
+            self._conn.execute("DELETE FROM score_counts")
+            for (payload,) in self._conn.execute("SELECT payload FROM evaluations ORDER BY id").fetchall():
+                self._update_aggregates(json.loads(payload))
+
+    def running(self, scope: str = TOTAL_SCOPE) -> Tuple[int, float, float]:
+        """Welford (count, mean, M2) of a scope: TOTAL_SCOPE or category_scope(name)"""
+        with self._lock:
+            row = self._conn.execute("SELECT n, mean, m2 FROM aggregates WHERE scope = ?", (scope,)).fetchone()
+        return tuple(row) if row else (0, 0.0, 0.0)
+
+    def stats(self, scope: str = TOTAL_SCOPE) -> Dict[str, Optional[float]]:
+        """Count, mean and sample standard deviation of a scope"""
+        n, mean, m2 = self.running(scope)
+        return {"n": n, "mean": mean if n else None, "std": sample_std(n, m2)}
+
+    def count_at_most(self, score: float) -> int:
+        """Number of archived final scores <= score (bounded histogram lookup)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(SUM(count), 0) FROM score_counts WHERE score <= ?", (round(float(score), 2),)
+            ).fetchone()
+        return row[0]
+
+    def _where(self, since, until, program, tribunal):
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("date >= ?")
+            params.append(parse_date(since))
+        if until is not None:
+            clauses.append("date <= ?")
+            params.append(parse_date(until))
+        if program is not None:
+            clauses.append("program = ?")
+            params.append(program)
+        if tribunal is not None:
+            clauses.append("tribunal = ?")
+            params.append(tribunal)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, since=None, until=None, program: Optional[str] = None,
+              tribunal: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Evaluations matching the filters, oldest first
+
+        Args:
+            since, until (date or str, optional): Inclusive date range
+            program (str, optional): Only this programme
+            tribunal (str, optional): Only this tribunal
+            limit (int, optional): Return only the most recent `limit` matches
+
+        Returns:
+            List[Dict]: Stored results dicts
+
+        Raises:
+            ValueError: If since or until is not a date
+        """
+        where, params = self._where(since, until, program, tribunal)
+        sql = f"SELECT payload FROM evaluations{where} ORDER BY id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(payload) for (payload,) in reversed(rows)]
+
+    def records(self, since=None, until=None, program: Optional[str] = None,
+                tribunal: Optional[str] = None) -> List[Dict]:
+        """
+        Evaluations matching the filters with their indexed columns, oldest first
+
+        Returns:
+            List[Dict]: {'date', 'program', 'tribunal', 'student', 'results'} per evaluation
+        """
+        where, params = self._where(since, until, program, tribunal)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT date, program, tribunal, student, payload FROM evaluations{where} ORDER BY id", params
+            ).fetchall()
+        return [
+            {"date": row[0], "program": row[1], "tribunal": row[2], "student": row[3], "results": json.loads(row[4])}
+            for row in rows
+        ]
+
+    def scores(self, since=None, until=None, program: Optional[str] = None,
+               tribunal: Optional[str] = None) -> List[float]:
+        """Final scores matching the filters, without decoding the payloads"""
+        where, params = self._where(since, until, program, tribunal)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT total_score FROM evaluations{where} ORDER BY id", params).fetchall()
+        return [score for (score,) in rows]
+
+    def count(self) -> int:
+        return self.running(TOTAL_SCOPE)[0]
+
+    def import_json(self, json_path: str) -> int:
+        """Import a legacy historical_evaluations.json list; returns the number of rows added"""
+        with open(json_path, 'r', encoding='utf-8') as f:
+            evaluations = json.load(f)
+        with self._lock, self._conn:
+            self._conn.executemany(self._INSERT, [self._row(results) for results in evaluations])
+            for results in evaluations:
+                self._update_aggregates(results)
+        return len(evaluations)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,215 @@
+"""
+Headless input selection shared by every script.
+
+Input files come from the command line as paths, glob patterns,
+directories (every file with an accepted extension, hidden and Office
+lock files skipped) or manifest files ('@lista.txt': one path or pattern
+per line, '#' comments, relative entries resolved against the manifest's
+folder). When a script gets no input on the command line it falls back
+to the native macOS panel (NSOpenPanel) if AppKit is importable, and to a
+terminal prompt otherwise, so the same script runs unattended on a Linux
+batch host and interactively on a Mac. Set UNIR_TFM_DIALOGS=off to never
+open a panel.
+"""
+import glob
+import os
+import sys
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence
+
+MANIFEST_PREFIX = "@"
+GLOB_CHARS = set("*?[")
+
+
+class InputError(ValueError):
+    """An input given on the command line (or chosen) does not exist or has the wrong type"""
+
+
+def _normalize_extensions(extensions: Optional[Iterable[str]]) -> Optional[List[str]]:
+    if not extensions:
+        return None
+    return [ext.lower() if ext.startswith(".") else f".{ext.lower()}" for ext in extensions]
+
+
+def _accepted(path: Path, extensions: Optional[List[str]]) -> bool:
+    if path.name.startswith((".", "~$")):
+        return False
+    return extensions is None or path.suffix.lower() in extensions
+
+
+def read_manifest(path: str) -> List[str]:
+    """
+    Read the entries of a manifest file
+
+    Args:
+        path (str): Text file with one path, directory or glob per line
+
+    Returns:
+        List[str]: Entries, with relative ones resolved against the manifest's folder
+    """
+    manifest = Path(path).expanduser()
+    if not manifest.is_file():
+        raise InputError(f"Manifest not found: {path}")
+
+    entries = []
+    for line in manifest.read_text(encoding="utf-8-sig").splitlines():
+        entry = line.strip()
+        if not entry or entry.startswith("#"):
+            continue
+        entry_path = Path(entry).expanduser()
+        entries.append(str(entry_path if entry_path.is_absolute() else manifest.parent / entry_path))
+    return entries
+
+
+def expand_inputs(specs: Sequence[str], extensions: Optional[Iterable[str]] = None,
+                  recursive: bool = False) -> List[str]:
+    """
+    Expand command line inputs into an ordered list of files
+
+    Args:
+        specs (Sequence[str]): Paths, globs ('**' allowed), directories or '@manifest' files
+        extensions (Iterable[str], optional): Accepted extensions, e.g. ['pdf', 'docx']
+        recursive (bool): Also walk the subfolders of directories
+
+    Returns:
+        List[str]: Existing files, in the given order (sorted within each glob/directory), without duplicates
+    """
+    extensions = _normalize_extensions(extensions)
+    files: List[str] = []
+    seen = set()
+
+    def add(path: Path):
+        resolved = str(path.resolve())
+        if resolved not in seen:
+            seen.add(resolved)
+            files.append(str(path))
+
+    for spec in specs:
+        if spec.startswith(MANIFEST_PREFIX):
+            for path in expand_inputs(read_manifest(spec[len(MANIFEST_PREFIX):]), extensions, recursive):
+                add(Path(path))
+            continue
+
+        spec_path = Path(spec).expanduser()
+        if GLOB_CHARS & set(spec):
+            matches = [Path(match) for match in sorted(glob.glob(str(spec_path), recursive=True))]
+            for path in matches:
+                if path.is_file() and _accepted(path, extensions):
+                    add(path)
+        elif spec_path.is_dir():
+            walker = spec_path.rglob("*") if recursive else spec_path.iterdir()
+            for path in sorted(walker):
+                if path.is_file() and _accepted(path, extensions):
+                    add(path)
+        elif spec_path.is_file():
+            if extensions is not None and spec_path.suffix.lower() not in extensions:
+                raise InputError(f"{spec}: expected a {'/'.join(extensions)} file")
+            add(spec_path)
+        else:
+            raise InputError(f"Input not found: {spec}")
+    return files
+
+
+def dialogs_available() -> bool:
+    """True on macOS with PyObjC installed, unless UNIR_TFM_DIALOGS=off"""
+    if os.environ.get("UNIR_TFM_DIALOGS", "on") == "off" or sys.platform != "darwin":
+        return False
+    try:
+        import AppKit  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _open_panel(title: str, directories: bool, extensions: Optional[Iterable[str]] = None,
+                multiple: bool = False) -> List[str]:
+    from AppKit import NSApplication, NSModalResponseOK, NSOpenPanel
+
+    NSApplication.sharedApplication()
+    panel = NSOpenPanel.openPanel()
+    panel.setTitle_(title)
+    panel.setMessage_(title)
+    panel.setCanChooseFiles_(not directories)
+    panel.setCanChooseDirectories_(directories)
+    panel.setAllowsMultipleSelection_(multiple)
+    if extensions:
+        panel.setAllowedFileTypes_([ext.lstrip(".") for ext in extensions])
+
+    if panel.runModal() == NSModalResponseOK:
+        return [url.path() for url in panel.URLs()]
+    return []
+
+
+def pick_file(title: str, extensions: Optional[Iterable[str]] = None, multiple: bool = False) -> List[str]:
+    """macOS front end: choose one (or several) files in an NSOpenPanel; [] when cancelled"""
+    return _open_panel(title, False, extensions, multiple)
+
+
+def pick_directory(title: str) -> Optional[str]:
+    """macOS front end: choose a folder in an NSOpenPanel; None when cancelled"""
+    paths = _open_panel(title, True)
+    return paths[0] if paths else None
+
+
+def _prompt(title: str) -> Optional[str]:
+    if not sys.stdin or not sys.stdin.isatty():
+        raise InputError(f"{title}: no input given on the command line and no terminal to ask")
+    # Paths dragged into Terminal come quoted or with escaped spaces
+    answer = input(f"{title}: ").strip().replace("\\ ", " ").strip("'\"")
+    return answer or None
+
+
+def resolve_files(specs: Optional[Sequence[str]], title: str, extensions: Optional[Iterable[str]] = None,
+                  multiple: bool = True) -> List[str]:
+    """
+    Input files of a script: from the command line, else the macOS panel, else a prompt
+
+    Args:
+        specs (Sequence[str], optional): Command line inputs (see expand_inputs)
+        title (str): Panel title / prompt
+        extensions (Iterable[str], optional): Accepted extensions
+        multiple (bool): Allow several files
+
+    Returns:
+        List[str]: Selected files ([] when the panel or prompt is cancelled)
+    """
+    if not specs:
+        if dialogs_available():
+            return pick_file(title, extensions, multiple)
+        answer = _prompt(title)
+        specs = [answer] if answer else []
+
+    files = expand_inputs(specs, extensions)
+    if specs and not files:
+        raise InputError(f"No {'/'.join(_normalize_extensions(extensions) or ['input'])} files in: {' '.join(specs)}")
+    if not multiple and len(files) > 1:
+        raise InputError(f"{title}: expected one file, got {len(files)}")
+    return files
+
+
+def resolve_file(spec: Optional[str], title: str, extensions: Optional[Iterable[str]] = None) -> Optional[str]:
+    """One input file (see resolve_files); None when the panel or prompt is cancelled"""
+    files = resolve_files([spec] if spec else None, title, extensions, multiple=False)
+    return files[0] if files else None
+
+
+def resolve_directory(spec: Optional[str], title: str, create: bool = False) -> Optional[str]:
+    """
+    Output/input folder: from the command line, else the macOS panel, else a prompt
+
+    Args:
+        spec (str, optional): Folder given on the command line
+        title (str): Panel title / prompt
+        create (bool): Create the folder if it does not exist (output folders)
+    """
+    if not spec:
+        spec = pick_directory(title) if dialogs_available() else _prompt(title)
+        if not spec:
+            return None
+
+    path = Path(spec).expanduser()
+    if create:
+        path.mkdir(parents=True, exist_ok=True)
+    if not path.is_dir():
+        raise InputError(f"Directory not found: {spec}")
+    return str(path)
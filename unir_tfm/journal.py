@@ -0,0 +1,80 @@
+"""
+Append-only journal of the partial results of an evaluation.
+
+Every completed step (a scored subcategory, a category analysis, ...) is
+appended as one JSON line and fsynced, so a run that dies halfway can be
+resumed from the last completed step instead of paying for every call
+again. A truncated last line (crash while writing) is ignored on load.
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+class EvaluationJournal:
+    def __init__(self, path: str):
+        """
+        Open (or create on first append) the journal at path
+
+        Args:
+            path (str): JSONL file; existing entries are loaded for resuming
+        """
+        self.path = Path(path)
+        self._entries: Dict[Tuple[str, str], Dict] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path.is_file():
+            return
+        with self.path.open('r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self._entries[(entry["kind"], entry["key"])] = entry["data"]
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, kind: str, key: str) -> Optional[Dict]:
+        """Return the recorded data of a step, or None if it has not completed"""
+        with self._lock:
+            return self._entries.get((kind, key))
+
+    def append(self, kind: str, key: str, data: Dict):
+        """Record a completed step; the line is on disk when this returns"""
+        line = json.dumps({"kind": kind, "key": key, "time": time.time(), "data": data}, ensure_ascii=False)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open('a', encoding='utf-8') as f:
+                # A crash mid-write leaves a line without its newline: end it so this record starts its own line
+                if not self._ends_with_newline():
+                    line = "\n" + line
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._entries[(kind, key)] = data
+
+    def _ends_with_newline(self) -> bool:
+        """True for an empty journal or one whose last line is complete"""
+        with self.path.open('rb') as f:
+            if f.seek(0, os.SEEK_END) == 0:
+                return True
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def items(self) -> List[Tuple[str, str, Dict]]:
+        """Snapshot of the recorded steps in completion order"""
+        with self._lock:
+            return [(kind, key, data) for (kind, key), data in self._entries.items()]
+
+    def discard(self):
+        """Forget every entry and delete the file"""
+        with self._lock:
+            self._entries.clear()
+            self.path.unlink(missing_ok=True)
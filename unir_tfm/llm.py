@@ -0,0 +1,207 @@
+"""
+Long-lived LLM clients shared by every script.
+
+An LLMClient holds one SDK client per provider for the whole run (and
+one async client, built on first use), so every call reuses the same
+HTTP connection pool with keep-alive instead of building a client, and
+its connections, per request. The SDK clients are layered like the rest
+of the package: response cache outside, request scheduler inside, SDK
+retries off.
+
+`client` / `async_client` keep the provider's own call surface
+(messages.create / chat.completions.create) for prompts that use
+provider features; `complete` / `acomplete` take a provider-agnostic
+prompt and return the reply text.
+
+Offline runs either pass a prebuilt client (e.g.
+unir_tfm.stub_client.StubAnthropicClient) or point the SDKs at a local
+stand-in server with UNIR_TFM_ANTHROPIC_BASE_URL / UNIR_TFM_OPENAI_BASE_URL.
+"""
+import inspect
+import os
+import threading
+from functools import partial
+from typing import Callable, Dict, Optional
+
+from unir_tfm.prompt_cache import UsageTracker
+from unir_tfm.response_cache import (AsyncCachedAnthropicClient, AsyncCachedOpenAIClient, CachedAnthropicClient,
+                                     CachedOpenAIClient, default_response_cache)
+from unir_tfm.scheduler import (AsyncScheduledAnthropicClient, AsyncScheduledOpenAIClient, RequestScheduler,
+                                ScheduledAnthropicClient, ScheduledOpenAIClient, default_scheduler)
+
+PROVIDERS = ('anthropic', 'openai')
+
+# Environment variables with the API key and the base URL of each provider
+API_KEY_ENV = {"anthropic": "MI_CLAVE_API_ANTROPIC", "openai": "MI_CLAVE_API_OPENAI"}
+BASE_URL_ENV = {"anthropic": "UNIR_TFM_ANTHROPIC_BASE_URL", "openai": "UNIR_TFM_OPENAI_BASE_URL"}
+
+_WRAPPERS = {
+    ("anthropic", False): (ScheduledAnthropicClient, CachedAnthropicClient),
+    ("anthropic", True): (AsyncScheduledAnthropicClient, AsyncCachedAnthropicClient),
+    ("openai", False): (ScheduledOpenAIClient, CachedOpenAIClient),
+    ("openai", True): (AsyncScheduledOpenAIClient, AsyncCachedOpenAIClient),
+}
+
+
+def _call_declared(method: Callable, **kwargs):
+    """Call an SDK method, moving the keyword arguments it does not declare to extra_body"""
+    try:
+        parameters = inspect.signature(method).parameters
+    except (TypeError, ValueError):
+        return method(**kwargs)
+    if any(parameter.kind is parameter.VAR_KEYWORD for parameter in parameters.values()):
+        return method(**kwargs)
+    extra = {name: kwargs.pop(name) for name in list(kwargs) if name not in parameters}
+    if extra:
+        kwargs["extra_body"] = {**(kwargs.get("extra_body") or {}), **extra}
+    return method(**kwargs)
+
+
+class _SDKResource:
+    """
+    Proxy of an SDK client whose create/stream calls send the parameters the
+    installed SDK release does not declare (e.g. temperature, no longer an
+    argument of Messages.create in recent anthropic releases) in extra_body,
+    so the request on the wire is the same whatever the SDK version
+    """
+
+    def __init__(self, target):
+        self._target = target
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if name in ("create", "stream"):
+            return partial(_call_declared, attribute)
+        if name in ("messages", "chat", "completions"):
+            return _SDKResource(attribute)
+        return attribute
+
+
+class LLMClient:
+    def __init__(self, provider: str = "anthropic", api_key: Optional[str] = None, client: Optional[object] = None,
+                 async_client: Optional[object] = None, base_url: Optional[str] = None,
+                 scheduler: Optional[RequestScheduler] = None, cache_responses: bool = True,
+                 usage: Optional[UsageTracker] = None):
+        """
+        Initialize the client of a provider (the SDK clients are built on first use)
+
+        Args:
+            provider (str): One of PROVIDERS
+            api_key (str, optional): API key (defaults to API_KEY_ENV, then the SDK's own variable)
+            client (object, optional): Pre-built sync client exposing the provider's call surface
+            async_client (object, optional): Pre-built async client
+            base_url (str, optional): API base URL (defaults to BASE_URL_ENV, then the SDK default)
+            scheduler (RequestScheduler, optional): Limits of the calls (defaults to the
+                process-wide scheduler of the provider)
+            cache_responses (bool): Serve repeated prompts from the persistent response cache
+            usage (UsageTracker, optional): Receives the token usage of every real call
+        """
+        if provider not in PROVIDERS:
+            raise ValueError(f"provider must be one of {PROVIDERS}")
+        self.provider = provider
+        self.api_key = api_key or os.environ.get(API_KEY_ENV[provider])
+        self.base_url = base_url or os.environ.get(BASE_URL_ENV[provider])
+        self.scheduler = scheduler if scheduler is not None else default_scheduler(provider)
+        self.cache = default_response_cache() if cache_responses else None
+        self.usage = usage if usage is not None else UsageTracker()
+        self._raw = {False: client, True: async_client}
+        self._wrapped: Dict[bool, object] = {}
+        self._lock = threading.Lock()
+
+    def _build(self, asynchronous: bool):
+        """SDK client with retries left to the scheduler (imported here so scripts start fast)"""
+        options = {"max_retries": 0}
+        if self.api_key:
+            options["api_key"] = self.api_key
+        if self.base_url:
+            options["base_url"] = self.base_url
+        if self.provider == "anthropic":
+            import anthropic
+            return _SDKResource(anthropic.AsyncAnthropic(**options) if asynchronous else anthropic.Anthropic(**options))
+        import openai
+        return _SDKResource(openai.AsyncOpenAI(**options) if asynchronous else openai.OpenAI(**options))
+
+    def _get(self, asynchronous: bool):
+        with self._lock:
+            if asynchronous not in self._wrapped:
+                raw = self._raw[asynchronous]
+                if raw is None:
+                    raw = self._build(asynchronous)
+                scheduled_class, cached_class = _WRAPPERS[(self.provider, asynchronous)]
+                wrapped = scheduled_class(raw, self.scheduler)
+                if self.cache is not None:
+                    wrapped = cached_class(wrapped, self.cache, self.usage)
+                self._wrapped[asynchronous] = wrapped
+            return self._wrapped[asynchronous]
+
+    @property
+    def client(self):
+        """Sync client with the provider's call surface (cached and scheduled)"""
+        return self._get(False)
+
+    @property
+    def async_client(self):
+        """Async client with the provider's call surface (cached and scheduled)"""
+        return self._get(True)
+
+    def request(self, prompt: str, model: str, max_tokens: int = 1024, system: Optional[str] = None,
+                temperature: Optional[float] = None) -> Dict:
+        """Keyword arguments of the provider's create(...) call for a single-turn prompt"""
+        request = {"model": model, "max_tokens": max_tokens}
+        if self.provider == "anthropic":
+            request["messages"] = [{"role": "user", "content": prompt}]
+            if system:
+                request["system"] = system
+        else:
+            request["messages"] = ([{"role": "system", "content": system}] if system else []) + \
+                [{"role": "user", "content": prompt}]
+        if temperature is not None:
+            request["temperature"] = temperature
+        return request
+
+    def text(self, response) -> str:
+        """Reply text of a provider response"""
+        if self.provider == "anthropic":
+            return "".join(block.text for block in response.content if hasattr(block, "text"))
+        return response.choices[0].message.content or ""
+
+    def _create(self, client, request: Dict):
+        if self.provider == "anthropic":
+            return client.messages.create(**request)
+        return client.chat.completions.create(**request)
+
+    def complete(self, prompt: str, model: str, max_tokens: int = 1024, system: Optional[str] = None,
+                 temperature: Optional[float] = None) -> str:
+        """
+        Send a single-turn prompt and return the reply text
+
+        Args:
+            prompt (str): User message
+            model (str): Model name of the provider
+            max_tokens (int): Longest reply
+            system (str, optional): System prompt
+            temperature (float, optional): Sampling temperature (provider default if None)
+
+        Returns:
+            str: Reply text
+        """
+        request = self.request(prompt, model, max_tokens, system, temperature)
+        return self.text(self._create(self.client, request))
+
+    async def acomplete(self, prompt: str, model: str, max_tokens: int = 1024, system: Optional[str] = None,
+                        temperature: Optional[float] = None) -> str:
+        """Coroutine counterpart of complete, on the async client"""
+        request = self.request(prompt, model, max_tokens, system, temperature)
+        return self.text(await self._create(self.async_client, request))
+
+
+_clients: Dict[str, LLMClient] = {}
+_clients_lock = threading.Lock()
+
+
+def default_llm(provider: str = "anthropic") -> LLMClient:
+    """Process-wide client of a provider (key and base URL from the environment)"""
+    with _clients_lock:
+        if provider not in _clients:
+            _clients[provider] = LLMClient(provider)
+        return _clients[provider]
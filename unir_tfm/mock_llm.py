@@ -0,0 +1,288 @@
+"""
+Local stand-in server for the Anthropic Messages and OpenAI Chat Completions APIs.
+
+MockLLMServer answers POST /v1/messages (streamed as server-sent events
+when asked) and POST /v1/chat/completions with the canned answers of
+unir_tfm.stub_client: rubric-shaped text, or JSON following the schema
+of the prompt. Each answer comes after a configurable latency, and a
+configurable share of requests fails with a rate-limit, overload or
+server error carrying retry-after. The pipelines can then be tested and
+timed through the real SDKs, the connection pool and the scheduler with
+no API keys or network access. The server counts what reached it:
+requests, injected errors, tokens, peak concurrency and busy time.
+
+    python -m unir_tfm.mock_llm --port 8765 --latency 0.5 --error-rate 0.05
+
+then run the scripts with the environment variables it prints.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Sequence
+
+from unir_tfm.scheduler import CHARS_PER_TOKEN
+from unir_tfm.stub_client import default_responder, request_text
+
+DEFAULT_PORT = 8765
+ERROR_STATUSES = (429, 529, 500)
+# Placeholder keys: the SDKs refuse to start without one
+MOCK_API_KEY = "mock"
+
+_ANTHROPIC_ERROR_TYPES = {429: "rate_limit_error", 529: "overloaded_error"}
+_OPENAI_ERROR_TYPES = {429: "rate_limit_exceeded"}
+
+
+def _sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so the clients keep their connections alive between requests
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: str, content_type: str = "application/json", headers: Optional[Dict] = None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", content_type)
+        self.send_header("content-length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        mock = self.server.mock
+        path = self.path.split("?")[0].rstrip("/")
+        if path not in ("/v1/messages", "/v1/chat/completions"):
+            self._send(404, json.dumps({"error": {"type": "not_found_error", "message": f"Unknown path {path}"}}))
+            return
+        provider = "anthropic" if path == "/v1/messages" else "openai"
+        request = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+        mock._handle(self, provider, request)
+
+
+class MockLLMServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, error_statuses: Sequence[int] = ERROR_STATUSES, retry_after: float = 1.0,
+                 responder: Optional[Callable[[Dict], str]] = None, seed: Optional[int] = None):
+        """
+        Initialize the server (it listens once started)
+
+        Args:
+            host (str): Interface to listen on
+            port (int): Port to listen on (0 = any free port)
+            latency (float): Seconds each successful request takes
+            jitter (float): Up to this many seconds are added to or taken from the latency at random
+            error_rate (float): Share of requests (0-1) answered with one of error_statuses
+            error_statuses (Sequence[int]): HTTP statuses of the injected errors
+            retry_after (float): retry-after seconds sent with 429 and 529 errors
+            responder (Callable, optional): Builds the reply text from the request
+                (defaults to unir_tfm.stub_client.default_responder)
+            seed (int, optional): Seed of the latency and error draws, for repeatable runs
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.retry_after = retry_after
+        self.responder = responder or default_responder
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self.reset()
+
+    def reset(self):
+        """Zero the counters"""
+        with self._lock:
+            self.requests = {"anthropic": 0, "openai": 0}
+            self.errors = 0
+            self.input_tokens = 0
+            self.output_tokens = 0
+            self.in_flight = 0
+            self.peak_in_flight = 0
+            self.busy_seconds = 0.0
+
+    def stats(self) -> Dict:
+        """Counters since the last reset"""
+        with self._lock:
+            return {
+                "requests": sum(self.requests.values()),
+                "anthropic_requests": self.requests["anthropic"],
+                "openai_requests": self.requests["openai"],
+                "errors": self.errors,
+                "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens,
+                "peak_in_flight": self.peak_in_flight,
+                "busy_seconds": round(self.busy_seconds, 3)
+            }
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def environ(self) -> Dict[str, str]:
+        """Environment variables that point unir_tfm.llm (and the scripts) at this server"""
+        return {
+            "UNIR_TFM_ANTHROPIC_BASE_URL": self.url,
+            "UNIR_TFM_OPENAI_BASE_URL": f"{self.url}/v1",
+            "MI_CLAVE_API_ANTROPIC": MOCK_API_KEY,
+            "MI_CLAVE_API_OPENAI": MOCK_API_KEY
+        }
+
+    def start(self) -> "MockLLMServer":
+        """Listen in a background thread"""
+        self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _draw(self):
+        """(error status or None, latency) of one request"""
+        with self._lock:
+            status = self._random.choice(self.error_statuses) \
+                if self.error_statuses and self._random.random() < self.error_rate else None
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter) if self.jitter else self.latency
+        return status, max(0.0, delay)
+
+    def _handle(self, handler: _Handler, provider: str, request: Dict):
+        start = time.perf_counter()
+        with self._lock:
+            self.requests[provider] += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            status, delay = self._draw()
+            if status is not None:
+                with self._lock:
+                    self.errors += 1
+                self._send_error(handler, provider, status)
+                return
+
+            time.sleep(delay)
+            text = self.responder(request)
+            input_tokens = len(request_text(request)) // CHARS_PER_TOKEN
+            output_tokens = len(text) // CHARS_PER_TOKEN
+            with self._lock:
+                self.input_tokens += input_tokens
+                self.output_tokens += output_tokens
+            if provider == "anthropic":
+                self._send_message(handler, request, text, input_tokens, output_tokens)
+            else:
+                self._send_completion(handler, request, text, input_tokens, output_tokens)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.busy_seconds += time.perf_counter() - start
+
+    def _send_error(self, handler: _Handler, provider: str, status: int):
+        headers = {"retry-after": str(self.retry_after)} if status in (429, 529) else {}
+        message = f"Injected error {status} (mock server)"
+        if provider == "anthropic":
+            body = {"type": "error", "error": {"type": _ANTHROPIC_ERROR_TYPES.get(status, "api_error"), "message": message}}
+        else:
+            body = {"error": {"type": _OPENAI_ERROR_TYPES.get(status, "server_error"), "message": message, "code": None}}
+        handler._send(status, json.dumps(body), headers=headers)
+
+    def _send_message(self, handler: _Handler, request: Dict, text: str, input_tokens: int, output_tokens: int):
+        message = {
+            "id": f"msg_mock_{time.time_ns()}",
+            "type": "message",
+            "role": "assistant",
+            "model": request.get("model", "mock"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens}
+        }
+        if not request.get("stream"):
+            handler._send(200, json.dumps(message, ensure_ascii=False))
+            return
+
+        # Same event sequence as the Messages API, one delta per line of the answer
+        events = [_sse("message_start", {"type": "message_start", "message": {
+            **message, "content": [], "stop_reason": None, "usage": {"input_tokens": input_tokens, "output_tokens": 0}}})]
+        events.append(_sse("content_block_start", {"type": "content_block_start", "index": 0,
+                                                   "content_block": {"type": "text", "text": ""}}))
+        for chunk in text.splitlines(keepends=True):
+            events.append(_sse("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                       "delta": {"type": "text_delta", "text": chunk}}))
+        events.append(_sse("content_block_stop", {"type": "content_block_stop", "index": 0}))
+        events.append(_sse("message_delta", {"type": "message_delta",
+                                             "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                             "usage": {"output_tokens": output_tokens}}))
+        events.append(_sse("message_stop", {"type": "message_stop"}))
+        handler._send(200, "".join(events), content_type="text/event-stream")
+
+    def _send_completion(self, handler: _Handler, request: Dict, text: str, input_tokens: int, output_tokens: int):
+        if request.get("stream"):
+            body = {"error": {"type": "invalid_request_error", "message": "Streaming is not emulated", "code": None}}
+            handler._send(400, json.dumps(body))
+            return
+        completion = {
+            "id": f"chatcmpl-mock-{time.time_ns()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": input_tokens, "completion_tokens": output_tokens,
+                      "total_tokens": input_tokens + output_tokens}
+        }
+        handler._send(200, json.dumps(completion, ensure_ascii=False))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the Anthropic and OpenAI APIs")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on (0 = any free port)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds each request takes")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- seconds added to the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with an error (0-1)")
+    parser.add_argument("--error-statuses", type=int, nargs="+", default=list(ERROR_STATUSES),
+                        help="HTTP statuses of the injected errors")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="retry-after seconds of 429/529 errors")
+    parser.add_argument("--seed", type=int, help="Seed of the latency and error draws")
+    args = parser.parse_args(argv)
+
+    server = MockLLMServer(args.host, args.port, args.latency, args.jitter, args.error_rate,
+                           args.error_statuses, args.retry_after, seed=args.seed).start()
+    print(f"Servidor LLM simulado en {server.url} (Ctrl+C para terminar). Variables de entorno:")
+    for name, value in server.environ().items():
+        print(f"export {name}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f"\nPeticiones atendidas: {server.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+"""
+Page-level text extraction shared by the TFM scripts.
+
+Every backend is a TextExtractor returning a list of page dicts ({'page',
+'text', 'width', 'height', ...}); extract_pages goes through the
+content-addressed extraction cache, so the same thesis is only parsed once
+per engine. Long documents can be split into page ranges extracted in
+parallel worker processes, or read page by page with stream_pages, which
+releases each page's layout objects before parsing the next one. engine='auto' picks the best backend installed
+on this host: the ranking measured by unir_tfm.extract_bench when one has
+been saved, else ENGINE_PREFERENCE (override with UNIR_TFM_PDF_ENGINE).
+"""
+import importlib.util
+import json
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, Iterator, List, Optional, Tuple, Type
+
+from unir_tfm.extraction_cache import ExtractionCache, cache_root, default_cache
+
+# Bump when the output of an extractor changes so stale cache entries are ignored
+EXTRACTOR_VERSION = 1
+
+DEFAULT_ENGINE = "auto"
+
+# Fallback order of engine='auto' when no benchmark ranking has been saved
+ENGINE_PREFERENCE = ["pdfium", "pymupdf", "pypdf2", "pdfplumber", "pdfkit"]
+
+# Ranking written by unir_tfm.extract_bench (under cache_root())
+RANKING_FILE = "extractor_ranking.json"
+
+# Smallest page range handed to a worker process (smaller ones cost more than they save)
+MIN_PAGES_PER_CHUNK = 8
+
+
+def _installed(module: str) -> bool:
+    try:
+        return importlib.util.find_spec(module) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class TextExtractor:
+    """
+    PDF text backend.
+
+    Subclasses implement page_count and iter_pages, a generator that opens
+    the document, yields one page dict at a time and frees the page before
+    moving on. A backend instance holds no document state, so page ranges
+    of one file can be extracted by separate instances in separate processes.
+    """
+    name = ""
+    module = ""
+    # False when the backend cannot run in a worker process
+    parallel = True
+
+    @classmethod
+    def available(cls) -> bool:
+        """True when the backend's library is installed"""
+        return _installed(cls.module)
+
+    def page_count(self, path: str) -> int:
+        raise NotImplementedError
+
+    def iter_pages(self, path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Yield pages [start, stop) of a PDF, one dict per page with 'page' (1-based), 'text', 'width' and 'height'
+
+        The document is closed when the generator is exhausted or closed early.
+        """
+        raise NotImplementedError
+
+    def extract_range(self, path: str, start: int = 0, stop: Optional[int] = None) -> List[Dict]:
+        """Extract pages [start, stop) of a PDF as a list (see iter_pages)"""
+        return list(self.iter_pages(path, start, stop))
+
+
+class PyPDF2Extractor(TextExtractor):
+    name = "pypdf2"
+    module = "PyPDF2"
+
+    def page_count(self, path: str) -> int:
+        import PyPDF2
+
+        with open(path, 'rb') as pdf_file:
+            return len(PyPDF2.PdfReader(pdf_file).pages)
+
+    def iter_pages(self, path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict]:
+        import PyPDF2
+
+        with open(path, 'rb') as pdf_file:
+            pdf_reader = PyPDF2.PdfReader(pdf_file)
+            stop = len(pdf_reader.pages) if stop is None else stop
+            for index in range(start, stop):
+                page = pdf_reader.pages[index]
+                box = page.mediabox
+                yield {
+                    "page": index + 1,
+                    "text": page.extract_text() or "",
+                    "width": float(box.width),
+                    "height": float(box.height)
+                }
+
+
+class PdfplumberExtractor(TextExtractor):
+    name = "pdfplumber"
+    module = "pdfplumber"
+
+    def page_count(self, path: str) -> int:
+        import pdfplumber
+
+        with pdfplumber.open(path) as pdf:
+            return len(pdf.pages)
+
+    def iter_pages(self, path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict]:
+        import pdfplumber
+
+        # Silenciar los logs de pdfminer (usado internamente por pdfplumber)
+        logging.getLogger("pdfminer").setLevel(logging.ERROR)
+
+        with pdfplumber.open(path) as pdf:
+            stop = len(pdf.pages) if stop is None else stop
+            for index in range(start, stop):
+                page = pdf.pages[index]
+                try:
+                    yield {
+                        "page": index + 1,
+                        "text": page.extract_text() or "",
+                        "width": float(page.width),
+                        "height": float(page.height),
+                        "images": len(page.images)
+                    }
+                finally:
+                    # The parsed layout (chars, images, text map) otherwise stays cached
+                    # on the page until the whole document is closed
+                    if hasattr(page, "close"):
+                        page.close()
+                    else:
+                        page.flush_cache()
+
+
+class PdfiumExtractor(TextExtractor):
+    name = "pdfium"
+    module = "pypdfium2"
+
+    def page_count(self, path: str) -> int:
+        import pypdfium2
+
+        pdf = pypdfium2.PdfDocument(path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+    def iter_pages(self, path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict]:
+        import pypdfium2
+
+        pdf = pypdfium2.PdfDocument(path)
+        try:
+            stop = len(pdf) if stop is None else stop
+            for index in range(start, stop):
+                page = pdf[index]
+                textpage = page.get_textpage()
+                width, height = page.get_size()
+                # PDFium separates lines with CRLF
+                text = textpage.get_text_range().replace("\r\n", "\n")
+                textpage.close()
+                page.close()
+                yield {"page": index + 1, "text": text, "width": float(width), "height": float(height)}
+        finally:
+            pdf.close()
+
+
+class PyMuPDFExtractor(TextExtractor):
+    name = "pymupdf"
+    module = "fitz"
+
+    @classmethod
+    def available(cls) -> bool:
+        return _installed("pymupdf") or _installed("fitz")
+
+    @staticmethod
+    def _open(path: str):
+        try:
+            import pymupdf
+        except ImportError:
+            import fitz as pymupdf
+        return pymupdf.open(path)
+
+    def page_count(self, path: str) -> int:
+        with self._open(path) as pdf:
+            return pdf.page_count
+
+    def iter_pages(self, path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict]:
+        with self._open(path) as pdf:
+            stop = pdf.page_count if stop is None else stop
+            for index in range(start, stop):
+                page = pdf[index]
+                yield {
+                    "page": index + 1,
+                    "text": page.get_text(),
+                    "width": float(page.rect.width),
+                    "height": float(page.rect.height)
+                }
+
+
+class PDFKitExtractor(TextExtractor):
+    # macOS only: PDFKit through the PyObjC bridges
+    name = "pdfkit"
+    module = "Quartz"
+    parallel = False
+
+    @staticmethod
+    def _open(path: str):
+        from Foundation import NSURL
+        from Quartz import PDFDocument
+
+        pdf_doc = PDFDocument.alloc().initWithURL_(NSURL.fileURLWithPath_(path))
+        if pdf_doc is None:
+            raise ValueError(f"Could not open PDF file: {path}")
+        return pdf_doc
+
+    def page_count(self, path: str) -> int:
+        return self._open(path).pageCount()
+
+    def iter_pages(self, path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict]:
+        from Quartz import kPDFDisplayBoxMediaBox
+
+        pdf_doc = self._open(path)
+        stop = pdf_doc.pageCount() if stop is None else stop
+        for index in range(start, stop):
+            page = pdf_doc.pageAtIndex_(index)
+            bounds = page.boundsForBox_(kPDFDisplayBoxMediaBox)
+            yield {
+                "page": index + 1,
+                "text": str(page.string() or ""),
+                "width": float(bounds.size.width),
+                "height": float(bounds.size.height)
+            }
+
+
+EXTRACTORS: Dict[str, Type[TextExtractor]] = {
+    extractor.name: extractor
+    for extractor in (PyPDF2Extractor, PdfplumberExtractor, PdfiumExtractor, PyMuPDFExtractor, PDFKitExtractor)
+}
+
+
+def available_engines() -> List[str]:
+    """Engines whose library is installed on this host"""
+    return [name for name, extractor in EXTRACTORS.items() if extractor.available()]
+
+
+def load_ranking(path: Optional[str] = None) -> List[str]:
+    """Engines ordered by the last saved benchmark ([] when there is none)"""
+    ranking_path = path or cache_root() / RANKING_FILE
+    try:
+        with open(ranking_path, encoding='utf-8') as f:
+            return list(json.load(f).get("ranking", []))
+    except (OSError, ValueError):
+        return []
+
+
+_best_engine: Optional[str] = None
+
+
+def best_engine() -> str:
+    """Engine used for engine='auto': benchmark ranking, else ENGINE_PREFERENCE, among the installed ones"""
+    global _best_engine
+    forced = os.environ.get("UNIR_TFM_PDF_ENGINE", DEFAULT_ENGINE)
+    if forced != DEFAULT_ENGINE:
+        return forced
+    if _best_engine is None:
+        installed = available_engines()
+        candidates = [name for name in [*load_ranking(), *ENGINE_PREFERENCE] if name in installed]
+        if not candidates:
+            raise RuntimeError("No PDF text extractor installed (pypdfium2, PyMuPDF, PyPDF2 or pdfplumber)")
+        _best_engine = candidates[0]
+    return _best_engine
+
+
+def reset_best_engine():
+    """Forget the memoised choice of engine='auto' (e.g. after saving a new ranking)"""
+    global _best_engine
+    _best_engine = None
+
+
+def get_extractor(engine: str = DEFAULT_ENGINE) -> TextExtractor:
+    """Instantiate an engine by name ('auto' resolves to best_engine())"""
+    name = best_engine() if engine == DEFAULT_ENGINE else engine
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown extraction engine: {engine}")
+    return EXTRACTORS[name]()
+
+
+def _extract_chunk(engine: str, path: str, start: int, stop: int) -> List[Dict]:
+    """Worker: extract one page range"""
+    return get_extractor(engine).extract_range(path, start, stop)
+
+
+def page_ranges(count: int, workers: int, min_pages: int = MIN_PAGES_PER_CHUNK) -> List[Tuple[int, int]]:
+    """Split [0, count) into contiguous ranges, about two per worker so uneven pages balance out"""
+    size = max(min_pages, math.ceil(count / (2 * workers)))
+    return [(start, min(start + size, count)) for start in range(0, count, size)]
+
+
+def extract_parallel(path: str, engine: str = DEFAULT_ENGINE, workers: Optional[int] = None) -> List[Dict]:
+    """
+    Extract a PDF splitting its pages across worker processes (no cache)
+
+    Args:
+        path (str): Path to the PDF file
+        engine (str): Engine name or 'auto'
+        workers (int, optional): Worker processes (defaults to one per CPU)
+
+    Returns:
+        List[Dict]: Pages in document order
+    """
+    extractor = get_extractor(engine)
+    workers = workers or os.cpu_count() or 1
+    if workers < 2 or not extractor.parallel:
+        return extractor.extract_range(path)
+
+    ranges = page_ranges(extractor.page_count(path), workers)
+    if len(ranges) < 2:
+        return extractor.extract_range(path)
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as executor:
+        starts, stops = zip(*ranges)
+        chunks = executor.map(_extract_chunk, repeat(extractor.name), repeat(path), starts, stops)
+        return [page for chunk in chunks for page in chunk]
+
+
+def extract_pages(path: str, engine: str = DEFAULT_ENGINE, cache: Optional[ExtractionCache] = None,
+                  workers: int = 1) -> List[Dict]:
+    """
+    Extract the pages of a PDF through the shared extraction cache.
+
+    Args:
+        path (str): Path to the PDF file
+        engine (str): 'auto' or one of EXTRACTORS ('pdfium', 'pymupdf', 'pypdf2', 'pdfplumber', 'pdfkit')
+        cache (ExtractionCache, optional): Cache to use (defaults to the shared one)
+        workers (int): Processes for the page ranges on a cache miss (1 = in this process, 0 = one per CPU)
+
+    Returns:
+        List[Dict]: One dict per page with 'page', 'text' and layout metadata
+    """
+    extractor = get_extractor(engine)
+    cache = cache if cache is not None else default_cache()
+
+    def extract() -> List[Dict]:
+        if workers == 1:
+            return extractor.extract_range(path)
+        return extract_parallel(path, extractor.name, workers or None)
+
+    return cache.get_or_extract(path, extractor.name, EXTRACTOR_VERSION, extract)
+
+
+def stream_pages(path: str, engine: str = DEFAULT_ENGINE, cache: Optional[ExtractionCache] = None,
+                 start: int = 0, stop: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Yield the pages of a PDF one at a time.
+
+    On a cache hit the pages come from the cached entry, which holds only
+    text. On a miss only the current page's layout objects are alive. A
+    full read (start=0, stop=None) is written to the cache as it goes, and
+    the entry is committed only if the consumer reads to the end. A
+    consumer that stops early (e.g. at the annexes) also stops the parsing.
+
+    Args:
+        path (str): Path to the PDF file
+        engine (str): 'auto' or one of EXTRACTORS
+        cache (ExtractionCache, optional): Cache to use (defaults to the shared one)
+        start (int): First page to yield (0-based)
+        stop (int, optional): Page to stop before (defaults to the end of the document)
+
+    Yields:
+        Dict: One dict per page with 'page', 'text' and layout metadata
+    """
+    extractor = get_extractor(engine)
+    cache = cache if cache is not None else default_cache()
+
+    if start == 0 and stop is None:
+        yield from cache.iter_or_extract(path, extractor.name, EXTRACTOR_VERSION,
+                                         lambda: extractor.iter_pages(path))
+        return
+
+    cached = cache.get(path, extractor.name, EXTRACTOR_VERSION)
+    cache.record(cached is not None)
+    yield from cached[start:stop] if cached is not None else extractor.iter_pages(path, start, stop)
+
+
+def extract_text(path: str, engine: str = DEFAULT_ENGINE, separator: str = "") -> str:
+    """Return the whole text of a PDF (pages joined with separator)"""
+    return separator.join(page["text"] for page in extract_pages(path, engine))
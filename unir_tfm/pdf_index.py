@@ -0,0 +1,209 @@
+"""
+Persistent inverted index over a folder tree of PDFs.
+
+Postings (term -> file, page, token position, character offset) live in a
+SQLite database. Building the index extracts the PDFs on a process pool,
+and later updates only re-index files whose mtime or size changed (and
+drop files that disappeared). Terms are accent- and case-folded, so
+queries are accent-insensitive; multi-word queries are phrase searches
+resolved with positional joins.
+"""
+import os
+import re
+import sqlite3
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from unir_tfm.extraction_cache import cache_root
+
+_TOKEN = re.compile(r"\w+")
+
+
+def fold_term(token: str) -> str:
+    """Lowercase a token and strip its accents"""
+    decomposed = unicodedata.normalize("NFKD", token.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text: str) -> List[Tuple[str, int]]:
+    """Split text into (folded term, character offset) pairs"""
+    return [(fold_term(match.group()), match.start()) for match in _TOKEN.finditer(text)]
+
+
+def list_pdfs(root_folder: str) -> List[str]:
+    """All PDF files under root_folder, skipping hidden files and directories"""
+    found = []
+    for foldername, dirnames, filenames in os.walk(root_folder):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        for filename in filenames:
+            if filename.lower().endswith('.pdf') and not filename.startswith('.'):
+                found.append(os.path.abspath(os.path.join(foldername, filename)))
+    return sorted(found)
+
+
+def _prefix_params(folder: str) -> Tuple[int, str]:
+    prefix = os.path.join(os.path.abspath(folder), "")
+    return len(prefix), prefix
+
+
+def _index_pdf(path: str) -> Tuple[str, List[Tuple[int, List[Tuple[str, int]]]]]:
+    """Worker: extract a PDF and tokenize every page"""
+    from unir_tfm.pdf_extract import extract_pages
+
+    return path, [(page["page"], tokenize(page["text"])) for page in extract_pages(path)]
+
+
+class PDFIndex:
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Open (or create) the index database
+
+        Args:
+            db_path (str, optional): SQLite file (defaults to <cache_root>/pdf_index.sqlite3)
+        """
+        self.db_path = Path(db_path) if db_path else cache_root() / "pdf_index.sqlite3"
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                pages INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                file_id INTEGER NOT NULL,
+                page INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                offset INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS postings_term ON postings (term, file_id, page, position);
+            CREATE INDEX IF NOT EXISTS postings_file ON postings (file_id);
+        """)
+        self.conn.commit()
+
+    def update(self, root_folder: str, workers: Optional[int] = None,
+               progress: Optional[Callable[[str, Optional[Exception]], None]] = None) -> Dict[str, int]:
+        """
+        Bring the index of a folder tree up to date.
+
+        Args:
+            root_folder (str): Folder whose PDFs are indexed (recursively)
+            workers (int, optional): Extraction processes (defaults to the CPU count)
+            progress (Callable, optional): Called with (path, error) after each file
+
+        Returns:
+            Dict[str, int]: Counts of 'indexed', 'unchanged', 'removed' and 'failed' files
+        """
+        root = os.path.abspath(root_folder)
+        on_disk = {}
+        for path in list_pdfs(root):
+            stat = os.stat(path)
+            on_disk[path] = (stat.st_mtime_ns, stat.st_size)
+
+        known = {
+            path: (file_id, mtime_ns, size)
+            for file_id, path, mtime_ns, size in self.conn.execute(
+                "SELECT id, path, mtime_ns, size FROM files WHERE substr(path, 1, ?) = ?", _prefix_params(root)
+            )
+        }
+
+        stats = {"indexed": 0, "unchanged": 0, "removed": 0, "failed": 0}
+        for path, (file_id, _, _) in known.items():
+            if path not in on_disk:
+                self._remove(file_id)
+                stats["removed"] += 1
+
+        pending = []
+        for path, signature in on_disk.items():
+            if path in known and known[path][1:] == signature:
+                stats["unchanged"] += 1
+            else:
+                pending.append(path)
+
+        if pending:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(_index_pdf, path): path for path in pending}
+                for future in as_completed(futures):
+                    path = futures[future]
+                    try:
+                        _, pages = future.result()
+                    except Exception as e:
+                        stats["failed"] += 1
+                        if progress:
+                            progress(path, e)
+                        continue
+
+                    if path in known:
+                        self._remove(known[path][0])
+                    self._store(path, on_disk[path], pages)
+                    stats["indexed"] += 1
+                    if progress:
+                        progress(path, None)
+
+        self.conn.commit()
+        return stats
+
+    def _remove(self, file_id: int):
+        self.conn.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+        self.conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def _store(self, path: str, signature: Tuple[int, int], pages: List[Tuple[int, List[Tuple[str, int]]]]):
+        cursor = self.conn.execute(
+            "INSERT INTO files (path, mtime_ns, size, pages) VALUES (?, ?, ?, ?)",
+            (path, signature[0], signature[1], len(pages))
+        )
+        file_id = cursor.lastrowid
+        self.conn.executemany(
+            "INSERT INTO postings VALUES (?, ?, ?, ?, ?)",
+            (
+                (term, file_id, page_number, position, offset)
+                for page_number, tokens in pages
+                for position, (term, offset) in enumerate(tokens)
+            )
+        )
+
+    def search(self, query: str, root_folder: Optional[str] = None) -> List[Dict]:
+        """
+        Find a word or phrase (accent- and case-insensitive).
+
+        Args:
+            query (str): One or more words; several words must appear consecutively
+            root_folder (str, optional): Restrict results to files under this folder
+
+        Returns:
+            List[Dict]: Matches with 'path', 'page' and 'offset', ordered by file and page
+        """
+        terms = [term for term, _ in tokenize(query)]
+        if not terms:
+            return []
+
+        joins = []
+        params: List = []
+        for i, term in enumerate(terms[1:], start=1):
+            joins.append(
+                f"JOIN postings p{i} ON p{i}.term = ? AND p{i}.file_id = p0.file_id "
+                f"AND p{i}.page = p0.page AND p{i}.position = p0.position + {i}"
+            )
+            params.append(term)
+
+        sql = (
+            "SELECT f.path, p0.page, p0.offset FROM postings p0 "
+            + " ".join(joins)
+            + " JOIN files f ON f.id = p0.file_id WHERE p0.term = ?"
+        )
+        params.append(terms[0])
+        if root_folder:
+            sql += " AND substr(f.path, 1, ?) = ?"
+            params.extend(_prefix_params(root_folder))
+        sql += " ORDER BY f.path, p0.page, p0.offset"
+
+        return [{"path": path, "page": page, "offset": offset} for path, page, offset in self.conn.execute(sql, params)]
+
+    def close(self):
+        self.conn.close()
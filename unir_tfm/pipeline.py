@@ -0,0 +1,149 @@
+"""
+Checkpointed DAG of named stages.
+
+Each Stage declares the stages it depends on; its checkpoint key hashes
+the stage name, the source code of the callables that define it (so
+editing a prompt invalidates it), its parameters and the keys of its
+dependencies. Changing one stage therefore recomputes that stage and
+everything downstream of it, and nothing else. Outputs are stored as
+JSON under <checkpoint_dir>/<run_key>/<stage>.json, and every running
+stage gets an EvaluationJournal so an interrupted stage resumes from its
+last completed step.
+"""
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from unir_tfm.journal import EvaluationJournal
+
+
+def _source(func) -> str:
+    while isinstance(func, partial):
+        func = func.func
+    try:
+        return inspect.getsource(func)
+    except (OSError, TypeError):
+        return getattr(func, "__qualname__", repr(func))
+
+
+class Stage:
+    def __init__(self, name: str, func: Callable[[Dict[str, Any], EvaluationJournal], Any],
+                 deps: Sequence[str] = (), params: Optional[Dict] = None, code: Sequence = ()):
+        """
+        Declare a pipeline stage
+
+        Args:
+            name (str): Unique stage name (also the checkpoint file name)
+            func (Callable): Called as func(outputs_of_deps, journal); must return JSON-serializable data
+            deps (Sequence[str]): Names of the stages whose outputs func receives
+            params (Dict, optional): Settings that change the output (model, mode, budget, ...)
+            code (Sequence[Callable]): Helpers (or whole modules) whose source also defines the stage
+                (prompts, parsers, section selection)
+        """
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.params = params or {}
+        self.code = tuple(code)
+
+    def fingerprint(self) -> str:
+        """Hash of everything that defines the stage itself"""
+        payload = json.dumps({
+            "name": self.name,
+            "code": [_source(func) for func in (self.func, *self.code)],
+            "params": self.params
+        }, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class Pipeline:
+    def __init__(self, stages: List[Stage], checkpoint_dir: str):
+        """
+        Initialize the pipeline
+
+        Args:
+            stages (List[Stage]): Stages in dependency order (dependencies first)
+            checkpoint_dir (str): Root directory of the per-run checkpoints
+        """
+        seen = set()
+        for stage in stages:
+            if stage.name in seen:
+                raise ValueError(f"Duplicate stage name: {stage.name}")
+            missing = [dep for dep in stage.deps if dep not in seen]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on {missing}, which must be declared before it")
+            seen.add(stage.name)
+        self.stages = stages
+        self.checkpoint_dir = Path(checkpoint_dir)
+
+    def run_dir(self, run_key: str) -> Path:
+        return self.checkpoint_dir / run_key
+
+    def run(self, run_key: str, reuse: bool = True,
+            on_stage: Optional[Callable[[str, bool], None]] = None) -> Dict[str, Any]:
+        """
+        Run every stage whose checkpoint is missing or stale
+
+        Args:
+            run_key (str): Identifies the inputs (e.g. thesis hash + rubric hash)
+            reuse (bool): Load valid checkpoints and journals; False recomputes every stage
+            on_stage (Callable, optional): Called with (stage name, reused) before each stage
+
+        Returns:
+            Dict[str, Any]: Output of every stage by name
+        """
+        run_dir = self.run_dir(run_key)
+        outputs: Dict[str, Any] = {}
+        keys: Dict[str, str] = {}
+
+        for stage in self.stages:
+            key_payload = "|".join([run_key, stage.fingerprint(), *(keys[dep] for dep in stage.deps)])
+            keys[stage.name] = hashlib.sha256(key_payload.encode('utf-8')).hexdigest()
+
+            checkpoint = self._load(run_dir / f"{stage.name}.json", keys[stage.name]) if reuse else None
+            if on_stage:
+                on_stage(stage.name, checkpoint is not None)
+            if checkpoint is not None:
+                outputs[stage.name] = checkpoint["output"]
+                continue
+
+            # Journals of an older version of this stage are stale
+            journal_path = run_dir / f"{stage.name}-{keys[stage.name][:16]}.jsonl"
+            for stale in run_dir.glob(f"{stage.name}-*.jsonl"):
+                if stale != journal_path:
+                    stale.unlink(missing_ok=True)
+            journal = EvaluationJournal(journal_path)
+            if not reuse:
+                journal.discard()
+
+            outputs[stage.name] = stage.func({dep: outputs[dep] for dep in stage.deps}, journal)
+            self._save(run_dir / f"{stage.name}.json", {"key": keys[stage.name], "output": outputs[stage.name]})
+
+        return outputs
+
+    @staticmethod
+    def _load(path: Path, key: str) -> Optional[Dict]:
+        try:
+            with path.open('r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        return checkpoint if checkpoint.get("key") == key else None
+
+    @staticmethod
+    def _save(path: Path, checkpoint: Dict):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def discard_journals(self, run_key: str):
+        """Remove the step journals of a finished run (checkpoints are kept)"""
+        for path in self.run_dir(run_key).glob("*.jsonl"):
+            path.unlink(missing_ok=True)
@@ -0,0 +1,94 @@
+"""
+Request layout for provider-side prompt caching, and token accounting.
+
+When the same thesis is evaluated against many criteria (autoEval), the
+thesis goes first as a stable shared prefix and only the criterion
+changes at the end. OpenAI caches identical prefixes automatically and
+prompt_cache_key keeps the requests of one thesis on the same cache.
+UsageTracker adds up the input, cached and output tokens reported by
+either provider so each run can print how much of its input was served
+from the provider cache.
+"""
+import hashlib
+import threading
+from typing import Dict, List
+
+
+def prompt_cache_key(shared_context: str) -> str:
+    """Stable identifier of a shared prefix (sent as OpenAI's prompt_cache_key)"""
+    return hashlib.sha256(shared_context.encode('utf-8')).hexdigest()[:32]
+
+
+def openai_cached_messages(instructions: str, shared_context: str, question: str) -> List[Dict]:
+    """
+    Chat messages with the stable part first and the varying question last.
+
+    Args:
+        instructions (str): Evaluator instructions, identical for every call
+        shared_context (str): Thesis text, identical for every call
+        question (str): Criterion-specific request
+
+    Returns:
+        List[Dict]: messages for chat.completions.create
+    """
+    return [
+        {"role": "system", "content": f"{instructions}\n\n{shared_context}"},
+        {"role": "user", "content": question}
+    ]
+
+
+class UsageTracker:
+    """Thread-safe token counters of one run, fed with provider responses"""
+
+    def __init__(self):
+        self.calls = 0
+        self.response_cache_hits = 0
+        self.input_tokens = 0
+        self.cached_input_tokens = 0
+        self.cache_write_tokens = 0
+        self.output_tokens = 0
+        self._lock = threading.Lock()
+
+    def record(self, response):
+        """Add the usage block of an Anthropic or OpenAI response"""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+
+        if hasattr(usage, "prompt_tokens"):
+            # OpenAI: prompt_tokens already includes the cached ones
+            details = getattr(usage, "prompt_tokens_details", None)
+            total_input = usage.prompt_tokens or 0
+            cached = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+            written = 0
+            output = getattr(usage, "completion_tokens", 0) or 0
+        else:
+            # Anthropic: input_tokens excludes cache reads and writes
+            cached = getattr(usage, "cache_read_input_tokens", 0) or 0
+            written = getattr(usage, "cache_creation_input_tokens", 0) or 0
+            total_input = (getattr(usage, "input_tokens", 0) or 0) + cached + written
+            output = getattr(usage, "output_tokens", 0) or 0
+
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += total_input
+            self.cached_input_tokens += cached
+            self.cache_write_tokens += written
+            self.output_tokens += output
+
+    def record_cache_hit(self):
+        """Count a call answered by the local response cache (no tokens spent)"""
+        with self._lock:
+            self.response_cache_hits += 1
+
+    def summary(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "api_calls": self.calls,
+                "response_cache_hits": self.response_cache_hits,
+                "input_tokens": self.input_tokens,
+                "cached_input_tokens": self.cached_input_tokens,
+                "cache_write_tokens": self.cache_write_tokens,
+                "output_tokens": self.output_tokens,
+                "cached_input_share": round(self.cached_input_tokens / self.input_tokens, 3) if self.input_tokens else 0.0
+            }
@@ -0,0 +1,412 @@
+"""
+Persistent cache of LLM responses.
+
+Requests are fingerprinted on the provider and every keyword argument of
+the call except the transport-only ones (TRANSPORT_KWARGS), with the
+prompt (system + messages) whitespace-normalized, and the reply text is
+stored in SQLite. Replies cut off at max_tokens are not stored, so a
+truncated answer is never replayed. Entries expire after a TTL and the
+database is kept under a size limit by evicting the least recently used
+rows. The Cached*Client wrappers expose the same call surface as the
+Anthropic / OpenAI clients, so scripts only wrap the client they build
+(the AsyncCached*Client ones do the same for the awaited create(...) of the
+async clients); they also feed a UsageTracker with the token usage of
+every real call.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Optional
+
+from unir_tfm.extraction_cache import cache_root
+from unir_tfm.prompt_cache import UsageTracker
+
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Request kwargs that change how a call is sent, not what the model answers
+TRANSPORT_KWARGS = {"stream", "timeout", "extra_headers", "prompt_cache_key"}
+
+# Stop reasons of a reply cut off by max_tokens (Anthropic stop_reason, OpenAI finish_reason)
+TRUNCATED_STOP_REASONS = {"max_tokens", "length"}
+
+
+def normalize_prompt(text: str) -> str:
+    """Strip indentation and collapse blank runs so cosmetic edits do not change the key"""
+    lines = [re.sub(r"[ \t]+", " ", line).strip() for line in str(text).splitlines()]
+    return re.sub(r"\n{2,}", "\n\n", "\n".join(lines)).strip()
+
+
+def _normalize_content(content):
+    if isinstance(content, str):
+        return normalize_prompt(content)
+    if isinstance(content, list):
+        # Content blocks: keep only what the model sees
+        return [
+            normalize_prompt(block.get("text", "")) if isinstance(block, dict) else normalize_prompt(str(block))
+            for block in content
+        ]
+    return content
+
+
+def request_fingerprint(provider: str, request: Dict) -> str:
+    """
+    Build the cache key of an API request.
+
+    Every keyword argument is part of the key except TRANSPORT_KWARGS;
+    the prompt (system and messages) is whitespace-normalized first.
+
+    Args:
+        provider (str): 'anthropic' or 'openai'
+        request (Dict): Keyword arguments of the create(...) call
+
+    Returns:
+        str: SHA-256 hex digest identifying the request
+    """
+    payload = {
+        "provider": provider,
+        "model": request.get("model"),
+        "temperature": request.get("temperature"),
+        "max_tokens": request.get("max_tokens"),
+        "system": _normalize_content(request.get("system", "")),
+        "messages": [
+            {"role": message.get("role"), "content": _normalize_content(message.get("content", ""))}
+            for message in request.get("messages", [])
+        ],
+        # Any other generation parameter (top_p, tools, response_format, extra_body...)
+        "params": {
+            name: value for name, value in request.items()
+            if name not in TRANSPORT_KWARGS and name not in ("model", "temperature", "max_tokens", "system", "messages")
+        }
+    }
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path: Optional[str] = None, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_bytes: int = DEFAULT_MAX_BYTES, enabled: Optional[bool] = None):
+        """
+        Initialize the response cache
+
+        Args:
+            path (str, optional): SQLite file (defaults to <cache_root>/responses.sqlite3)
+            ttl_seconds (float): Age after which an entry is ignored and purged
+            max_bytes (int): Size limit of the stored payloads before LRU eviction
+            enabled (bool, optional): Force the cache on/off (defaults to UNIR_TFM_LLM_CACHE != "off")
+        """
+        self.path = Path(path) if path else cache_root() / "responses.sqlite3"
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.enabled = enabled if enabled is not None else os.environ.get("UNIR_TFM_LLM_CACHE", "on") != "off"
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    provider TEXT NOT NULL,
+                    model TEXT,
+                    payload TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the stored payload for a key, or None on a miss/expired entry"""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT payload, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, provider: str, model: Optional[str], payload: Dict):
+        """Store a response payload and enforce the TTL and size limits"""
+        if not self.enabled:
+            return
+
+        encoded = json.dumps(payload, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, model, encoded, len(encoded.encode('utf-8')), now, now)
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters of this process"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class _ReplayStream:
+    """MessageStream look-alike that replays a finished response as a single chunk"""
+
+    def __init__(self, response):
+        self._response = response
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        for block in self._response.content:
+            if hasattr(block, "text"):
+                yield block.text
+
+    def get_final_message(self):
+        return self._response
+
+
+class _RecordingStream:
+    """Wraps the client's MessageStream and stores the final message in the cache"""
+
+    def __init__(self, messages: "_CachedAnthropicMessages", key: str, kwargs: Dict):
+        self._messages = messages
+        self._key = key
+        self._kwargs = kwargs
+        self._manager = messages._owner.client.messages.stream(**kwargs)
+        self._stream = None
+
+    def __enter__(self):
+        self._stream = self._manager.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._manager.__exit__(*exc)
+
+    @property
+    def text_stream(self):
+        return self._stream.text_stream
+
+    def get_final_message(self):
+        response = self._stream.get_final_message()
+        self._messages._store(self._key, self._kwargs, response)
+        return response
+
+
+class _AnthropicPayloads:
+    """Conversion between Anthropic responses and cache payloads"""
+
+    def __init__(self, owner):
+        self._owner = owner
+
+    def _store(self, key: str, kwargs: Dict, response):
+        self._owner.usage.record(response)
+        if getattr(response, "stop_reason", None) in TRUNCATED_STOP_REASONS:
+            return
+        usage = getattr(response, "usage", None)
+        payload = {
+            "texts": [block.text for block in response.content if hasattr(block, "text")],
+            "model": getattr(response, "model", kwargs.get("model")),
+            "stop_reason": getattr(response, "stop_reason", None),
+            "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+            "output_tokens": getattr(usage, "output_tokens", 0) or 0
+        }
+        self._owner.cache.put(key, "anthropic", kwargs.get("model"), payload)
+
+    def _replay(self, payload: Dict):
+        self._owner.usage.record_cache_hit()
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text=text) for text in payload["texts"]],
+            model=payload["model"],
+            stop_reason=payload["stop_reason"],
+            usage=SimpleNamespace(input_tokens=payload["input_tokens"], output_tokens=payload["output_tokens"]),
+            from_cache=True
+        )
+
+
+class _CachedAnthropicMessages(_AnthropicPayloads):
+    def create(self, **kwargs):
+        key = request_fingerprint("anthropic", kwargs)
+        payload = self._owner.cache.get(key)
+        if payload is None:
+            response = self._owner.client.messages.create(**kwargs)
+            self._store(key, kwargs, response)
+            return response
+        return self._replay(payload)
+
+    def stream(self, **kwargs):
+        """Same as messages.stream; cache hits are replayed as one chunk"""
+        key = request_fingerprint("anthropic", kwargs)
+        payload = self._owner.cache.get(key)
+        if payload is not None:
+            return _ReplayStream(self._replay(payload))
+        if hasattr(self._owner.client.messages, "stream"):
+            return _RecordingStream(self, key, kwargs)
+        response = self._owner.client.messages.create(**kwargs)
+        self._store(key, kwargs, response)
+        return _ReplayStream(response)
+
+
+class _AsyncCachedAnthropicMessages(_AnthropicPayloads):
+    async def create(self, **kwargs):
+        key = request_fingerprint("anthropic", kwargs)
+        payload = self._owner.cache.get(key)
+        if payload is None:
+            response = await self._owner.client.messages.create(**kwargs)
+            self._store(key, kwargs, response)
+            return response
+        return self._replay(payload)
+
+
+class CachedAnthropicClient:
+    """Anthropic client wrapper that serves repeated messages.create/stream calls from the cache"""
+
+    def __init__(self, client, cache: Optional[ResponseCache] = None, usage: Optional[UsageTracker] = None):
+        self.client = client
+        self.cache = cache if cache is not None else default_response_cache()
+        self.usage = usage if usage is not None else UsageTracker()
+        self.messages = _CachedAnthropicMessages(self)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+class AsyncCachedAnthropicClient(CachedAnthropicClient):
+    """AsyncAnthropic client wrapper that serves repeated awaited messages.create calls from the cache"""
+
+    def __init__(self, client, cache: Optional[ResponseCache] = None, usage: Optional[UsageTracker] = None):
+        super().__init__(client, cache, usage)
+        self.messages = _AsyncCachedAnthropicMessages(self)
+
+
+class _OpenAIPayloads:
+    """Conversion between OpenAI chat completions and cache payloads"""
+
+    def __init__(self, owner):
+        self._owner = owner
+
+    def _store(self, key: str, kwargs: Dict, response):
+        self._owner.usage.record(response)
+        if any(getattr(choice, "finish_reason", None) in TRUNCATED_STOP_REASONS for choice in response.choices):
+            return
+        usage = getattr(response, "usage", None)
+        payload = {
+            "contents": [choice.message.content for choice in response.choices],
+            "model": getattr(response, "model", kwargs.get("model")),
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0
+        }
+        self._owner.cache.put(key, "openai", kwargs.get("model"), payload)
+
+    def _replay(self, payload: Dict):
+        self._owner.usage.record_cache_hit()
+        return SimpleNamespace(
+            choices=[
+                SimpleNamespace(index=i, message=SimpleNamespace(role="assistant", content=content))
+                for i, content in enumerate(payload["contents"])
+            ],
+            model=payload["model"],
+            usage=SimpleNamespace(prompt_tokens=payload["prompt_tokens"], completion_tokens=payload["completion_tokens"]),
+            from_cache=True
+        )
+
+
+class _CachedChatCompletions(_OpenAIPayloads):
+    def create(self, **kwargs):
+        key = request_fingerprint("openai", kwargs)
+        payload = self._owner.cache.get(key)
+        if payload is None:
+            response = self._owner.client.chat.completions.create(**kwargs)
+            self._store(key, kwargs, response)
+            return response
+        return self._replay(payload)
+
+
+class _AsyncCachedChatCompletions(_OpenAIPayloads):
+    async def create(self, **kwargs):
+        key = request_fingerprint("openai", kwargs)
+        payload = self._owner.cache.get(key)
+        if payload is None:
+            response = await self._owner.client.chat.completions.create(**kwargs)
+            self._store(key, kwargs, response)
+            return response
+        return self._replay(payload)
+
+
+class CachedOpenAIClient:
+    """OpenAI client wrapper that serves repeated chat.completions.create calls from the cache"""
+
+    def __init__(self, client, cache: Optional[ResponseCache] = None, usage: Optional[UsageTracker] = None):
+        self.client = client
+        self.cache = cache if cache is not None else default_response_cache()
+        self.usage = usage if usage is not None else UsageTracker()
+        self.chat = SimpleNamespace(completions=_CachedChatCompletions(self))
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+class AsyncCachedOpenAIClient(CachedOpenAIClient):
+    """AsyncOpenAI client wrapper that serves repeated awaited chat.completions.create calls from the cache"""
+
+    def __init__(self, client, cache: Optional[ResponseCache] = None, usage: Optional[UsageTracker] = None):
+        super().__init__(client, cache, usage)
+        self.chat = SimpleNamespace(completions=_AsyncCachedChatCompletions(self))
+
+
+_default_cache: Optional[ResponseCache] = None
+
+
+def default_response_cache() -> ResponseCache:
+    """Process-wide response cache shared by every script"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache()
+    return _default_cache
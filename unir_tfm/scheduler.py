@@ -0,0 +1,561 @@
+"""
+Rate-limit-aware scheduling of LLM API calls.
+
+Every call of a run goes through one RequestScheduler per provider:
+- a semaphore caps the requests in flight;
+- two token buckets keep requests per minute and tokens per minute
+  under the account's limits;
+- rate-limit and overload errors (429, 529), 5xx and timeouts are
+  retried with jittered exponential backoff, honouring retry-after;
+- after a 429, every thread waits out the same cooldown instead of
+  hammering the API.
+A per-run budget stops the calls with BudgetExceededError: a token budget
+before a call could exceed it, a dollar budget once it is spent.
+
+The Scheduled*Client wrappers expose the same call surface as the
+Anthropic / OpenAI clients, and the AsyncScheduled*Client wrappers the
+awaitable create(...) of their async clients; sync and async calls share
+the limits of the same scheduler. The Cached*Client wrappers go outside them,
+so cache hits never wait for quota. Their SDK clients should be built
+with max_retries=0 so retries are not compounded.
+
+Limits come from the environment (or the options of the scripts):
+UNIR_TFM_RPM, UNIR_TFM_TPM, UNIR_TFM_MAX_IN_FLIGHT, UNIR_TFM_BUDGET_TOKENS
+and UNIR_TFM_BUDGET_USD.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from types import SimpleNamespace
+from typing import Callable, Dict, Optional, Tuple
+
+CHARS_PER_TOKEN = 4
+DEFAULT_MAX_IN_FLIGHT = 8
+DEFAULT_MAX_RETRIES = 6
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 60.0
+# How often a coroutine waiting for a free slot checks again
+SLOT_POLL_SECONDS = 0.005
+
+# HTTP statuses worth retrying: timeout, conflict, rate limit, server errors and overload
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+# Exception class names of the Anthropic / OpenAI SDKs (matched by name so neither is imported here)
+RETRYABLE_ERRORS = {"RateLimitError", "OverloadedError", "APITimeoutError", "APIConnectionError",
+                    "InternalServerError", "ServiceUnavailableError"}
+
+# USD per million (input, output) tokens; models are matched by prefix
+PRICES: Dict[str, Tuple[float, float]] = {
+    "claude-3-opus": (15.0, 75.0),
+    "claude-3-5-sonnet": (3.0, 15.0),
+    "claude-3-haiku": (0.25, 1.25),
+    "gpt-4o-mini": (0.15, 0.6),
+    "gpt-4o": (2.5, 10.0),
+}
+
+
+class BudgetExceededError(RuntimeError):
+    """The run has spent (or would overspend) its token or cost budget"""
+
+
+def _text_of(content) -> str:
+    if isinstance(content, list):
+        return "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+    return str(content or "")
+
+
+def estimate_tokens(request: Dict) -> int:
+    """Tokens a create(...) call may consume: prompt characters / CHARS_PER_TOKEN plus max_tokens"""
+    chars = len(_text_of(request.get("system", "")))
+    chars += sum(len(_text_of(message.get("content", ""))) for message in request.get("messages", []))
+    return chars // CHARS_PER_TOKEN + (request.get("max_tokens") or 0)
+
+
+def response_usage(response) -> Tuple[int, int]:
+    """(input, output) tokens of an Anthropic or OpenAI response (0, 0 when unknown)"""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return 0, 0
+    if hasattr(usage, "prompt_tokens"):
+        return usage.prompt_tokens or 0, getattr(usage, "completion_tokens", 0) or 0
+    input_tokens = sum(getattr(usage, name, 0) or 0
+                       for name in ("input_tokens", "cache_read_input_tokens", "cache_creation_input_tokens"))
+    return input_tokens, getattr(usage, "output_tokens", 0) or 0
+
+
+def cost_usd(model: Optional[str], input_tokens: int, output_tokens: int) -> float:
+    """Price of a call from PRICES (0.0 for unknown models)"""
+    for prefix, (input_price, output_price) in PRICES.items():
+        if model and model.startswith(prefix):
+            return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+    return 0.0
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for rate-limit, overload, server and timeout/connection errors"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if getattr(error, "status_code", None) in RETRYABLE_STATUS:
+        return True
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked to wait (retry-after / retry-after-ms headers), if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after") is not None:
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at per_minute / 60 per second"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60
+        self.capacity = capacity or per_minute
+        self.level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take amount from the bucket, going into debt if needed
+
+        Callers are served in reservation order: each one sleeps for the
+        returned time before sending. A request larger than the bucket only
+        waits for a full bucket.
+
+        Returns:
+            float: Seconds to wait before using the reservation
+        """
+        with self._lock:
+            self._refill()
+            self.level -= min(amount, self.capacity)
+            return max(0.0, -self.level / self.rate)
+
+    def adjust(self, amount: float):
+        """Give back (positive) or charge (negative) tokens once the real usage is known"""
+        with self._lock:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+
+
+class RequestScheduler:
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 max_in_flight: Optional[int] = DEFAULT_MAX_IN_FLIGHT, max_retries: int = DEFAULT_MAX_RETRIES,
+                 base_delay: float = DEFAULT_BASE_DELAY, max_delay: float = DEFAULT_MAX_DELAY,
+                 budget_tokens: Optional[int] = None, budget_usd: Optional[float] = None):
+        """
+        Initialize the scheduler
+
+        Args:
+            requests_per_minute (float, optional): Request limit (None = unlimited)
+            tokens_per_minute (float, optional): Input + output token limit (None = unlimited)
+            max_in_flight (int, optional): Concurrent requests (None = unlimited)
+            max_retries (int): Retries of a failed call before its error is raised
+            base_delay (float): First backoff delay in seconds (doubled on every retry)
+            max_delay (float): Longest backoff delay in seconds
+            budget_tokens (int, optional): Tokens the run may spend
+            budget_usd (float, optional): Dollars the run may spend (see PRICES)
+        """
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_tokens = budget_tokens
+        self.budget_usd = budget_usd
+
+        self._slots = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+        self._lock = threading.Lock()
+        self._cooldown_until = 0.0
+        self._committed_tokens = 0
+        self.calls = 0
+        self.retries = 0
+        self.throttled_seconds = 0.0
+        self.spent_tokens = 0
+        self.spent_usd = 0.0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def backoff(self, attempt: int, server_delay: Optional[float] = None) -> float:
+        """Full-jitter exponential delay; a server retry-after is the floor"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, server_delay) if server_delay is not None else delay
+
+    def _commit_budget(self, estimate: int):
+        with self._lock:
+            if self.budget_usd is not None and self.spent_usd >= self.budget_usd:
+                raise BudgetExceededError(f"Cost budget of {self.budget_usd:.2f} USD spent ({self.spent_usd:.2f} USD)")
+            if self.budget_tokens is not None and self.spent_tokens + self._committed_tokens + estimate > self.budget_tokens:
+                raise BudgetExceededError(
+                    f"Token budget of {self.budget_tokens} would be exceeded "
+                    f"({self.spent_tokens} spent, {self._committed_tokens} in flight, {estimate} requested)"
+                )
+            self._committed_tokens += estimate
+
+    def _quota_delay(self, estimate: int) -> float:
+        """Reserve the quota of one call and return how long to wait before sending it"""
+        waits = [self._cooldown_until - time.monotonic()]
+        if self.requests is not None:
+            waits.append(self.requests.reserve(1))
+        if self.tokens is not None:
+            waits.append(self.tokens.reserve(estimate))
+        wait = max(waits)
+        if wait <= 0:
+            return 0.0
+        with self._lock:
+            self.throttled_seconds += wait
+        return wait
+
+    def _wait_for_quota(self, estimate: int):
+        wait = self._quota_delay(estimate)
+        if wait:
+            time.sleep(wait)
+
+    def _enter_slot(self):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _leave_slot(self):
+        with self._lock:
+            self.in_flight -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+    @contextmanager
+    def _slot(self):
+        if self._slots is not None:
+            self._slots.acquire()
+        self._enter_slot()
+        try:
+            yield
+        finally:
+            self._leave_slot()
+
+    @asynccontextmanager
+    async def _aslot(self):
+        # The semaphore is shared with threads, so it is polled instead of awaited
+        if self._slots is not None:
+            while not self._slots.acquire(blocking=False):
+                await asyncio.sleep(SLOT_POLL_SECONDS)
+        self._enter_slot()
+        try:
+            yield
+        finally:
+            self._leave_slot()
+
+    def _settle(self, estimate: int, model: Optional[str], response):
+        """Count a finished call, replacing its estimate by the real usage (kept when usage is unknown)"""
+        input_tokens, output_tokens = response_usage(response) if response is not None else (0, 0)
+        used = input_tokens + output_tokens if response is not None and (input_tokens or output_tokens) else estimate
+        if self.tokens is not None:
+            self.tokens.adjust(estimate - used)
+        with self._lock:
+            self.calls += 1
+            self._committed_tokens -= estimate
+            self.spent_tokens += used
+            self.spent_usd += cost_usd(model, input_tokens, output_tokens)
+
+    def _attempt(self, send: Callable, estimate: int, attempt: int):
+        """
+        One try: budget, quota and a slot, then send
+
+        Returns:
+            tuple: (result, None) on success, or (None, seconds to wait) after a retryable error
+        """
+        self._commit_budget(estimate)
+        self._wait_for_quota(estimate)
+        try:
+            return send(), None
+        except Exception as e:
+            return None, self._failed(e, estimate, attempt)
+
+    def _release(self, estimate: int):
+        """Undo the reservations of an attempt that produced no response (0 tokens used)"""
+        if self.tokens is not None:
+            self.tokens.adjust(estimate)
+        with self._lock:
+            self._committed_tokens -= estimate
+
+    def _failed(self, error: Exception, estimate: int, attempt: int) -> float:
+        """Release a failed call's estimate and return the backoff delay, or raise error if it is final"""
+        self._release(estimate)
+        if attempt >= self.max_retries or not is_retryable(error):
+            raise error
+        delay = self.backoff(attempt, retry_after(error))
+        with self._lock:
+            self.retries += 1
+            if getattr(error, "status_code", None) in (429, 529):
+                # Everyone waits: more requests now would only extend the throttling
+                self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+        return delay
+
+    def call(self, send: Callable, request: Optional[Dict] = None, model: Optional[str] = None):
+        """
+        Run an API call under the limits, retrying transient errors
+
+        Args:
+            send (Callable): Performs the request and returns the response
+            request (Dict, optional): Keyword arguments of the call (to estimate its tokens)
+            model (str, optional): Model name, for the cost budget (defaults to request['model'])
+
+        Returns:
+            The response of send()
+        """
+        request = request or {}
+        estimate = estimate_tokens(request)
+        model = model or request.get("model")
+        attempt = 0
+        while True:
+            with self._slot():
+                response, delay = self._attempt(send, estimate, attempt)
+            if delay is None:
+                self._settle(estimate, model, response)
+                return response
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(self, send: Callable, request: Optional[Dict] = None, model: Optional[str] = None):
+        """
+        Coroutine counterpart of call: send returns an awaitable, and the waits
+        for a slot, for quota and between retries do not block the event loop
+
+        Returns:
+            The awaited result of send()
+        """
+        request = request or {}
+        estimate = estimate_tokens(request)
+        model = model or request.get("model")
+        attempt = 0
+        while True:
+            async with self._aslot():
+                self._commit_budget(estimate)
+                wait = self._quota_delay(estimate)
+                try:
+                    if wait:
+                        await asyncio.sleep(wait)
+                    response, delay = await send(), None
+                except asyncio.CancelledError:
+                    self._release(estimate)
+                    raise
+                except Exception as e:
+                    response, delay = None, self._failed(e, estimate, attempt)
+            if delay is None:
+                self._settle(estimate, model, response)
+                return response
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Counters of this run"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "throttled_seconds": round(self.throttled_seconds, 2),
+                "peak_in_flight": self.peak_in_flight,
+                "spent_tokens": self.spent_tokens,
+                "spent_usd": round(self.spent_usd, 4)
+            }
+
+
+class _ScheduledStream:
+    """Wraps the client's MessageStream: opened under the scheduler, slot held until the stream is closed"""
+
+    def __init__(self, owner: "ScheduledAnthropicClient", kwargs: Dict):
+        self._scheduler = owner.scheduler
+        self._open = lambda: owner.client.messages.stream(**kwargs)
+        self._estimate = estimate_tokens(kwargs)
+        self._model = kwargs.get("model")
+        self._slot = None
+        self._manager = None
+        self._stream = None
+        self._final = None
+
+    def __enter__(self):
+        attempt = 0
+        while True:
+            self._slot = self._scheduler._slot()
+            self._slot.__enter__()
+
+            def send():
+                manager = self._open()
+                return manager, manager.__enter__()
+
+            try:
+                opened, delay = self._scheduler._attempt(send, self._estimate, attempt)
+            except BaseException:
+                self._slot.__exit__(None, None, None)
+                raise
+            if delay is None:
+                self._manager, self._stream = opened
+                return self
+            self._slot.__exit__(None, None, None)
+            time.sleep(delay)
+            attempt += 1
+
+    def __exit__(self, *exc):
+        try:
+            return self._manager.__exit__(*exc)
+        finally:
+            self._scheduler._settle(self._estimate, self._model, self._final)
+            self._slot.__exit__(None, None, None)
+
+    @property
+    def text_stream(self):
+        return self._stream.text_stream
+
+    def get_final_message(self):
+        self._final = self._stream.get_final_message()
+        return self._final
+
+
+class _ScheduledAnthropicMessages:
+    def __init__(self, owner: "ScheduledAnthropicClient"):
+        self._owner = owner
+
+    def create(self, **kwargs):
+        return self._owner.scheduler.call(lambda: self._owner.client.messages.create(**kwargs), kwargs)
+
+    def stream(self, **kwargs):
+        return _ScheduledStream(self._owner, kwargs)
+
+
+class ScheduledAnthropicClient:
+    """Anthropic client wrapper that runs messages.create/stream through a RequestScheduler"""
+
+    def __init__(self, client, scheduler: Optional[RequestScheduler] = None):
+        self.client = client
+        self.scheduler = scheduler if scheduler is not None else default_scheduler("anthropic")
+        self.messages = _ScheduledAnthropicMessages(self)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+class _AsyncScheduledAnthropicMessages:
+    def __init__(self, owner: "AsyncScheduledAnthropicClient"):
+        self._owner = owner
+
+    async def create(self, **kwargs):
+        return await self._owner.scheduler.acall(lambda: self._owner.client.messages.create(**kwargs), kwargs)
+
+
+class AsyncScheduledAnthropicClient:
+    """AsyncAnthropic client wrapper that runs the awaited messages.create through a RequestScheduler"""
+
+    def __init__(self, client, scheduler: Optional[RequestScheduler] = None):
+        self.client = client
+        self.scheduler = scheduler if scheduler is not None else default_scheduler("anthropic")
+        self.messages = _AsyncScheduledAnthropicMessages(self)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+class _ScheduledChatCompletions:
+    def __init__(self, owner: "ScheduledOpenAIClient"):
+        self._owner = owner
+
+    def create(self, **kwargs):
+        return self._owner.scheduler.call(lambda: self._owner.client.chat.completions.create(**kwargs), kwargs)
+
+
+class ScheduledOpenAIClient:
+    """OpenAI client wrapper that runs chat.completions.create through a RequestScheduler"""
+
+    def __init__(self, client, scheduler: Optional[RequestScheduler] = None):
+        self.client = client
+        self.scheduler = scheduler if scheduler is not None else default_scheduler("openai")
+        self.chat = SimpleNamespace(completions=_ScheduledChatCompletions(self))
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+class _AsyncScheduledChatCompletions:
+    def __init__(self, owner: "AsyncScheduledOpenAIClient"):
+        self._owner = owner
+
+    async def create(self, **kwargs):
+        return await self._owner.scheduler.acall(lambda: self._owner.client.chat.completions.create(**kwargs), kwargs)
+
+
+class AsyncScheduledOpenAIClient:
+    """AsyncOpenAI client wrapper that runs the awaited chat.completions.create through a RequestScheduler"""
+
+    def __init__(self, client, scheduler: Optional[RequestScheduler] = None):
+        self.client = client
+        self.scheduler = scheduler if scheduler is not None else default_scheduler("openai")
+        self.chat = SimpleNamespace(completions=_AsyncScheduledChatCompletions(self))
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def _env_number(name: str) -> Optional[float]:
+    value = os.environ.get(name)
+    try:
+        return float(value) if value else None
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {value!r}")
+
+
+def limits_from_env() -> Dict:
+    """RequestScheduler arguments set in the environment"""
+    in_flight = _env_number("UNIR_TFM_MAX_IN_FLIGHT")
+    budget_tokens = _env_number("UNIR_TFM_BUDGET_TOKENS")
+    return {
+        "requests_per_minute": _env_number("UNIR_TFM_RPM"),
+        "tokens_per_minute": _env_number("UNIR_TFM_TPM"),
+        "max_in_flight": int(in_flight) if in_flight else DEFAULT_MAX_IN_FLIGHT,
+        "budget_tokens": int(budget_tokens) if budget_tokens else None,
+        "budget_usd": _env_number("UNIR_TFM_BUDGET_USD")
+    }
+
+
+_schedulers: Dict[str, RequestScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def default_scheduler(provider: str = "anthropic") -> RequestScheduler:
+    """Process-wide scheduler of a provider (limits from limits_from_env)"""
+    with _schedulers_lock:
+        if provider not in _schedulers:
+            _schedulers[provider] = RequestScheduler(**limits_from_env())
+        return _schedulers[provider]
+
+
+def configure_scheduler(provider: str = "anthropic", **limits) -> RequestScheduler:
+    """
+    Replace the process-wide scheduler of a provider
+
+    Args:
+        provider (str): 'anthropic' or 'openai'
+        **limits: RequestScheduler arguments; those left out (or None) come from the environment
+
+    Returns:
+        RequestScheduler: The new default scheduler
+    """
+    arguments = {**limits_from_env(), **{name: value for name, value in limits.items() if value is not None}}
+    with _schedulers_lock:
+        _schedulers[provider] = RequestScheduler(**arguments)
+        return _schedulers[provider]
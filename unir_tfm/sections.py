@@ -0,0 +1,270 @@
+"""
+Section segmentation of a TFM and token-budgeted context selection.
+
+The document is split into sections using the PDF outline when there is
+one (titles are located on their start page, skipping table-of-contents
+lines) and heading heuristics otherwise (numbered headings and the usual
+UNIR chapter names). Prompts then receive only the sections relevant to
+a rubric criterion, or an even sample of every section, within a token
+budget instead of a blind content[:4000] cut.
+"""
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 3000
+MIN_EXCERPT_CHARS = 400
+
+_NUMBERED_HEADING = re.compile(r"^\s*(\d{1,2}(?:\.\d{1,2}){0,3})\.?\s+([A-ZÁÉÍÓÚÑ¿¡][^\n]{2,100})$")
+_TOC_ENTRY = re.compile(r"(?:\.{2,}|\s)\s*\d+\s*$")
+_WORD = re.compile(r"\w+")
+
+KNOWN_HEADINGS = {
+    "resumen", "abstract", "introduccion", "justificacion", "objetivos", "contexto",
+    "marco teorico", "estado del arte", "estado de la cuestion", "metodologia",
+    "desarrollo", "propuesta", "resultados", "discusion", "conclusiones",
+    "limitaciones", "trabajo futuro", "lineas futuras", "referencias", "bibliografia", "anexos"
+}
+
+# Rubric vocabulary -> words that usually appear in the matching section titles
+SYNONYMS = {
+    "objetivos": ["objetivo", "hipotesis", "pregunta", "introduccion"],
+    "metodologia": ["metodo", "metodos", "diseno", "muestra", "instrumentos", "procedimiento"],
+    "marco": ["teorico", "estado", "arte", "literatura", "antecedentes"],
+    "fundamentacion": ["teorico", "marco", "estado", "arte"],
+    "resultados": ["resultado", "analisis", "hallazgos", "discusion"],
+    "conclusiones": ["conclusion", "limitaciones", "futuro", "futuras", "prospectiva"],
+    "bibliografia": ["referencias", "bibliografia", "citas"],
+    "referencias": ["referencias", "bibliografia", "citas"],
+    "introduccion": ["introduccion", "justificacion", "contexto", "problema"],
+}
+
+STOPWORDS = {
+    "de", "la", "el", "los", "las", "y", "o", "en", "del", "al", "un", "una", "que", "con", "por",
+    "para", "se", "su", "sus", "es", "son", "lo", "como", "mas", "muy", "no", "si", "the", "and",
+    "of", "to", "a", "e", "u", "trabajo", "tfm", "nivel", "suspenso", "aprobado", "notable",
+    "sobresaliente", "adecuado", "adecuada", "correcto", "correcta"
+}
+
+
+def _fold(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def keywords(text: str) -> List[str]:
+    """Folded content words of a text"""
+    return [word for word in _WORD.findall(_fold(text)) if len(word) > 2 and word not in STOPWORDS and not word.isdigit()]
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def read_outline(pdf_path: str) -> List[Dict]:
+    """
+    Read the PDF outline (bookmarks) with the page each entry points to.
+
+    Returns:
+        List[Dict]: Entries with 'title', 'level' and 'page' (1-based, None if unknown)
+    """
+    import PyPDF2
+
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+
+        def walk(outline, level):
+            entries = []
+            for item in outline or []:
+                if isinstance(item, list):
+                    entries.extend(walk(item, level + 1))
+                    continue
+                try:
+                    page = reader.get_destination_page_number(item) + 1
+                except Exception:
+                    page = None
+                entries.append({"title": str(item.title).strip(), "level": level, "page": page})
+            return entries
+
+        return walk(reader.outline, 0)
+
+
+def _is_heading(line: str) -> Optional[int]:
+    """Return the heading level of a line, or None if it is body text"""
+    stripped = line.strip()
+    # Table-of-contents lines end with a page number
+    if not stripped or len(stripped) > 100 or _TOC_ENTRY.search(stripped):
+        return None
+
+    numbered = _NUMBERED_HEADING.match(stripped)
+    if numbered and not stripped.endswith(('.', ',', ';', ':')):
+        return numbered.group(1).count('.') + 1
+
+    title = re.sub(r"^\d+(?:\.\d+)*\.?\s*", "", _fold(stripped)).strip(" .:")
+    if title in KNOWN_HEADINGS:
+        return 1
+    return None
+
+
+def _locate(text: str, title: str, start: int) -> Optional[int]:
+    """Find a heading title at or after start, ignoring table-of-contents lines"""
+    pattern = re.compile(r"\s+".join(re.escape(word) for word in title.split()), re.IGNORECASE)
+    for match in pattern.finditer(text, start):
+        line_end = text.find("\n", match.end())
+        rest_of_line = text[match.end():line_end if line_end != -1 else len(text)]
+        if not re.fullmatch(r"[\s.]*\d+\s*", rest_of_line):
+            return text.rfind("\n", 0, match.start()) + 1
+    return None
+
+
+def _section(title: str, level: int, text: str) -> Dict:
+    return {"title": title, "level": level, "text": text.strip(), "terms": Counter(keywords(text))}
+
+
+def segment_pages(pages: Iterable[Dict], outline: Optional[List[Dict]] = None) -> List[Dict]:
+    """
+    Split a document into sections.
+
+    The pages are consumed once, so a stream (unir_tfm.pdf_extract.stream_pages)
+    is never held as a list: headings are spotted page by page and only the
+    text itself is kept.
+
+    Args:
+        pages (Iterable[Dict]): Pages as returned by extract_pages or stream_pages
+        outline (List[Dict], optional): Entries from read_outline / extract_toc
+
+    Returns:
+        List[Dict]: Sections in document order with 'title', 'level', 'text' and 'terms'
+    """
+    page_offsets = {}
+    parts = []
+    # Heading-heuristic starts, used when the outline is missing or cannot be located
+    heading_starts = []
+    length = 0
+    for page in pages:
+        page_offsets[page["page"]] = length
+        parts.append(page["text"] + "\n")
+        for line in parts[-1].splitlines(keepends=True):
+            level = _is_heading(line)
+            if level is not None:
+                heading_starts.append((length, line.strip(), level))
+            length += len(line)
+    text = "".join(parts)
+    del parts
+
+    starts = []
+    if outline:
+        cursor = 0
+        for entry in outline:
+            search_from = page_offsets.get(entry.get("page"), cursor) if isinstance(entry.get("page"), int) else cursor
+            position = _locate(text, entry["title"], max(search_from, cursor))
+            # Title not found: start at its page, unless that page lies before the
+            # previous section (an outline out of page order); then the entry is skipped
+            if position is None and search_from > cursor:
+                position = search_from
+            if position is not None:
+                starts.append((position, entry["title"], entry.get("level", 0) + 1))
+                cursor = position + 1
+        starts.sort(key=lambda start: start[0])
+
+    if not starts:
+        starts = heading_starts
+
+    if not starts:
+        return [_section("Documento", 1, text)]
+
+    sections = []
+    if starts[0][0] > 0 and text[:starts[0][0]].strip():
+        sections.append(_section("Preliminares", 0, text[:starts[0][0]]))
+    for i, (position, title, level) in enumerate(starts):
+        end = starts[i + 1][0] if i + 1 < len(starts) else len(text)
+        sections.append(_section(title, level, text[position:end]))
+    return sections
+
+
+def segment_text(text: str, outline: Optional[List[Dict]] = None) -> List[Dict]:
+    """Split plain text into sections (outline page numbers are ignored)"""
+    entries = [{**entry, "page": None} for entry in outline] if outline else None
+    return segment_pages([{"page": 1, "text": text}], entries)
+
+
+def _render(chosen: List[Dict], sections: List[Dict]) -> str:
+    order = {id(section): i for i, section in enumerate(sections)}
+    chosen.sort(key=lambda item: order[id(item[0])])
+    return "\n\n".join(f"### {section['title']}\n{excerpt}" for section, excerpt in chosen)
+
+
+def spread_sections(sections: List[Dict], budget_tokens: int = DEFAULT_TOKEN_BUDGET) -> str:
+    """
+    Sample the beginning of every section evenly within a token budget.
+
+    When the budget cannot give each section MIN_EXCERPT_CHARS, only the
+    top-level sections are sampled.
+    """
+    budget_chars = budget_tokens * CHARS_PER_TOKEN
+    candidates = [section for section in sections if section["text"] and section["level"] > 0] or sections
+    if len(candidates) * MIN_EXCERPT_CHARS > budget_chars:
+        top_level = min(section["level"] for section in candidates)
+        candidates = [section for section in candidates if section["level"] == top_level]
+
+    share = max(budget_chars // max(len(candidates), 1), MIN_EXCERPT_CHARS)
+    chosen = []
+    used = 0
+    for section in candidates:
+        if used >= budget_chars:
+            break
+        excerpt = section["text"][:min(share, budget_chars - used)]
+        chosen.append((section, excerpt))
+        used += len(excerpt)
+    return _render(chosen, sections)
+
+
+def select_sections(sections: List[Dict], query: str, budget_tokens: int = DEFAULT_TOKEN_BUDGET) -> str:
+    """
+    Pick the sections most relevant to a rubric criterion within a token budget.
+
+    Sections are ranked by keyword overlap with the query (title matches
+    weigh most) and added whole, highest score first, until the budget is
+    spent; the last one is truncated. If nothing matches, every section is
+    sampled evenly instead.
+
+    Args:
+        sections (List[Dict]): Output of segment_pages / segment_text
+        query (str): Criterion text (subcategory name plus its level descriptors)
+        budget_tokens (int): Approximate token budget of the returned context
+
+    Returns:
+        str: Selected sections, in document order, with their titles as headers
+    """
+    terms = set(keywords(query))
+    for term in list(terms):
+        terms.update(SYNONYMS.get(term, []))
+    if not terms:
+        return spread_sections(sections, budget_tokens)
+
+    scored = []
+    for position, section in enumerate(sections):
+        title_terms = set(keywords(section["title"]))
+        body_score = sum(min(section["terms"][term], 5) for term in terms) / 5
+        score = 3 * len(terms & title_terms) + body_score
+        if section["level"] == 0:
+            score *= 0.5  # cover, abstract and index pages
+        if score > 0:
+            scored.append((score, position, section))
+
+    if not scored:
+        return spread_sections(sections, budget_tokens)
+
+    budget_chars = budget_tokens * CHARS_PER_TOKEN
+    chosen = []
+    used = 0
+    for _, _, section in sorted(scored, key=lambda item: (-item[0], item[1])):
+        remaining = budget_chars - used
+        if remaining < MIN_EXCERPT_CHARS:
+            break
+        excerpt = section["text"][:remaining]
+        chosen.append((section, excerpt))
+        used += len(excerpt)
+    return _render(chosen, sections)
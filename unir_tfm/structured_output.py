@@ -0,0 +1,159 @@
+"""
+Rubric scoring with a strict JSON answer, validated and retried.
+
+rubric_json_schema describes the expected answer for a group of rubric
+categories (every category and subcategory is a required property, so
+the names cannot drift). The model receives the schema in the prompt;
+request_structured parses the reply, validates it locally and, on any
+schema violation, sends the errors back and asks again.
+"""
+import json
+import re
+from typing import Callable, Dict, List, Tuple
+
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+class SchemaValidationError(ValueError):
+    """The model reply is not valid JSON or does not follow the schema"""
+
+
+def rubric_json_schema(groups: List[Tuple[str, List[str]]]) -> Dict:
+    """
+    JSON schema of the answer for several categories at once.
+
+    Args:
+        groups (List[Tuple[str, List[str]]]): (category name, subcategory names)
+
+    Returns:
+        Dict: JSON schema with one required property per category/subcategory
+    """
+    subcategory_schema = {
+        "type": "object",
+        "required": ["puntuacion", "justificacion"],
+        "properties": {
+            "puntuacion": {"type": "number", "minimum": 0, "maximum": 10},
+            "justificacion": {"type": "string"},
+            "recomendaciones": {"type": "string"}
+        }
+    }
+    return {
+        "type": "object",
+        "required": ["categorias"],
+        "properties": {
+            "categorias": {
+                "type": "object",
+                "required": [category for category, _ in groups],
+                "properties": {
+                    category: {
+                        "type": "object",
+                        "required": ["analisis", "subcategorias"],
+                        "properties": {
+                            "analisis": {"type": "string"},
+                            "subcategorias": {
+                                "type": "object",
+                                "required": list(subcategories),
+                                "properties": {name: subcategory_schema for name in subcategories}
+                            }
+                        }
+                    }
+                    for category, subcategories in groups
+                }
+            }
+        }
+    }
+
+
+def parse_json_object(text: str) -> Dict:
+    """Parse the JSON object in a reply, tolerating ```json fences and surrounding prose"""
+    fenced = re.search(r"```(?:json)?\s*(\{.*\})\s*```", text, re.DOTALL)
+    candidate = fenced.group(1) if fenced else text[text.find("{"):text.rfind("}") + 1]
+    if not candidate:
+        raise SchemaValidationError("the reply contains no JSON object")
+    try:
+        data = json.loads(candidate)
+    except json.JSONDecodeError as e:
+        raise SchemaValidationError(f"invalid JSON: {e}")
+    if not isinstance(data, dict):
+        raise SchemaValidationError("the JSON value is not an object")
+    return data
+
+
+def validate_rubric_answer(data: Dict, groups: List[Tuple[str, List[str]]]) -> Dict[str, Dict]:
+    """
+    Check a parsed answer against the rubric and normalize it.
+
+    Returns:
+        Dict[str, Dict]: category -> {'analisis': str, 'subcategorias': {name: score},
+            'justificaciones': {name: text}}, with names in rubric order
+    """
+    errors = []
+    categories = data.get("categorias")
+    if not isinstance(categories, dict):
+        raise SchemaValidationError("'categorias' must be an object")
+
+    validated = {}
+    for category, subcategories in groups:
+        entry = categories.get(category)
+        if not isinstance(entry, dict):
+            errors.append(f"missing category '{category}'")
+            continue
+        scored = entry.get("subcategorias")
+        if not isinstance(scored, dict):
+            errors.append(f"'{category}.subcategorias' must be an object")
+            continue
+
+        scores, justifications = {}, {}
+        for name in subcategories:
+            item = scored.get(name)
+            score = item.get("puntuacion") if isinstance(item, dict) else None
+            if isinstance(score, bool) or not isinstance(score, (int, float)):
+                errors.append(f"'{category}.{name}.puntuacion' must be a number")
+            elif not 0 <= score <= 10:
+                errors.append(f"'{category}.{name}.puntuacion' must be between 0 and 10")
+            else:
+                scores[name] = float(score)
+                justifications[name] = str(item.get("justificacion", ""))
+
+        validated[category] = {
+            "analisis": str(entry.get("analisis", "")),
+            "subcategorias": scores,
+            "justificaciones": justifications
+        }
+
+    if errors:
+        raise SchemaValidationError("; ".join(errors))
+    return validated
+
+
+def request_structured(client, request: Dict, validate: Callable[[Dict], Dict],
+                       max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> Dict:
+    """
+    Call messages.create until the reply passes validation.
+
+    Args:
+        client: Object exposing messages.create (Anthropic or a wrapper)
+        request (Dict): Keyword arguments of the call
+        validate (Callable): Turns the parsed JSON into the result, raising SchemaValidationError
+        max_attempts (int): Total calls before giving up
+
+    Returns:
+        Dict: The validated result
+    """
+    messages = list(request["messages"])
+    last_error = None
+    for _ in range(max_attempts):
+        response = client.messages.create(**{**request, "messages": messages})
+        text = "".join(block.text for block in response.content if hasattr(block, "text"))
+        try:
+            return validate(parse_json_object(text))
+        except SchemaValidationError as e:
+            last_error = e
+            messages = messages + [
+                {"role": "assistant", "content": text},
+                {"role": "user", "content": (
+                    f"La respuesta no cumple el esquema: {e}. "
+                    "Responde de nuevo únicamente con el objeto JSON corregido."
+                )}
+            ]
+    raise SchemaValidationError(f"No valid answer after {max_attempts} attempts: {last_error}")
@@ -0,0 +1,153 @@
+"""
+Offline stand-in for the Anthropic client.
+
+`StubAnthropicClient` exposes the same `messages.create(...)` and
+`messages.stream(...)` surface the graders use, answers with canned text and records every call, so the
+grading pipelines can be exercised without an API key or network access.
+"""
+import json
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+
+def _answer_schema(schema: Dict):
+    """Build a value that satisfies a (required-properties-only) JSON schema."""
+    kind = schema.get("type")
+    if kind == "object":
+        properties = schema.get("properties", {})
+        return {name: _answer_schema(properties.get(name, {})) for name in schema.get("required", properties)}
+    if kind == "number":
+        return 7
+    return "Respuesta generada por el cliente local de pruebas."
+
+
+QUESTIONS_ANSWER = """# Questions for Document Review
+
+## Understanding & Concepts
+1. Question generated by the local test client about the core concepts?
+2. Question generated by the local test client about the theoretical foundations?
+3. Question generated by the local test client about the key definitions?
+
+## Methodology & Approach
+4. Question generated by the local test client about the methods used?
+5. Question generated by the local test client about the approach?
+6. Question generated by the local test client about the implementation?
+
+## Results & Implications
+7. Question generated by the local test client about the main findings?
+8. Question generated by the local test client about the practical implications?
+
+## Future Work & Applications
+9. Question generated by the local test client about possible extensions?
+10. Question generated by the local test client about real-world applications?"""
+
+
+def _text(content) -> str:
+    if isinstance(content, list):
+        return "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+    return str(content or "")
+
+
+def request_text(request: Dict) -> str:
+    """System prompt and messages of a request as plain text (content blocks joined)"""
+    parts = [request.get("system", "")] + [message.get("content", "") for message in request.get("messages", [])]
+    return "\n".join(_text(part) for part in parts)
+
+
+def default_responder(request: Dict) -> str:
+    """Return a rubric-shaped answer that the graders can parse.
+
+    Prompts carrying a JSON schema between <esquema> tags get a JSON
+    answer that follows it; autoEval's level prompts get a level and the
+    question generators their Markdown outline.
+    """
+    prompt = request_text(request)
+    schema = re.search(r"<esquema>(.*?)</esquema>", prompt, re.DOTALL)
+    if schema:
+        return json.dumps(_answer_schema(json.loads(schema.group(1))), ensure_ascii=False)
+    if "Nivel 1, Nivel 2, Nivel 3 o Nivel 4" in prompt:
+        return "Nivel 3: Respuesta generada por el cliente local de pruebas."
+    if "# Questions for Document Review" in prompt:
+        return QUESTIONS_ANSWER
+    return (
+        "Puntuación: 7\n"
+        "Justificación: Respuesta generada por el cliente local de pruebas.\n"
+        "Recomendaciones: Ninguna."
+    )
+
+
+class _StubStream:
+    """Context manager mirroring the SDK's MessageStream (text_stream, get_final_message)"""
+
+    def __init__(self, owner: "StubAnthropicClient", request: Dict):
+        self._owner = owner
+        self._request = request
+        self._response = None
+
+    def __enter__(self):
+        self._response = self._owner._handle(self._request)
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        for chunk in re.findall(r"\S+\s*|\s+", self._response.content[0].text):
+            yield chunk
+
+    def get_final_message(self):
+        return self._response
+
+
+class _StubMessages:
+    def __init__(self, owner: "StubAnthropicClient"):
+        self._owner = owner
+
+    def create(self, **kwargs):
+        return self._owner._handle(kwargs)
+
+    def stream(self, **kwargs):
+        return _StubStream(self._owner, kwargs)
+
+
+class StubAnthropicClient:
+    def __init__(self, responder: Optional[Callable[[Dict], str]] = None, latency: float = 0.0):
+        """
+        Initialize the stub client
+
+        Args:
+            responder (Callable, optional): Builds the reply text from the request kwargs
+            latency (float): Seconds each call sleeps to emulate a network round trip
+        """
+        self.responder = responder or default_responder
+        self.latency = latency
+        self.messages = _StubMessages(self)
+        self.calls: List[Dict] = []
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _handle(self, request: Dict):
+        with self._lock:
+            self.calls.append(request)
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            text = self.responder(request)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in request.get("messages", []))
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text=text)],
+            model=request.get("model"),
+            stop_reason="end_turn",
+            usage=SimpleNamespace(input_tokens=prompt_chars // 4, output_tokens=len(text) // 4),
+        )